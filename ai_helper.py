@@ -1,11 +1,28 @@
 import os
 import re
+import hashlib
+import time
 from google import genai
 from dotenv import load_dotenv
 
+import metrics
+from cache import MemoryCache
+
 load_dotenv()
 API_KEY = os.getenv("GEMINI_API_KEY")
 client = genai.Client(api_key=API_KEY)
+GEMINI_MODEL = "gemini-2.0-flash"
+
+# Response cache: repeated questions (e.g. clicking the same drug in /details)
+# are answered without another model call
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", str(24 * 3600)))
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "2048"))
+AI_CACHE_MAX_BYTES = int(os.getenv("AI_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+_response_cache = MemoryCache(max_entries=AI_CACHE_MAX_ENTRIES, max_bytes=AI_CACHE_MAX_BYTES,
+                              ttl=AI_CACHE_TTL_SECONDS)
+_scope_cache = MemoryCache(max_entries=AI_CACHE_MAX_ENTRIES, max_bytes=AI_CACHE_MAX_BYTES // 8,
+                           ttl=AI_CACHE_TTL_SECONDS)
 
 ALLOWED_BIO_KEYWORDS = {
     "bioinformatics",
@@ -74,12 +91,73 @@ def get_project_context(max_chars=2000) -> str:
     except Exception:
         return ""
 
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation so trivially
+    different phrasings of the same question share a cache entry."""
+    text = re.sub(r"\s+", " ", (question or "").strip().lower())
+    return text.rstrip("?!. ")
+
+
+def prompt_fingerprint(template: str, question: str, context: str = "", model: str = GEMINI_MODEL) -> str:
+    """Cache key for a model call: prompt template, normalized question,
+    hash of the grounding context and model name."""
+    h = hashlib.sha256()
+    for part in (model, template, normalize_question(question), context or ""):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def generate_content(prompt: str):
+    """One Gemini call, timed under the "gemini" upstream host."""
+    started = time.perf_counter()
+    status = "error"
+    try:
+        resp = client.models.generate_content(
+            model=GEMINI_MODEL,
+            contents=prompt
+        )
+        status = 200
+        return resp
+    finally:
+        metrics.observe_upstream("gemini", time.perf_counter() - started, status)
+
+
+def generate_cached(template: str, question: str, prompt: str, context: str = "") -> str:
+    """Run `prompt` through Gemini, reusing a cached answer for the same
+    fingerprint. Empty answers and errors are never cached."""
+    key = prompt_fingerprint(template, question, context)
+    text = _response_cache.get(key)
+    if text is not None:
+        metrics.count_ai_cache(template, "hit")
+        return text
+    metrics.count_ai_cache(template, "miss")
+
+    resp = generate_content(prompt)
+    text = resp.text.strip()
+    if text:
+        _response_cache.set(key, text, size=len(text))
+    return text
+
+
+def ai_cache_stats() -> dict:
+    return {"responses": _response_cache.stats(), "scope": _scope_cache.stats()}
+
+
 def classify_scope_with_model(question: str) -> str:
     """Ask the AI model to classify whether `question` is IN_SCOPE or OUT_OF_SCOPE.
+    Decisions are cached per normalized question.
     """
     if not question or not isinstance(question, str):
         return "OUT_OF_SCOPE"
 
+    key = normalize_question(question)
+    cached = _scope_cache.get(key)
+    if cached is not None:
+        metrics.count_ai_cache("scope", "hit")
+        return cached
+    metrics.count_ai_cache("scope", "miss")
+
     prompt = f"""
 You are a strict classifier for the DGIT AI Assistant. Decide whether the user's
 question should be handled by the assistant. The assistant's scope is limited to:
@@ -115,26 +193,35 @@ Q: {question}
 A:
 """
 
-    resp = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=prompt
-    )
+    resp = generate_content(prompt)
     text = resp.text.strip()
 
+    decision = None
     if "IN_SCOPE" in text.upper():
-        return "IN_SCOPE"
-    if "OUT_OF_SCOPE" in text.upper():
-        return "OUT_OF_SCOPE"
+        decision = "IN_SCOPE"
+    elif "OUT_OF_SCOPE" in text.upper():
+        decision = "OUT_OF_SCOPE"
+    if decision:
+        _scope_cache.set(key, decision, size=len(decision))
+        return decision
     raise RuntimeError(f"Unexpected classifier response: {text!r}")
 
-def is_in_scope(question: str) -> bool:
+# Passed as scope_decision when the classifier was tried ahead of time but failed
+# or missed its deadline, so we go straight to the keyword heuristics.
+SCOPE_UNAVAILABLE = "UNAVAILABLE"
+
+def is_in_scope(question: str, decision=None) -> bool:
     """Return True if the question is about genes, proteins, or drugs only.
+    `decision` is a classifier result computed ahead of time, if any.
     """
-    try:
-        decision = classify_scope_with_model(question)
+    if decision in ("IN_SCOPE", "OUT_OF_SCOPE"):
         return decision == "IN_SCOPE"
-    except Exception:
-        pass
+    if decision is None:
+        try:
+            decision = classify_scope_with_model(question)
+            return decision == "IN_SCOPE"
+        except Exception:
+            pass
 
     if not question or not isinstance(question, str):
         return False
@@ -215,9 +302,25 @@ def is_naming_request(question: str) -> bool:
         return True
     return False
 
-def ask_ai_google(question, interactions=None, ncbi_summary=None, mdd_context=None):
+def needs_scope_check(question: str) -> bool:
+    """Return True if ask_ai_google will run the scope classifier for this question
+    (project and MDD questions are answered before the scope check)."""
+    return not is_project_question(question) and not is_mdd_question(question)
+
+
+def classify_scope_safe(question: str) -> str:
+    """classify_scope_with_model that reports failures as SCOPE_UNAVAILABLE."""
+    try:
+        return classify_scope_with_model(question)
+    except Exception:
+        return SCOPE_UNAVAILABLE
+
+
+def ask_ai_google(question, interactions=None, ncbi_summary=None, mdd_context=None, scope_decision=None):
     """
     Ask Gemini AI to summarize or explain a gene/drug/protein based on DGIdb and NCBI context.
+    `scope_decision` lets callers run the scope classifier concurrently with
+    their own context lookups and pass the result in.
     """
     context_text = ""
 
@@ -248,11 +351,7 @@ Instructions:
 Answer:
 """
         try:
-            resp = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=project_prompt
-            )
-            return resp.text.strip()
+            return generate_cached("project", question, project_prompt, proj_ctx)
         except Exception as e:
             if proj_ctx:
                 first_lines = proj_ctx.splitlines()[:6]
@@ -323,11 +422,7 @@ Keep language non-judgmental and avoid giving specific medical advice.
 Answer:
 """
         try:
-            resp = client.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=mdd_prompt
-            )
-            text = resp.text.strip()
+            text = generate_cached("mdd", question, mdd_prompt)
             if text:
                 return text
         except Exception:
@@ -344,14 +439,12 @@ Answer:
             "(Source: NCBI summary.)"
         )
 
-    if not is_in_scope(question):
+    with metrics.span("scope_check"):
+        in_scope = is_in_scope(question, scope_decision)
+    if not in_scope:
         return "This is outside of my scope."
 
     try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt
-        )
-        return response.text.strip()
+        return generate_cached("answer", question, prompt, context_text + extra_instruction)
     except Exception as e:
         return f"AI error: {str(e)}"
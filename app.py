@@ -1,12 +1,41 @@
-from flask import Flask, jsonify, request, render_template, redirect
+from flask import Flask, Response, g, jsonify, request, render_template, redirect, stream_with_context
 import requests
-from ai_helper import ask_ai_google
-from db_conn import get_cached_results, save_results, mysql, init_app
+import metrics
+import upstream
+from ai_helper import ask_ai_google, needs_scope_check, classify_scope_safe, ai_cache_stats, SCOPE_UNAVAILABLE
+from db_conn import mysql, init_app, cache_stats, list_cache_entries, iter_cache_entries, purge_entries
+from cache import search_cache
+from ncbi import fetch_ncbi_summary
+from parsers import parseGeneResults, parseDrugResults, parseProteinResults, parseInteractionResults, build_cache_entry, \
+    regroupInteractionPage
+from interaction_store import RELATIONAL_TYPES, ROOTS, load_interactions
+import dgidb_mirror
+import interaction_graph
+import similarity
+from result_pages import page_rows, fetch_progress, batch_views
+from chart_aggregates import aggregates_for, build_aggregates, merge_aggregates
+from panel_matrix import MATRIX_MAX_TERMS, build_matrix
+from gene_mapping import GENE_MAPPING
+from term_resolver import TermResolver, MAX_SUGGESTIONS
+from result_export import EXPORT_FORMATS, MIMETYPES, parquet_available, stream_export
+import contextvars
+import csv
+import io
+import json
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
 
 app = Flask(__name__)
 init_app(app)
-DGIDB_API_URL = "https://dgidb.org/api/graphql"
+DGIDB_API_URL = os.getenv("DGIDB_API_URL", "https://dgidb.org/api/graphql")
+# Where gene/drug searches are answered: the live API, the local mirror
+# (dgidb_mirror.py), or the mirror with the API for names it doesn't know
+DGIDB_SOURCES = ("api", "mirror", "mirror_fallback")
+DGIDB_SOURCE = os.getenv("DGIDB_SOURCE", "api")
+if DGIDB_SOURCE not in DGIDB_SOURCES:
+    print(f"Unknown DGIDB_SOURCE {DGIDB_SOURCE!r}, using the live API")
+    DGIDB_SOURCE = "api"
 init_app(app)
 mysql.init_app(app)
 
@@ -85,132 +114,56 @@ PROTEIN_ALIASES = {
 }
 
 
-#for parsing the gene results that way we can easily put it in table form
-def parseGeneResults(json_data):
-    rows = []
-    nodes = (json_data.get("data",{}).get('genes',{}) or {}).get('nodes',[]) or []
-    for n in nodes:
-        for it in n.get("interactions", []) or []:
-            drug = it.get("drug") or {}
-            types = ", ".join([t.get("type","") for t in (it.get("interactionTypes") or []) if t.get("type")]) or "—"
-            type_list = [t.get("type","") for t in (it.get("interactionTypes") or []) if t.get("type")]
-            dirs  = ", ".join([t.get("directionality","") for t in (it.get("interactionTypes") or []) if t.get("directionality")]) or "—"
-            sources = ", ".join([s.get("sourceDbName","") for s in (it.get("sources") or []) if s.get("sourceDbName")]) or "—"
-            pmids = ", ".join([str(p.get("pmid")) for p in (it.get("publications") or []) if p.get("pmid")]) or "—"
-            rows.append({
-                "left_label": "Gene",
-                "left_name": n.get("name") or "",
-                "left_cid": n.get("conceptId") or "",
-
-                "right_label": "Drug",
-                "right_name": drug.get("name") or "",
-                "right_cid": drug.get("conceptId") or "",
-
-                "types": types,
-                "interaction_type_list": type_list,
-                "directions": dirs,
-                "score": it.get("interactionScore"),
-                "sources": sources,
-                "pmids": pmids
-            })
-    return rows
-
-def parseProteinResults(json_data):
-    rows = []
-    if not json_data:
-        return rows
-    for hit in json_data.get("results", []):
-        protein_name = None
-        description = None
-        #protein description
-        if hit.get("proteinDescription", {}).get("recommendedName", {}).get("fullName", {}):
-            description = hit["proteinDescription"]["recommendedName"]["fullName"].get("value")
-        #protein name
-        if hit.get("proteinDescription", {}).get("recommendedName", {}).get("shortNames"):
-            sn = hit["proteinDescription"]["recommendedName"]["shortNames"]
-            if sn and isinstance(sn, list) and sn[0].get("value"):
-                protein_name = sn[0]["value"]
-
-        uniprot_id = hit.get("primaryAccession")
-        organism = hit.get("organism", {}).get("scientificName")
-
-        gene_symbols = []
-        for g in hit.get("genes", []):
-            if g.get("geneName", {}).get("value"):
-                gene_symbols.append(g["geneName"]["value"])
-            for syn in g.get("synonyms", []):
-                if syn.get("value"):
-                    gene_symbols.append(syn["value"])
-
-        rows.append({
-            "protein_name": protein_name,
-            "description": description,
-            "uniprot_id": uniprot_id,
-            "organism": organism,
-            "genes": ", ".join(gene_symbols) if gene_symbols else "—"
-        })
-    return rows
-
-#for parsing the gene results that way we can easily put it in table form
-def parseDrugResults(json_data):
-    rows = []
-    nodes = (json_data.get("data", {}).get("drugs", {}) or {}).get("nodes", []) or []
-    for n in nodes:
-        for it in n.get("interactions", []) or []:
-            gene = it.get("gene") or {}
-            types = ", ".join([t.get("type","") for t in (it.get("interactionTypes") or []) if t.get("type")]) or "—"
-            type_list = [t.get("type","") for t in (it.get("interactionTypes") or []) if t.get("type")]
-            dirs  = ", ".join([t.get("directionality","") for t in (it.get("interactionTypes") or []) if t.get("directionality")]) or "—"
-            sources = ", ".join([s.get("sourceDbName","") for s in (it.get("sources") or []) if s.get("sourceDbName")]) or "—"
-            pmids = ", ".join([str(p.get("pmid")) for p in (it.get("publications") or []) if p.get("pmid")]) or "—"
-            rows.append({
-                "left_label": "Drug",
-                "left_name": n.get("name") or "",
-                "left_cid": n.get("conceptId") or "",
-
-                "right_label": "Gene",
-                "right_name": gene.get("longName") or gene.get("name") or "",
-                "right_cid": gene.get("conceptId") or "",
-
-                "types": types,
-                "interaction_type_list": type_list,
-                "directions": dirs,
-                "score": it.get("interactionScore"),
-                "sources": sources,
-                "pmids": pmids
-            })
-    return rows
+# Every alias source in one index (plus bulk synonym files from TERM_SYNONYM_FILES)
+term_resolver = TermResolver()
+term_resolver.add_aliases("gene", GENE_ALIASES)
+term_resolver.add_aliases("gene", {name: symbol for symbol, names in GENE_MAPPING.items() for name in names})
+term_resolver.add_aliases("drug", DRUG_ALIASES)
+term_resolver.add_aliases("protein", PROTEIN_ALIASES)
+term_resolver.add_panel("gene", MDD_GENES)
+term_resolver.add_panel("drug", MDD_DRUGS)
+term_resolver.add_panel("protein", MDD_PROTEINS)
+term_resolver.load_synonym_files()
+term_resolver.build()
+
+similarity.index.set_panels({"gene": MDD_GENES, "drug": MDD_DRUGS})
 
 #this is for normalizing the user search so it works with dgidb, basically lets you search by brand, genes
 def normalize_term(search_type: str, s: str) -> str:
     if not s:
         return s
+    canonical = term_resolver.resolve(search_type, s)
+    if canonical:
+        return canonical
     key = s.strip().upper()
     if search_type == "gene":
-        return GENE_ALIASES.get(key, s.strip().upper())
-    elif search_type == "protein": 
-        return PROTEIN_ALIASES.get(key, key)
-        
+        return key
+    elif search_type == "protein":
+        return key
     else:
-        #maps the drug brands to the generic name
-        drug = DRUG_ALIASES.get(key)
-        return drug if drug else s.strip().title()
+        return s.strip().title()
     
-def fetchProteinResults(protein_name: str):
-    url = "https://rest.uniprot.org/uniprotkb/search"
-    params = {
+UNIPROT_SEARCH_URL = "https://rest.uniprot.org/uniprotkb/search"
+UNIPROT_HEADERS = {
+    "User-Agent": "DGIT",
+    "Accept": "application/json"
+}
+
+def uniprotParams(protein_name: str):
+    return {
         "query": f"({protein_name}) AND organism_id:9606", 
         "fields": "accession,protein_name,gene_primary,gene_names,organism_name",
         "format": "json",
         "size": 5
     }
-    headers = {
-        "User-Agent": "DGIT",
-        "Accept": "application/json"
-    }
+
+def fetchProteinResults(protein_name: str):
+    url = UNIPROT_SEARCH_URL
+    params = uniprotParams(protein_name)
+    headers = UNIPROT_HEADERS
     resp = None
     try:
-        resp = requests.get(url, params=params, headers=headers, timeout=10)
+        resp = upstream.get(url, params=params, headers=headers)
         print("UniProt URL:", resp.url)
         resp.raise_for_status()
         return resp.json(), None
@@ -229,13 +182,10 @@ def extract_gene_from_question(question):
         return None
     text = question.upper()
 
-    # check aliases and known genes first
-    for k, v in GENE_ALIASES.items():
-        if k in text:
-            return v
-    for g in MDD_GENES:
-        if g.upper() in text:
-            return g.upper()
+    # check aliases and known genes first (whole words/phrases, one hash lookup each)
+    gene = term_resolver.find_in_text("gene", question)
+    if gene:
+        return gene
 
     # token scan: look for patterns like LETTERS+DIGITS (common gene symbols)
     tokens = re.findall(r"\b[A-Z0-9]{2,10}\b", text)
@@ -249,25 +199,454 @@ def extract_gene_from_question(question):
 
     return None
 
-def fetch_ncbi_summary(term):
+
+DGIDB_GENE_QUERY = """
+query($names: [String!]!) {
+  genes(names: $names) {
+    nodes {
+      name
+      conceptId
+      interactions {
+        drug { name conceptId }
+        interactionScore
+        interactionTypes { type directionality }
+        publications { pmid }
+        sources { sourceDbName }
+      }
+    }
+  }
+}
+"""
+
+DGIDB_DRUG_QUERY = """
+query($names: [String!]!) {
+  drugs(names: $names) {
+    nodes {
+      name
+      conceptId
+      interactions {
+        gene {
+          name
+          conceptId
+          longName
+        }
+        interactionScore
+        interactionTypes { type directionality }
+        publications { pmid }
+        sources { sourceDbName }
+      }
+    }
+  }
+}
+"""
+
+# The chatbot only needs a few fields to ground its answer
+DGIDB_ASK_QUERY = """
+query($names: [String!]!) {
+  genes(names: $names) {
+    nodes {
+      name
+      interactions {
+        drug { name conceptId }
+        interactionScore
+        interactionTypes { type directionality }
+        sources { sourceDbName }
+      }
+    }
+  }
+}
+"""
+
+# Interaction fields requested per use: /search shows everything, /ask only grounds its answer
+DGIDB_INTERACTION_FIELDS = {
+    "search": "interactionScore interactionTypes { type directionality } publications { pmid } sources { sourceDbName }",
+    "ask": "interactionScore interactionTypes { type directionality } sources { sourceDbName }",
+}
+
+# Gene/drug interactions are fetched a page at a time through DGIdb's
+# interactions connection and parsed as each page arrives; 0 sends the
+# single genes/drugs query above instead
+DGIDB_PAGE_SIZE = int(os.getenv("DGIDB_PAGE_SIZE", "500"))
+DGIDB_MAX_PAGES = int(os.getenv("DGIDB_MAX_PAGES", "200"))
+# /ask grounds its answer on this many interactions, fetched as one short page
+DGIDB_ASK_ROWS = 5
+
+
+def dgidb_page_query(search_type, fields="search"):
+    names_arg = "geneNames" if search_type == 'gene' else "drugNames"
+    gene_fields = "name conceptId" if search_type == 'gene' else "name conceptId longName"
+    return f"""
+query($names: [String!]!, $first: Int!, $after: String) {{
+  interactions({names_arg}: $names, first: $first, after: $after) {{
+    pageInfo {{ hasNextPage endCursor }}
+    nodes {{
+      gene {{ {gene_fields} }}
+      drug {{ name conceptId }}
+      {DGIDB_INTERACTION_FIELDS[fields]}
+    }}
+  }}
+}}
+"""
+
+
+DGIDB_PAGE_QUERIES = {(t, f): dgidb_page_query(t, f) for t in RELATIONAL_TYPES for f in DGIDB_INTERACTION_FIELDS}
+
+# Switched off once DGIdb rejects the page query's field or arguments as unknown
+_dgidb_paging = {"supported": DGIDB_PAGE_SIZE > 0}
+_SCHEMA_REJECTION = re.compile(r"doesn't exist on type|doesn't accept argument|cannot query field|unknown argument",
+                               re.IGNORECASE)
+
+# Graph node kind for each search type
+GRAPH_KINDS = {"gene": interaction_graph.GENE, "drug": interaction_graph.DRUG}
+
+# Max names sent in one GraphQL request by batch searches
+BATCH_CHUNK_SIZE = 25
+BATCH_MAX_TERMS = 200
+
+
+def queryDgidb(search_type, names, fields="search", on_page=None, **kwargs):
+    """
+    Gene or drug interactions for `names` from DGIDB_SOURCE. Returns
+    (json, error). `on_page(results)` is called with each part of the
+    response (a page, or the mirror's answer) as soon as it arrives.
+    """
+    if DGIDB_SOURCE == "api":
+        return _query_dgidb_api(search_type, names, fields, on_page, **kwargs)
+    mirrored, missing = dgidb_mirror.query(search_type, names)
+    if mirrored is not None and on_page:
+        on_page(mirrored)
+    if DGIDB_SOURCE == "mirror":
+        # names the mirror doesn't know simply have no node, as with the API
+        return (mirrored, None) if mirrored is not None else (None, "DGIdb mirror unavailable")
+    if not missing:
+        return mirrored, None
+    fetched, error = _query_dgidb_api(search_type, missing, fields, on_page, **kwargs)
+    return dgidb_mirror.merge(search_type, mirrored, fetched), error
+
+
+def single_dgidb_query(search_type, fields="search"):
+    if fields == "ask" and search_type == 'gene':
+        return DGIDB_ASK_QUERY
+    return DGIDB_GENE_QUERY if search_type == 'gene' else DGIDB_DRUG_QUERY
+
+
+def _post_dgidb(query, variables, **kwargs):
+    """POST one GraphQL query. Returns (json, error)."""
     try:
-        url = f"https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-        params = {"db": "gene", "term": term, "retmode": "json"}
-        r = requests.get(url, params=params, timeout=10)
-        r.raise_for_status()
-        ids = r.json().get("esearchresult", {}).get("idlist", [])
-        if not ids:
-            return None
-        gene_id = ids[0]
-
-        summary_url = f"https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
-        summary_params = {"db": "gene", "id": gene_id, "retmode": "json"}
-        s = requests.get(summary_url, params=summary_params, timeout=10)
-        s.raise_for_status()
-        doc = s.json().get("result", {}).get(gene_id, {})
-        return doc.get("description")
-    except Exception:
+        response = upstream.post(DGIDB_API_URL, json={"query": query, "variables": variables}, **kwargs)
+        rejected = graphql_rejection(response)
+        if rejected is not None:
+            return rejected
+        response.raise_for_status()
+        with metrics.span("decode"):
+            results = response.json()
+        if results.get("errors"):
+            return results, results["errors"][0].get("message", "GraphQL error")
+        return results, None
+    except requests.RequestException as e:
+        return None, f"Failed to query DGIdb API: {e}"
+
+
+def graphql_rejection(response):
+    """
+    (json, error) for an HTTP 400 carrying GraphQL errors (a query the
+    schema rejects), or None for any other response.
+    """
+    if response.status_code != 400:
+        return None
+    try:
+        results = response.json()
+    except ValueError:
+        return None
+    if not isinstance(results, dict) or not results.get("errors"):
         return None
+    return results, results["errors"][0].get("message", "GraphQL error")
+
+
+def page_connection(page, error, first_page):
+    """
+    The interactions connection of a page response, or None. Paging is only
+    switched off when the first page's error says DGIdb doesn't know the
+    connection or its arguments; transient failures leave it on.
+    """
+    connection = ((page or {}).get("data") or {}).get("interactions")
+    if connection is None and first_page and error and _SCHEMA_REJECTION.search(error):
+        app.logger.warning("DGIdb rejected the paged interactions query (%s); using single-request queries", error)
+        _dgidb_paging["supported"] = False
+    return connection
+
+
+def page_plan(fields):
+    """(page size, page limit) of a paged query: /ask only needs its first few rows."""
+    if fields == "ask":
+        return DGIDB_ASK_ROWS, 1
+    return DGIDB_PAGE_SIZE, DGIDB_MAX_PAGES
+
+
+def collect_page(search_type, connection, merged, on_page):
+    """
+    Adds one connection page to `merged` ({name: node}) and hands it to
+    `on_page`. Returns the cursor of the next page, or None after the last.
+    """
+    results = regroupInteractionPage(connection.get("nodes"), search_type)
+    for n in results["data"][ROOTS[search_type]]["nodes"]:
+        node = merged.setdefault(n["name"], {"name": n["name"], "conceptId": n["conceptId"], "interactions": []})
+        node["interactions"].extend(n["interactions"])
+    if on_page:
+        on_page(results)
+    info = connection.get("pageInfo") or {}
+    return info.get("endCursor") if info.get("hasNextPage") else None
+
+
+def paged_results(search_type, merged):
+    return {"data": {ROOTS[search_type]: {"nodes": list(merged.values())}}}
+
+
+def paging_error(fields, pages, after, error=None):
+    """
+    Error for a paged fetch that stopped early: a page after the first
+    failed, or a search hit DGIDB_MAX_PAGES. The pages already collected
+    are returned with it, so callers show them but never cache them as
+    complete. None when the fetch finished.
+    """
+    if error:
+        return f"DGIdb results are incomplete: page {pages + 1} failed ({error})"
+    if after is not None and fields != "ask":
+        return f"DGIdb results are incomplete: truncated at {pages} pages of {DGIDB_PAGE_SIZE}"
+    return None
+
+
+def _query_dgidb_api(search_type, names, fields="search", on_page=None, **kwargs):
+    """Queries the live API a page at a time (or in one request if paging is off). Returns (json, error)."""
+    if _dgidb_paging["supported"]:
+        query = DGIDB_PAGE_QUERIES[(search_type, fields)]
+        first, max_pages = page_plan(fields)
+        merged = {}
+        after = None
+        for page_number in range(max_pages):
+            page, error = _post_dgidb(query, {"names": names, "first": first, "after": after}, **kwargs)
+            connection = page_connection(page, error, page_number == 0)
+            if connection is None and not _dgidb_paging["supported"]:
+                break
+            if error or connection is None:
+                error = error or "DGIdb returned no interactions"
+                if page_number == 0:
+                    return page, error
+                return paged_results(search_type, merged), paging_error(fields, page_number, after, error)
+            after = collect_page(search_type, connection, merged, on_page)
+            if after is None:
+                break
+        if _dgidb_paging["supported"]:
+            return paged_results(search_type, merged), paging_error(fields, max_pages, after)
+
+    results, error = _post_dgidb(single_dgidb_query(search_type, fields), {"names": names}, **kwargs)
+    if results is not None and not error and on_page:
+        on_page(results)
+    return results, error
+
+
+def fetch_search_results(search_type, query_value, progress_key=None):
+    """
+    Queries the upstream API for one search term. Returns (data, error) where
+    data is the {"results", "rows", "aggregates"} dict we cache. Gene/drug
+    rows are parsed page by page; with `progress_key` they are also
+    published to fetch_progress as they arrive.
+    """
+    results = None
+    rows = []
+    error = None
+
+    if search_type == 'protein':
+        try:
+            protein_json, uni_err = fetchProteinResults(query_value)
+            if uni_err:
+                error = uni_err
+            else:
+                results = protein_json
+                with metrics.span("parse"):
+                    rows = parseProteinResults(protein_json)
+        except Exception as e:
+            error = f"Failed to query UniProt: {e}"
+
+    else:  # gene → drug or drug → gene interactions
+        parse = parseGeneResults if search_type == 'gene' else parseDrugResults
+
+        def on_page(page):
+            with metrics.span("parse"):
+                page_rows = parse(page)
+            rows.extend(page_rows)
+            if progress_key is not None:
+                fetch_progress.add(progress_key, page_rows)
+
+        if progress_key is not None:
+            fetch_progress.start(progress_key)
+        try:
+            results, error = queryDgidb(search_type, [query_value], on_page=on_page)
+        finally:
+            if progress_key is not None:
+                fetch_progress.finish(progress_key)
+        # rows of pages that arrived before a failed one stay, and the error
+        # keeps the entry out of the cache
+
+    if results is None:
+        return None, error
+
+    return build_cache_entry(results, rows), error
+
+
+def fetch_batch_results(search_type, names):
+    """
+    Fetches many gene or drug names with one GraphQL request per chunk and
+    splits the response back out per name. Returns {name: (data, error)};
+    names DGIdb doesn't know get an empty entry so they are cached too.
+    """
+    root = "genes" if search_type == 'gene' else "drugs"
+    parse = parseGeneResults if search_type == 'gene' else parseDrugResults
+    out = {}
+
+    for i in range(0, len(names), BATCH_CHUNK_SIZE):
+        chunk = names[i:i + BATCH_CHUNK_SIZE]
+        results, error = queryDgidb(search_type, chunk)
+        if error:
+            for name in chunk:
+                out[name] = (None, error)
+            continue
+
+        nodes = (results.get("data", {}).get(root, {}) or {}).get("nodes", []) or []
+        by_name = {}
+        for n in nodes:
+            by_name.setdefault((n.get("name") or "").upper(), []).append(n)
+
+        for name in chunk:
+            term_results = {"data": {root: {"nodes": by_name.get(name.upper(), [])}}}
+            out[name] = (build_cache_entry(term_results, parse(term_results)), None)
+    return out
+
+
+def parse_batch_terms(raw):
+    """Split a pasted list of terms on commas, semicolons, whitespace or newlines."""
+    if isinstance(raw, (list, tuple)):
+        items = raw
+    else:
+        items = re.split(r"[,;\s]+", raw or "")
+    return [t.strip() for t in items if t and t.strip()]
+
+
+def normalize_batch_terms(search_type, terms):
+    """Normalized, de-duplicated terms in input order, capped at BATCH_MAX_TERMS."""
+    normalized = []
+    seen = set()
+    for t in terms:
+        q = normalize_term(search_type, t)
+        if q and q.upper() not in seen:
+            seen.add(q.upper())
+            normalized.append(q)
+    return normalized[:BATCH_MAX_TERMS]
+
+
+def batch_entries(search_type, normalized):
+    """
+    Cache entries for already-normalized terms: hits come from the
+    memory/DB tiers and all misses are fetched in chunked batch requests.
+    Misses go through the same coalesced flights as /search.
+    Returns (entries, term_status, errors).
+    """
+    if search_type == 'protein':
+        # UniProt has no multi-term search, so each miss is its own request
+        fetch_many = lambda qs: {q: fetch_search_results(search_type, q) for q in qs}
+    else:
+        fetch_many = lambda qs: fetch_batch_results(search_type, qs)
+
+    entries = {}
+    term_status = {}
+    errors = {}
+    resolved = search_cache.get_or_fetch_many(normalized, search_type, fetch_many)
+    for q in normalized:
+        data, error, tier = resolved[q]
+        if error or not data:
+            errors[q] = error or "No results"
+            term_status[q] = "error"
+        else:
+            entries[q] = data
+            term_status[q] = tier
+    return entries, term_status, errors
+
+
+def batch_search(search_type, terms):
+    """
+    Resolves many terms at once through batch_entries. Returns
+    (rows, term_status, errors, aggregates) with rows merged across terms in
+    input order and the terms' chart aggregates combined.
+    """
+    normalized = normalize_batch_terms(search_type, terms)
+    entries, term_status, errors = batch_entries(search_type, normalized)
+
+    rows = []
+    parts = []
+    for q in normalized:
+        if q in entries:
+            rows.extend(entries[q].get("rows", []))
+            parts.append(aggregates_for(entries[q]))
+    return rows, term_status, errors, merge_aggregates(parts)
+
+
+def batch_view(search_type, terms):
+    """
+    Merged rows of a batch for /api/search/results, reused across its page
+    requests. Returns (view_key, rows, errors); batches with failed terms
+    aren't kept, so the next page retries them.
+    """
+    normalized = normalize_batch_terms(search_type, terms)
+    view_key = search_cache.key("|".join(sorted(q.lower() for q in normalized)), "batch:" + search_type)
+    rows = batch_views.get(view_key)
+    if rows is not None:
+        return view_key, rows, {}
+    rows, _, errors, _ = batch_search(search_type, normalized)
+    if not errors:
+        batch_views.set(view_key, rows, size=8 * len(rows) + 64)
+    return view_key, rows, errors
+
+
+@app.before_request
+def _start_request_trace():
+    g.trace_token = metrics.start_trace(request.url_rule.rule if request.url_rule else "unmatched")
+
+
+@app.after_request
+def _end_request_trace(response):
+    token = g.pop("trace_token", None)
+    if token is not None:
+        metrics.end_trace(token, request.method, response.status_code)
+    return response
+
+
+@app.teardown_request
+def _abort_request_trace(exc):
+    # Only reached with a token left when the request raised before after_request
+    token = g.pop("trace_token", None)
+    if token is not None:
+        metrics.end_trace(token, request.method, 500)
+
+
+metrics.register_gauge("dgit_memory_cache_entries", "Entries in the in-process search cache.",
+                       lambda: {(): search_cache.memory.stats()["entries"]})
+metrics.register_gauge("dgit_memory_cache_bytes", "Approximate size of the in-process search cache.",
+                       lambda: {(): search_cache.memory.stats()["bytes"]})
+metrics.register_gauge("dgit_graph_edges", "Gene-drug edges in the in-process interaction graph.",
+                       lambda: {(): interaction_graph.graph.stats()["edges"]})
+metrics.register_gauge("dgit_similarity_profiles", "Drug and gene interaction profiles in the similarity index.",
+                       lambda: {(kind,): s["profiles"] for kind, s in similarity.index.stats().items()
+                                if kind in similarity.KINDS}, ("kind",))
+metrics.register_gauge("dgit_ai_cache_entries", "Entries in the Gemini response caches.",
+                       lambda: {(kind,): s["entries"] for kind, s in ai_cache_stats().items()}, ("kind",))
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    if not metrics.METRICS_ENABLED:
+        return jsonify({"error": "metrics are disabled"}), 404
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 
 @app.route('/', methods=['GET'])
 def index():
@@ -276,6 +655,41 @@ def index():
   return render_template('index.html')
 
 #search route
+# /search waits this long for an uncached gene/drug fetch before rendering the rows parsed so far
+SEARCH_PARTIAL_AFTER = float(os.getenv("SEARCH_PARTIAL_AFTER", "1.0"))
+_search_pool = ThreadPoolExecutor(max_workers=int(os.getenv("SEARCH_POOL_SIZE", "8")), thread_name_prefix="search")
+
+
+def search_progressively(search_type, query_value):
+    """
+    search_cache.get_or_fetch for /search. Returns (data, error, tier,
+    loading): a paged DGIdb fetch still running after SEARCH_PARTIAL_AFTER
+    seconds keeps filling the cache in the background while the first rows
+    come back as {"rows": [...]} with loading=True; the page then polls
+    /api/search/results until the entry is complete.
+    """
+    key = search_cache.key(query_value, search_type)
+    fetch = lambda: fetch_search_results(search_type, query_value, progress_key=key)
+    if search_type not in RELATIONAL_TYPES or DGIDB_SOURCE == "mirror" or SEARCH_PARTIAL_AFTER <= 0:
+        return (*search_cache.get_or_fetch(query_value, search_type, fetch), False)
+
+    data, tier = search_cache.get(query_value, search_type)
+    if data is not None:
+        return data, None, tier, False
+
+    future = _search_pool.submit(contextvars.copy_context().run, _in_app_context,
+                                 search_cache.get_or_fetch, query_value, search_type, fetch)
+    future.add_done_callback(lambda _: fetch_progress.notify())
+    try:
+        return (*future.result(timeout=SEARCH_PARTIAL_AFTER), False)
+    except FutureTimeout:
+        pass
+    rows = fetch_progress.wait_for_rows(key, future.done)
+    if future.done() or not rows:
+        return (*future.result(), False)
+    return {"rows": rows}, None, "upstream", True
+
+
 @app.route('/search', methods=['GET', 'POST'])
 def search():
     results = None
@@ -283,6 +697,8 @@ def search():
     mdd_list = None
 
     rows = []
+    aggregates = None
+    loading = False
     search_type = None
     query_value = ""
 
@@ -307,137 +723,339 @@ def search():
                     error = "Invalid type selected."
 
             else:
-                
-                # CHECK DATABASE CACHE FIRST
-                cached = get_cached_results(query_value, search_type)
-                if cached:
-                    print("Using cached DB results for:", query_value)
-                    results = cached.get("results")
-                    rows = cached.get("rows", [])
-                    interaction_types = cached.get("interaction_types", [])
-                    return render_template(
-                        'search.html',
-                        results=results,
-                        error=None,
-                        mdd_list=None,
-                        search_type=search_type,
-                        query=query_value,
-                        rows=rows,
-                        interaction_types=interaction_types
-                    )
+                # CHECK CACHE FIRST (memory, then DB), OTHERWISE CALL API
+                data, error, tier, loading = search_progressively(search_type, query_value)
+                metrics.annotate(search_type=search_type, query=query_value, tier=tier, partial=loading)
+                if data:
+                    rows = data.get("rows", [])
+                    results = data.get("results") or {"partial": True, "interactions_so_far": len(rows)}
+                    aggregates = aggregates_for(data)
 
-                
-                # IF NOT CACHED, CALL API
-                print("No cache found. Querying external API...")
-
-                if search_type == 'gene':  # Gene → Drug interactions
-                    query = """
-                    query($names: [String!]!) {
-                      genes(names: $names) {
-                        nodes {
-                          interactions {
-                            drug { name conceptId }
-                            interactionScore
-                            interactionTypes { type directionality }
-                            publications { pmid }
-                            sources { sourceDbName }
-                          }
-                        }
-                      }
-                    }
-                    """
-                    variables = {"names": [query_value]}
-
-                    try:
-                        response = requests.post(DGIDB_API_URL, json={"query": query, "variables": variables}, timeout=20)
-                        response.raise_for_status()
-                        results = response.json()
-
-                        if not results.get("errors"):
-                            rows = parseGeneResults(results)
-                        else:
-                            error = results["errors"][0].get("message", "GraphQL error")
-
-                    except requests.RequestException as e:
-                        error = f"Failed to query DGIdb API: {e}"
-
-                elif search_type == 'protein':
-                    try:
-                        protein_json, uni_err = fetchProteinResults(query_value)
-                        if uni_err:
-                            error = uni_err
-                        else:
-                            results = protein_json
-                            rows = parseProteinResults(protein_json)
-                    except Exception as e:
-                        error = f"Failed to query UniProt: {e}"
-
-                else:  # drug-based search
-                    query = """
-                    query($names: [String!]!) {
-                      drugs(names: $names) {
-                        nodes {
-                          interactions {
-                            gene {
-                              name
-                              conceptId
-                              longName
-                            }
-                            interactionScore
-                            interactionTypes { type directionality }
-                            publications { pmid }
-                            sources { sourceDbName }
-                          }
-                        }
-                      }
-                    }
-                    """
-                    variables = {"names": [query_value]}
-
-                    try:
-                        response = requests.post(DGIDB_API_URL, json={"query": query, "variables": variables}, timeout=20)
-                        response.raise_for_status()
-                        results = response.json()
-
-                        if not results.get("errors"):
-                            rows = parseDrugResults(results)
-                        else:
-                            error = results["errors"][0].get("message", "GraphQL error")
-
-                    except requests.RequestException as e:
-                        error = f"Failed to query DGIdb API: {str(e)}"
+    # Charts are drawn from the entry's precomputed aggregates, not from the rows
+    if aggregates is None:
+        aggregates = build_aggregates([])
 
+    with metrics.span("render"):
+        return render_template(
+            'search.html',
+            results=results,
+            error=error,
+            mdd_list=mdd_list,
+            search_type=search_type,
+            query=query_value,
+            rows=rows,
+            aggregates=aggregates,
+            type_counts=aggregates["type_counts"],
+            loading=loading
+        )
 
-                
-                # 3. SAVE RESULTS TO CACHE
-                if results and not error:
-                    interaction_types = []
-                    for r in rows:
-                        interaction_types.extend(r.get("interaction_type_list", []))
-
-                    data_to_save = {
-                        "results": results,
-                        "rows": rows,
-                        "interaction_types": interaction_types
-                    }
-
-                    save_results(query_value, search_type, data_to_save)
-                    print("Saved new results to DB cache")
-
-    # Collect types for visualization
-    interaction_types = []
-    for r in rows:
-        interaction_types.extend(r.get("interaction_type_list", []))
+# batch search: many genes/drugs/proteins in one submission
+@app.route('/search/batch', methods=['POST'])
+def search_batch():
+    search_type = request.form.get('type')
+    terms = parse_batch_terms(request.form.get('queries', ''))
+
+    if search_type not in ('gene', 'drug', 'protein'):
+        return render_template('search.html', results=None, error="Please select a type.",
+                               mdd_list=None, search_type=None, query="", rows=[], type_counts={})
+    if not terms:
+        return render_template('search.html', results=None, error="Please enter at least one term.",
+                               mdd_list=None, search_type=search_type, query="", rows=[], type_counts={})
+
+    rows, term_status, errors, aggregates = batch_search(search_type, terms)
+
+    error = None
+    if errors:
+        error = "; ".join(f"{q}: {msg}" for q, msg in errors.items())
 
     return render_template(
         'search.html',
-        results=results,
+        results={"terms": term_status, "errors": errors},
         error=error,
-        mdd_list=mdd_list,
+        mdd_list=None,
         search_type=search_type,
-        query=query_value,
+        query=", ".join(term_status.keys()),
         rows=rows,
-        interaction_types=interaction_types
+        aggregates=aggregates,
+        type_counts=aggregates["type_counts"],
+        batch_terms=term_status
+    )
+
+@app.route('/api/search/batch', methods=['POST'])
+def api_search_batch():
+    data = request.get_json(silent=True) or {}
+    search_type = data.get('type')
+    terms = parse_batch_terms(data.get('queries'))
+
+    if search_type not in ('gene', 'drug', 'protein'):
+        return jsonify({"error": "type must be one of gene, drug, protein"}), 400
+    if not terms:
+        return jsonify({"error": "No queries provided"}), 400
+
+    rows, term_status, errors, _ = batch_search(search_type, terms)
+    return jsonify({
+        "type": search_type,
+        "terms": term_status,
+        "errors": errors,
+        "count": len(rows),
+        "rows": rows
+    })
+
+# one page of a gene/drug search's interaction rows; the search page fetches these instead of embedding every row
+@app.route('/api/search/results', methods=['GET'])
+def api_search_results():
+    search_type = request.args.get('type')
+    raw_query = request.args.get('q', '').strip()
+    batch = request.args.get('batch') in ('1', 'true')
+
+    if search_type not in RELATIONAL_TYPES:
+        return jsonify({"error": "type must be gene or drug"}), 400
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 25))
+    except ValueError:
+        return jsonify({"error": "page and per_page must be integers"}), 400
+
+    errors = {}
+    data = None
+    complete = True
+    if batch:
+        terms = parse_batch_terms(raw_query)
+        if not terms:
+            return jsonify({"error": "No query provided"}), 400
+        view_key, rows, errors = batch_view(search_type, terms)
+        query_value = ", ".join(terms)
+    else:
+        query_value = normalize_term(search_type, raw_query)
+        if not query_value:
+            return jsonify({"error": "No query provided"}), 400
+        view_key = search_cache.key(query_value, search_type)
+        # rows of a fetch /search left running; the page polls until it completes
+        partial = fetch_progress.rows(view_key)
+        if partial is not None:
+            rows, view_key, complete = partial, None, False
+        else:
+            data, error, _ = search_cache.get_or_fetch(
+                query_value, search_type,
+                lambda: fetch_search_results(search_type, query_value)
+            )
+            if error and not data:
+                return jsonify({"error": error}), 502
+            if error:
+                # rows of an incomplete fetch: shown, flagged, and not cached
+                errors[query_value] = error
+            rows = (data or {}).get("rows", [])
+
+    result = page_rows(
+        rows, view_key,
+        filter_text=request.args.get('filter', ''),
+        sort=request.args.get('sort'),
+        order=request.args.get('order', 'desc'),
+        page=page,
+        per_page=per_page
+    )
+    left, right = ("Gene", "Drug") if search_type == 'gene' else ("Drug", "Gene")
+    result.update({"type": search_type, "query": query_value, "left_label": left, "right_label": right,
+                   "complete": complete})
+    # a page rendered from partial rows redraws its charts once the entry is complete
+    if complete and data and request.args.get('aggregates') == '1':
+        result["aggregates"] = aggregates_for(data)
+    if errors:
+        result["errors"] = errors
+    return jsonify(result)
+
+# full result tables for one or more terms, streamed for downstream analysis
+@app.route('/api/search/export', methods=['GET'])
+def api_search_export():
+    search_type = request.args.get('type')
+    fmt = request.args.get('format', 'csv')
+    terms = normalize_batch_terms(search_type, parse_batch_terms(request.args.get('q', '')))
+
+    if search_type not in ('gene', 'drug', 'protein'):
+        return jsonify({"error": "type must be one of gene, drug, protein"}), 400
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": "format must be one of " + ", ".join(EXPORT_FORMATS)}), 400
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({"error": "Parquet export needs pyarrow installed"}), 501
+    if not terms:
+        return jsonify({"error": "No query provided"}), 400
+
+    body = stream_export(
+        fmt, search_type, terms,
+        lambda q: (lambda: fetch_search_results(search_type, q))
+    )
+    label = re.sub(r"[^A-Za-z0-9_.-]", "_", terms[0]) if len(terms) == 1 else "batch"
+    filename = f"dgit-{search_type}-{label}.{fmt}"
+    return Response(stream_with_context(body), mimetype=MIMETYPES[fmt], headers={
+        "Content-Disposition": f'attachment; filename="{filename}"'
+    })
+
+# interactions we already hold locally, e.g. a drug's genes learned from earlier gene searches
+@app.route('/api/interactions', methods=['GET'])
+def api_local_interactions():
+    search_type = request.args.get('type')
+    query_value = normalize_term(search_type, request.args.get('q', '').strip())
+
+    if search_type not in RELATIONAL_TYPES:
+        return jsonify({"error": "type must be gene or drug"}), 400
+    if not query_value:
+        return jsonify({"error": "No query provided"}), 400
+
+    data = load_interactions(search_type, [query_value])
+    if data is None:
+        return jsonify({"error": "Interaction store unavailable"}), 503
+    return jsonify({
+        "type": search_type,
+        "query": query_value,
+        "source": "local",
+        "count": len(data["rows"]),
+        "rows": data["rows"]
+    })
+
+def _int_arg(name, default, low, high):
+    try:
+        return max(low, min(int(request.args.get(name, default)), high))
+    except ValueError:
+        return default
+
+
+# multi-hop queries over every stored interaction; each returns a graph the search page's network view draws
+@app.route('/api/graph/neighborhood', methods=['GET'])
+def api_graph_neighborhood():
+    search_type = request.args.get('type')
+    query_value = normalize_term(search_type, request.args.get('q', '').strip())
+    if search_type not in RELATIONAL_TYPES:
+        return jsonify({"error": "type must be gene or drug"}), 400
+    if not query_value:
+        return jsonify({"error": "No query provided"}), 400
+
+    interaction_graph.graph.ensure_loaded()
+    with metrics.span("graph"):
+        result = interaction_graph.graph.neighborhood(
+            GRAPH_KINDS[search_type], query_value,
+            hops=_int_arg('hops', 2, 1, 2),
+            limit=_int_arg('limit', interaction_graph.DEFAULT_NEIGHBORS, 1, interaction_graph.MAX_NEIGHBORS)
+        )
+    if result is None:
+        return jsonify({"error": f"No stored interactions for {query_value}; search for it first"}), 404
+    return jsonify(result)
+
+@app.route('/api/graph/shared', methods=['GET'])
+def api_graph_shared():
+    search_type = request.args.get('type')
+    if search_type not in RELATIONAL_TYPES:
+        return jsonify({"error": "type must be gene or drug"}), 400
+    terms = [normalize_term(search_type, t) for t in parse_batch_terms(request.args.get('q', ''))]
+    if len(terms) < 2:
+        return jsonify({"error": "Provide at least two names"}), 400
+
+    interaction_graph.graph.ensure_loaded()
+    with metrics.span("graph"):
+        result, unknown = interaction_graph.graph.shared_partners(
+            GRAPH_KINDS[search_type], terms,
+            min_shared=_int_arg('min', 2, 1, len(terms)),
+            limit=_int_arg('limit', interaction_graph.DEFAULT_NEIGHBORS, 1, interaction_graph.MAX_NEIGHBORS)
+        )
+    if unknown:
+        result["unknown"] = unknown
+    return jsonify(result)
+
+@app.route('/api/graph/path', methods=['GET'])
+def api_graph_path():
+    gene = normalize_term('gene', request.args.get('gene', '').strip())
+    drug = normalize_term('drug', request.args.get('drug', '').strip())
+    if not gene or not drug:
+        return jsonify({"error": "gene and drug are required"}), 400
+
+    interaction_graph.graph.ensure_loaded()
+    with metrics.span("graph"):
+        result = interaction_graph.graph.shortest_path(
+            gene, drug, max_hops=_int_arg('max_hops', interaction_graph.MAX_PATH_HOPS, 1, interaction_graph.MAX_PATH_HOPS)
+        )
+    if result is None:
+        return jsonify({"error": f"No stored interactions for {gene} or {drug}"}), 404
+    return jsonify(result)
+
+@app.route('/api/graph/stats', methods=['GET'])
+def api_graph_stats():
+    interaction_graph.graph.ensure_loaded()
+    return jsonify(interaction_graph.graph.stats())
+
+# drugs (or genes) ranked by how much of their interaction profile they share; the MDD panels are precomputed
+@app.route('/api/similar', methods=['GET'])
+def api_similar():
+    search_type = request.args.get('type')
+    if search_type not in similarity.KINDS:
+        return jsonify({"error": "type must be gene or drug"}), 400
+    metric = request.args.get('metric', 'cosine')
+    if metric not in similarity.METRICS:
+        return jsonify({"error": f"metric must be one of {', '.join(similarity.METRICS)}"}), 400
+    terms = normalize_batch_terms(search_type, parse_batch_terms(request.args.get('q', '')))
+    if not terms:
+        terms = MDD_DRUGS if search_type == 'drug' else MDD_GENES
+
+    similarity.index.ensure_loaded()
+    with metrics.span("similarity"):
+        results, unknown = similarity.index.similar(
+            search_type, terms,
+            k=_int_arg('k', similarity.DEFAULT_K, 1, similarity.MAX_K),
+            metric=metric
+        )
+    response = {"type": search_type, "metric": metric, "results": results}
+    if unknown:
+        response["unknown"] = unknown
+    return jsonify(response)
+
+@app.route('/api/similar/compare', methods=['GET'])
+def api_similar_compare():
+    search_type = request.args.get('type')
+    if search_type not in similarity.KINDS:
+        return jsonify({"error": "type must be gene or drug"}), 400
+    a = normalize_term(search_type, request.args.get('a', '').strip())
+    b = normalize_term(search_type, request.args.get('b', '').strip())
+    if not a or not b:
+        return jsonify({"error": "a and b are required"}), 400
+
+    similarity.index.ensure_loaded()
+    with metrics.span("similarity"):
+        result = similarity.index.compare(search_type, a, b)
+    if result is None:
+        return jsonify({"error": f"No stored interactions for {a} or {b}; search for them first"}), 404
+    return jsonify(result)
+
+@app.route('/api/similar/stats', methods=['GET'])
+def api_similar_stats():
+    similarity.index.ensure_loaded()
+    return jsonify(similarity.index.stats())
+
+def panel_terms(search_type, raw, default):
+    """Normalized terms from a comma/newline list, or the default panel when empty."""
+    terms = normalize_batch_terms(search_type, parse_batch_terms(raw))
+    return terms or list(default)
+
+
+# every interaction between a gene panel and a drug panel, from the genes' cached entries
+@app.route('/api/matrix', methods=['GET'])
+def api_matrix():
+    genes = panel_terms('gene', request.args.get('genes', ''), MDD_GENES)
+    drugs = panel_terms('drug', request.args.get('drugs', ''), MDD_DRUGS)
+    if len(genes) > MATRIX_MAX_TERMS or len(drugs) > MATRIX_MAX_TERMS:
+        return jsonify({"error": f"At most {MATRIX_MAX_TERMS} genes and {MATRIX_MAX_TERMS} drugs"}), 400
+
+    entries, term_status, errors = batch_entries('gene', genes)
+    with metrics.span("matrix"):
+        matrix = build_matrix(genes, drugs, entries)
+    matrix["terms"] = term_status
+    if errors:
+        matrix["errors"] = errors
+    return jsonify(matrix)
+
+@app.route('/matrix', methods=['GET'])
+def matrix_page():
+    return render_template(
+        'matrix.html',
+        genes=panel_terms('gene', request.args.get('genes', ''), MDD_GENES),
+        drugs=panel_terms('drug', request.args.get('drugs', ''), MDD_DRUGS)
     )
 
 # @app.route('/nav', methods=['GET'])
@@ -446,6 +1064,25 @@ def search():
 #       return render_template('nav.html')
 #   return render_template('nav.html')
 
+# prefix suggestions for the search box; canonical terms keep spelling variants on one cache entry
+@app.route('/autocomplete', methods=['GET'])
+def autocomplete():
+    search_type = request.args.get('type', 'gene')
+    if search_type not in ('gene', 'drug', 'protein'):
+        return jsonify({"error": "type must be one of gene, drug, protein"}), 400
+    try:
+        limit = min(int(request.args.get('limit', 10)), MAX_SUGGESTIONS)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    prefix = request.args.get('q', '')
+    response = jsonify({
+        "type": search_type,
+        "q": prefix,
+        "suggestions": term_resolver.complete(search_type, prefix, limit)
+    })
+    response.headers["Cache-Control"] = "public, max-age=3600"
+    return response
+
 # About page of DGIT
 @app.route('/about', methods=['GET'])
 def about():
@@ -483,42 +1120,162 @@ def contact():
 def db():
     return render_template('db.html')
 
+# Database page API: everything reads search_cache metadata columns, never the payloads
+CACHE_ADMIN_TOKEN = os.getenv("CACHE_ADMIN_TOKEN")
+CACHE_TYPES = ('gene', 'drug', 'protein')
+EXPORT_FIELDS = ["query", "search_type", "result_count", "payload_bytes", "created_at", "refreshed_at", "expires_at"]
+
+
+def _cache_type_arg():
+    search_type = request.args.get('type') or None
+    return search_type if search_type in CACHE_TYPES else None
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def api_cache_stats():
+    stats = cache_stats()
+    if stats is None:
+        return jsonify({"error": "Database unavailable"}), 503
+    stats["memory"] = search_cache.stats()
+    return jsonify(stats)
+
+
+@app.route('/api/cache/entries', methods=['GET'])
+def api_cache_entries():
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = max(1, min(int(request.args.get('per_page', 25)), 500))
+    except ValueError:
+        return jsonify({"error": "page and per_page must be integers"}), 400
+
+    sort = request.args.get('sort', 'timestamp')
+    order = 'asc' if request.args.get('order') == 'asc' else 'desc'
+    listing = list_cache_entries(_cache_type_arg(), request.args.get('q', ''), sort, order,
+                                 limit=per_page, offset=(page - 1) * per_page)
+    if listing is None:
+        return jsonify({"error": "Database unavailable"}), 503
+
+    matched, entries = listing
+    return jsonify({
+        "matched": matched,
+        "page": page,
+        "per_page": per_page,
+        "pages": max(1, -(-matched // per_page)),
+        "sort": sort,
+        "order": order,
+        "entries": entries
+    })
+
+
+@app.route('/api/cache/export', methods=['GET'])
+def api_cache_export():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+    entries = iter_cache_entries(_cache_type_arg(), request.args.get('q', ''))
+
+    def generate_csv():
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for entry in entries:
+            writer.writerow(entry)
+            if buf.tell() > 64 * 1024:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    def generate_ndjson():
+        for entry in entries:
+            yield json.dumps({k: entry[k] for k in EXPORT_FIELDS}) + "\n"
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    body = generate_csv() if fmt == 'csv' else generate_ndjson()
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename=dgit-cache.{fmt}"
+    })
+
+
+@app.route('/api/cache/purge', methods=['POST'])
+def api_cache_purge():
+    if CACHE_ADMIN_TOKEN and request.headers.get('X-Admin-Token') != CACHE_ADMIN_TOKEN:
+        return jsonify({"error": "Forbidden"}), 403
+
+    data = request.get_json(silent=True) or {}
+    scope = data.get('scope', 'expired')
+    if scope not in ('expired', 'all'):
+        return jsonify({"error": "scope must be expired or all"}), 400
+    search_type = data.get('type') if data.get('type') in CACHE_TYPES else None
+
+    removed = purge_entries(expired_only=(scope == 'expired'), search_type=search_type)
+    if scope == 'all':
+        # The memory tier would otherwise keep serving what was just deleted
+        search_cache.memory.clear()
+    return jsonify({"scope": scope, "type": search_type, "removed": removed})
+
+# Overall time allowed for the chatbot's context lookups before answering with what we have
+ASK_CONTEXT_BUDGET = float(os.getenv("ASK_CONTEXT_BUDGET", "8"))
+_ask_pool = ThreadPoolExecutor(max_workers=int(os.getenv("ASK_POOL_SIZE", "16")), thread_name_prefix="ask")
+
+
+def fetch_ask_interactions(gene_name):
+    """Top DGIdb interactions for the chatbot context, or None."""
+    try:
+        results, error = queryDgidb('gene', [gene_name], fields="ask", timeout=(5, 15))
+        if results is not None and not error:
+            return parseInteractionResults(results, 'gene', limit=DGIDB_ASK_ROWS)
+    except Exception:
+        pass
+    return None
+
+
+def _in_app_context(fn, *args):
+    # pool threads need their own app context for the MySQL-backed caches
+    with app.app_context():
+        return fn(*args)
+
+
+def _submit(fn, *args):
+    # carry the request's trace into the pool thread so its spans are attributed to /ask
+    return _ask_pool.submit(contextvars.copy_context().run, fn, *args)
+
+
+def gather_ask_context(question, gene_name, budget=ASK_CONTEXT_BUDGET):
+    """
+    Runs the DGIdb lookup, the NCBI summary and the scope classifier
+    concurrently and waits at most `budget` seconds for all of them. Lookups
+    that fail or miss the deadline come back as None (scope as
+    SCOPE_UNAVAILABLE) so the answer is built from whatever arrived.
+    """
+    tasks = {}
+    if gene_name:
+        tasks["interactions"] = _submit(_in_app_context, fetch_ask_interactions, gene_name)
+        tasks["ncbi_summary"] = _submit(_in_app_context, fetch_ncbi_summary, gene_name)
+    if needs_scope_check(question):
+        tasks["scope"] = _submit(classify_scope_safe, question)
+
+    done, _ = wait(tasks.values(), timeout=budget)
+
+    context = {"interactions": None, "ncbi_summary": None, "scope": None}
+    for name, fut in tasks.items():
+        if fut in done and fut.exception() is None:
+            context[name] = fut.result()
+        else:
+            print(f"/ask: {name} lookup missed the {budget}s budget")
+    if "scope" in tasks and context["scope"] is None:
+        context["scope"] = SCOPE_UNAVAILABLE
+    return context
+
+
 @app.route("/ask", methods=["POST"])
 def ask():
     data = request.get_json()
     question = data.get("question")
 
     gene_name = extract_gene_from_question(question)
-    interactions = None
-    ncbi_summary = None
-
-    if gene_name:
-        query = """
-        query($names: [String!]!) {
-          genes(names: $names) {
-            nodes {
-              name
-              interactions {
-                drug { name conceptId }
-                interactionScore
-                interactionTypes { type directionality }
-                sources { sourceDbName }
-              }
-            }
-          }
-        }
-        """
-        variables = {"names": [gene_name]}
-        try:
-            resp = requests.post(DGIDB_API_URL, json={"query": query, "variables": variables}, timeout=15)
-            resp.raise_for_status()
-            results = resp.json()
-            if not results.get("errors"):
-                interactions = parseGeneResults(results)[:5]
-        except:
-            interactions = None
-
-        ncbi_summary = fetch_ncbi_summary(gene_name)
+    with metrics.span("context"):
+        context = gather_ask_context(question, gene_name)
 
     # Pass project MDD lists so the AI can prefer MDD-related examples when listing
     mdd_ctx = {
@@ -526,7 +1283,9 @@ def ask():
         'proteins': MDD_PROTEINS,
         'drugs': MDD_DRUGS,
     }
-    answer = ask_ai_google(question, interactions, ncbi_summary, mdd_context=mdd_ctx)
+    with metrics.span("answer"):
+        answer = ask_ai_google(question, context["interactions"], context["ncbi_summary"],
+                               mdd_context=mdd_ctx, scope_decision=context["scope"])
     return jsonify({"answer": answer})
 
 @app.post('/details')
@@ -0,0 +1,372 @@
+"""
+ASGI entry point. POST /search, /ask and /details run as coroutines on the
+event loop with an async HTTP client, so slow DGIdb/UniProt/NCBI responses
+don't each pin a worker; every other route is served by the Flask app
+through asgiref's WSGI adapter.
+
+    uvicorn asgi:application --workers 2
+"""
+import asyncio
+import contextvars
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import httpx
+from asgiref.wsgi import WsgiToAsgi
+from flask import render_template
+
+import app as dgit
+import async_upstream
+import dgidb_mirror
+import metrics
+import ncbi
+from ai_helper import ask_ai_google, needs_scope_check, classify_scope_safe, SCOPE_UNAVAILABLE
+from cache import search_cache
+from chart_aggregates import aggregates_for, build_aggregates
+from result_pages import fetch_progress
+
+flask_app = dgit.app
+_wsgi = WsgiToAsgi(flask_app)
+
+# MySQL and Gemini calls are blocking; they run on bounded thread pools so the
+# event loop stays free for upstream I/O
+_db_pool = ThreadPoolExecutor(max_workers=int(os.getenv("ASGI_DB_THREADS", "16")),
+                              thread_name_prefix="asgi-db")
+_ai_pool = ThreadPoolExecutor(max_workers=int(os.getenv("ASGI_AI_THREADS", "64")),
+                              thread_name_prefix="asgi-ai")
+
+
+async def run_blocking(fn, *args):
+    """Run a blocking DB call in the DB pool inside a Flask app context."""
+    def call():
+        with flask_app.app_context():
+            return fn(*args)
+    # copy the context so spans recorded in the pool thread land on this request's trace
+    return await asyncio.get_running_loop().run_in_executor(_db_pool, contextvars.copy_context().run, call)
+
+
+async def run_ai(fn, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(
+        _ai_pool, contextvars.copy_context().run, lambda: fn(*args, **kwargs))
+
+
+# ---- async upstream fetchers (mirror the sync ones in app.py) ----
+
+async def query_dgidb_async(search_type, names, fields="search", on_page=None):
+    """Async queryDgidb. Returns (json, error)."""
+    if dgit.DGIDB_SOURCE == "api":
+        return await _query_dgidb_api_async(search_type, names, fields, on_page)
+    mirrored, missing = await run_blocking(dgidb_mirror.query, search_type, names)
+    if mirrored is not None and on_page:
+        on_page(mirrored)
+    if dgit.DGIDB_SOURCE == "mirror":
+        return (mirrored, None) if mirrored is not None else (None, "DGIdb mirror unavailable")
+    if not missing:
+        return mirrored, None
+    fetched, error = await _query_dgidb_api_async(search_type, missing, fields, on_page)
+    return dgidb_mirror.merge(search_type, mirrored, fetched), error
+
+
+async def _post_dgidb_async(query, variables):
+    try:
+        resp = await async_upstream.post(dgit.DGIDB_API_URL, json={"query": query, "variables": variables})
+        rejected = dgit.graphql_rejection(resp)
+        if rejected is not None:
+            return rejected
+        resp.raise_for_status()
+        with metrics.span("decode"):
+            results = resp.json()
+        if results.get("errors"):
+            return results, results["errors"][0].get("message", "GraphQL error")
+        return results, None
+    except httpx.HTTPError as e:
+        return None, f"Failed to query DGIdb API: {e}"
+
+
+async def _query_dgidb_api_async(search_type, names, fields="search", on_page=None):
+    if dgit._dgidb_paging["supported"]:
+        query = dgit.DGIDB_PAGE_QUERIES[(search_type, fields)]
+        first, max_pages = dgit.page_plan(fields)
+        merged = {}
+        after = None
+        for page_number in range(max_pages):
+            page, error = await _post_dgidb_async(query, {"names": names, "first": first, "after": after})
+            connection = dgit.page_connection(page, error, page_number == 0)
+            if connection is None and not dgit._dgidb_paging["supported"]:
+                break
+            if error or connection is None:
+                error = error or "DGIdb returned no interactions"
+                if page_number == 0:
+                    return page, error
+                return dgit.paged_results(search_type, merged), dgit.paging_error(fields, page_number, after, error)
+            after = dgit.collect_page(search_type, connection, merged, on_page)
+            if after is None:
+                break
+        if dgit._dgidb_paging["supported"]:
+            return dgit.paged_results(search_type, merged), dgit.paging_error(fields, max_pages, after)
+
+    results, error = await _post_dgidb_async(dgit.single_dgidb_query(search_type, fields), {"names": names})
+    if results is not None and not error and on_page:
+        on_page(results)
+    return results, error
+
+
+async def fetch_protein_async(protein_name):
+    try:
+        resp = await async_upstream.get(dgit.UNIPROT_SEARCH_URL, params=dgit.uniprotParams(protein_name),
+                                        headers=dgit.UNIPROT_HEADERS)
+        resp.raise_for_status()
+        return resp.json(), None
+    except httpx.HTTPStatusError as e:
+        body_snip = (e.response.text or "")[:300]
+        return None, f"UniProt HTTP error {e.response.status_code} at {e.request.url}: {e}. Body: {body_snip}"
+    except httpx.HTTPError as e:
+        return None, f"UniProt request failed: {e}"
+
+
+async def fetch_search_results_async(search_type, query_value, progress_key=None):
+    """Async fetch_search_results. Returns (data, error)."""
+    rows = []
+    if search_type == 'protein':
+        results, error = await fetch_protein_async(query_value)
+        if results is not None and not error:
+            with metrics.span("parse"):
+                rows = dgit.parseProteinResults(results)
+    else:
+        parse = dgit.parseGeneResults if search_type == 'gene' else dgit.parseDrugResults
+
+        def on_page(page):
+            with metrics.span("parse"):
+                page_rows = parse(page)
+            rows.extend(page_rows)
+            if progress_key is not None:
+                fetch_progress.add(progress_key, page_rows)
+
+        if progress_key is not None:
+            fetch_progress.start(progress_key)
+        try:
+            results, error = await query_dgidb_async(search_type, [query_value], on_page=on_page)
+        finally:
+            if progress_key is not None:
+                fetch_progress.finish(progress_key)
+        # as in fetch_search_results, rows of an incomplete fetch stay with its error
+
+    if results is None:
+        return None, error
+    return dgit.build_cache_entry(results, rows), error
+
+
+async def fetch_ncbi_summary_async(term):
+    # E-utilities are rate limited per client, so the cached, throttled sync
+    # lookup runs on the DB pool; memory hits are answered on the loop
+    hit, description = ncbi.cached_summary(term)
+    if hit:
+        return description
+    return await run_blocking(ncbi.fetch_ncbi_summary, term)
+
+
+# ---- routes ----
+
+# fetches /search left running after rendering their first rows
+_background = set()
+
+
+async def search_progressively_async(search_type, query_value):
+    """Async app.search_progressively. Returns (data, error, tier, loading)."""
+    key = search_cache.key(query_value, search_type)
+    task = asyncio.ensure_future(search_cache.aget_or_fetch(
+        query_value, search_type,
+        lambda: fetch_search_results_async(search_type, query_value, progress_key=key),
+        run_blocking
+    ))
+    if search_type not in dgit.RELATIONAL_TYPES or dgit.DGIDB_SOURCE == "mirror" or dgit.SEARCH_PARTIAL_AFTER <= 0:
+        return (*await task, False)
+
+    await asyncio.wait({task}, timeout=dgit.SEARCH_PARTIAL_AFTER)
+    while not task.done():
+        rows = fetch_progress.rows(key)
+        if rows:
+            _background.add(task)
+            task.add_done_callback(_background.discard)
+            return {"rows": rows}, None, "upstream", True
+        await asyncio.wait({task}, timeout=0.05)
+    return (*task.result(), False)
+
+
+def _render_search(form, **context):
+    with flask_app.test_request_context('/search', method='POST', data=form):
+        return render_template('search.html', **context)
+
+
+async def search_route(body):
+    form = {k: v[0] for k, v in parse_qs(body.decode("utf-8")).items()}
+    results = None
+    error = None
+    mdd_list = None
+    rows = []
+    aggregates = None
+    loading = False
+
+    search_type = form.get('type')
+    query_value = dgit.normalize_term(search_type, form.get('query', '').strip())
+
+    if not search_type:
+        error = "Please select a type."
+    elif query_value == '':
+        mdd_list = {"gene": dgit.MDD_GENES, "protein": dgit.MDD_PROTEINS, "drug": dgit.MDD_DRUGS}.get(search_type)
+        if mdd_list is None:
+            error = "Invalid type selected."
+    else:
+        data, error, tier, loading = await search_progressively_async(search_type, query_value)
+        metrics.annotate(search_type=search_type, query=query_value, tier=tier, partial=loading)
+        if data:
+            rows = data.get("rows", [])
+            results = data.get("results") or {"partial": True, "interactions_so_far": len(rows)}
+            aggregates = aggregates_for(data)
+
+    if aggregates is None:
+        aggregates = build_aggregates([])
+
+    with metrics.span("render"):
+        html = _render_search(
+            form,
+            results=results,
+            error=error,
+            mdd_list=mdd_list,
+            search_type=search_type,
+            query=query_value,
+            rows=rows,
+            aggregates=aggregates,
+            type_counts=aggregates["type_counts"],
+            loading=loading
+        )
+    return 200, html.encode("utf-8"), "text/html; charset=utf-8"
+
+
+def _mdd_context():
+    return {
+        'genes': dgit.MDD_GENES,
+        'proteins': dgit.MDD_PROTEINS,
+        'drugs': dgit.MDD_DRUGS,
+    }
+
+
+async def _dgidb_interactions_async(gene_name):
+    results, error = await query_dgidb_async('gene', [gene_name], fields="ask")
+    if results is None or error:
+        return None
+    return dgit.parseInteractionResults(results, 'gene', limit=dgit.DGIDB_ASK_ROWS)
+
+
+async def _within(coro, budget):
+    try:
+        return await asyncio.wait_for(coro, budget)
+    except Exception:
+        return None
+
+
+async def gather_ask_context_async(question, gene_name, budget=None):
+    """Async gather_ask_context: same deadline and partial-result rules."""
+    budget = dgit.ASK_CONTEXT_BUDGET if budget is None else budget
+    lookups = {}
+    if gene_name:
+        lookups["interactions"] = _dgidb_interactions_async(gene_name)
+        lookups["ncbi_summary"] = fetch_ncbi_summary_async(gene_name)
+    if needs_scope_check(question):
+        lookups["scope"] = run_ai(classify_scope_safe, question)
+
+    values = await asyncio.gather(*(_within(c, budget) for c in lookups.values()))
+
+    context = {"interactions": None, "ncbi_summary": None, "scope": None}
+    context.update(zip(lookups.keys(), values))
+    if "scope" in lookups and context["scope"] is None:
+        context["scope"] = SCOPE_UNAVAILABLE
+    return context
+
+
+async def ask_route(body):
+    data = json.loads(body or b"{}")
+    question = data.get("question")
+
+    gene_name = dgit.extract_gene_from_question(question)
+    with metrics.span("context"):
+        context = await gather_ask_context_async(question, gene_name)
+
+    with metrics.span("answer"):
+        answer = await run_ai(ask_ai_google, question, context["interactions"], context["ncbi_summary"],
+                              mdd_context=_mdd_context(), scope_decision=context["scope"])
+    return 200, json.dumps({"answer": answer}).encode("utf-8"), "application/json"
+
+
+async def details_route(body):
+    data = json.loads(body or b"{}")
+    query = data.get('query')
+    if not query:
+        return 400, json.dumps({"answer": "No query provided"}).encode("utf-8"), "application/json"
+
+    answer = await run_ai(ask_ai_google, query, mdd_context=_mdd_context())
+    return 200, json.dumps({"answer": answer}).encode("utf-8"), "application/json"
+
+
+ASYNC_ROUTES = {
+    ("POST", "/search"): search_route,
+    ("POST", "/ask"): ask_route,
+    ("POST", "/details"): details_route,
+}
+
+
+# ---- ASGI plumbing ----
+
+async def _read_body(receive):
+    body = b""
+    more = True
+    while more:
+        message = await receive()
+        body += message.get("body", b"")
+        more = message.get("more_body", False)
+    return body
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await async_upstream.aclose_all()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+
+    handler = ASYNC_ROUTES.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+    if handler is None:
+        await _wsgi(scope, receive, send)
+        return
+
+    token = metrics.start_trace(scope["path"])
+    status = 500
+    try:
+        body = await _read_body(receive)
+        try:
+            status, payload, content_type = await handler(body)
+        except json.JSONDecodeError:
+            status, payload, content_type = 400, b'{"error": "Invalid JSON body"}', "application/json"
+    finally:
+        metrics.end_trace(token, scope["method"], status)
+
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type.encode("latin-1")),
+            (b"content-length", str(len(payload)).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": payload})
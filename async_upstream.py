@@ -0,0 +1,101 @@
+import asyncio
+import os
+import email.utils
+import time
+
+import httpx
+
+import metrics
+from upstream import (
+    HOST_TIMEOUTS, DEFAULT_TIMEOUT, RETRY_STATUSES,
+    UPSTREAM_MAX_RETRIES, UPSTREAM_BACKOFF_FACTOR, USER_AGENT,
+)
+
+# One event loop can keep far more requests in flight than a thread pool
+ASYNC_MAX_CONNECTIONS = int(os.getenv("ASYNC_MAX_CONNECTIONS", "200"))
+ASYNC_MAX_KEEPALIVE = int(os.getenv("ASYNC_MAX_KEEPALIVE", "50"))
+
+_clients = {}
+
+
+def _timeout_for(host):
+    connect, read = HOST_TIMEOUTS.get(host, DEFAULT_TIMEOUT)
+    return httpx.Timeout(read, connect=connect)
+
+
+def client_for(url):
+    """Returns the shared keep-alive AsyncClient for the URL's host."""
+    host = httpx.URL(url).host
+    client = _clients.get(host)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=ASYNC_MAX_KEEPALIVE,
+            ),
+            timeout=_timeout_for(host),
+            headers={"User-Agent": USER_AGENT},
+        )
+        _clients[host] = client
+    return client
+
+
+def _retry_after(resp):
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.isdigit():
+        return int(value)
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt):
+    return UPSTREAM_BACKOFF_FACTOR * (2 ** attempt)
+
+
+async def request(method, url, **kwargs):
+    """Same retry policy as upstream.request: back off on 429/5xx and connection errors."""
+    started = time.perf_counter()
+    status = "error"
+    try:
+        resp = await _request_with_retries(method, url, **kwargs)
+        status = resp.status_code
+        return resp
+    finally:
+        metrics.observe_upstream(metrics.host_label(url), time.perf_counter() - started, status)
+
+
+async def _request_with_retries(method, url, **kwargs):
+    client = client_for(url)
+    for attempt in range(UPSTREAM_MAX_RETRIES + 1):
+        last = attempt == UPSTREAM_MAX_RETRIES
+        try:
+            resp = await client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            if last:
+                raise
+            await asyncio.sleep(_backoff(attempt))
+            continue
+        if resp.status_code in RETRY_STATUSES and not last:
+            delay = _retry_after(resp)
+            await asyncio.sleep(delay if delay is not None else _backoff(attempt))
+            continue
+        return resp
+
+
+async def get(url, **kwargs):
+    return await request("GET", url, **kwargs)
+
+
+async def post(url, **kwargs):
+    return await request("POST", url, **kwargs)
+
+
+async def aclose_all():
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
@@ -0,0 +1,117 @@
+"""
+Concurrency benchmark: sync (thread-per-request) vs async upstream path.
+
+Starts a local stub that answers DGIdb GraphQL POSTs after a fixed delay,
+then issues the same number of gene queries through app.queryDgidb on a
+fixed-size thread pool (standing in for WSGI workers) and through
+asgi.query_dgidb_async on one event loop.
+
+    python benchmarks/bench_async.py --requests 400 --workers 8 --delay 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STUB_DELAY = 0.5
+
+
+class StubDGIdbHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        names = json.loads(self.rfile.read(length))["variables"]["names"]
+        time.sleep(STUB_DELAY)
+        nodes = [{"name": n, "conceptId": f"hgnc:{i}", "interactions": [{
+            "drug": {"name": "FLUOXETINE", "conceptId": "rxcui:4493"},
+            "interactionScore": 1.2,
+            "interactionTypes": [{"type": "inhibitor", "directionality": "INHIBITORY"}],
+            "publications": [{"pmid": 123}],
+            "sources": [{"sourceDbName": "DrugBank"}],
+        }]} for i, n in enumerate(names)]
+        body = json.dumps({"data": {"genes": {"nodes": nodes}}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub():
+    ThreadingHTTPServer.request_queue_size = 1024
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubDGIdbHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def summarize(label, latencies, wall):
+    latencies = sorted(latencies)
+    p = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+    print(f"{label:>6}: {len(latencies)} requests in {wall:.2f}s "
+          f"({len(latencies) / wall:.1f} req/s)  p50={p(0.50) * 1000:.0f}ms "
+          f"p95={p(0.95) * 1000:.0f}ms  mean={statistics.mean(latencies) * 1000:.0f}ms")
+
+
+def run_sync(dgit, n, workers):
+    def one(i):
+        started = time.perf_counter()
+        dgit.queryDgidb("gene", [f"GENE{i}"])
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = list(pool.map(one, range(n)))
+    summarize("sync", latencies, time.perf_counter() - started)
+
+
+async def run_async(asgi, async_upstream, n):
+    async def one(i):
+        started = time.perf_counter()
+        await asgi.query_dgidb_async("gene", [f"GENE{i}"])
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(one(i) for i in range(n)))
+    summarize("async", latencies, time.perf_counter() - started)
+    await async_upstream.aclose_all()
+
+
+def main():
+    global STUB_DELAY
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=8,
+                        help="threads available to the sync path (WSGI workers x threads)")
+    parser.add_argument("--delay", type=float, default=0.5, help="stub upstream latency in seconds")
+    args = parser.parse_args()
+    STUB_DELAY = args.delay
+
+    server = start_stub()
+    os.environ["DGIDB_API_URL"] = f"http://127.0.0.1:{server.server_port}/api/graphql"
+
+    import app as dgit
+    import asgi
+    import async_upstream
+    dgit.DGIDB_API_URL = os.environ["DGIDB_API_URL"]
+
+    print(f"{args.requests} gene queries, upstream delay {args.delay}s, sync workers {args.workers}")
+    run_sync(dgit, args.requests, args.workers)
+    asyncio.run(run_async(asgi, async_upstream, args.requests))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Cache codec benchmark: bytes stored and encode/decode time per entry.
+
+Builds the cache entry for every MDD panel term from benchmarks/fixtures
+and round-trips it through the plain JSON the cache used to store and
+through cache_codec with each available compression.
+
+    python benchmarks/bench_codec.py --repeat 50
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache_codec
+from fixtures import panel_entries
+
+
+def _legacy_codec():
+    return lambda v: json.dumps(v), json.loads
+
+
+def _codec(compression, level):
+    return lambda v: cache_codec.encode(v, compression, level), cache_codec.decode
+
+
+def codecs(level):
+    out = {"json (legacy)": _legacy_codec()}
+    out["codec/none"] = _codec("none", level)
+    out["codec/zlib"] = _codec("zlib", level)
+    if cache_codec.zstandard is not None:
+        out["codec/zstd"] = _codec("zstd", level)
+    return out
+
+
+def _time_per_call(fn, arg, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(arg)
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=50, help="encode/decode calls timed per entry")
+    parser.add_argument("--level", type=int, default=cache_codec.CACHE_CODEC_LEVEL)
+    args = parser.parse_args()
+
+    entries = [(t, term, entry) for t, term, entry in panel_entries()]
+    print(f"{len(entries)} MDD panel entries, serializer="
+          f"{'orjson' if cache_codec.orjson is not None else 'json'}, level={args.level}")
+    print(f"{'codec':<15} {'total KB':>9} {'mean B/entry':>13} {'ratio':>6} "
+          f"{'encode us':>10} {'decode us':>10} {'decode p95 us':>14}")
+
+    baseline = None
+    for name, (encode, decode) in codecs(args.level).items():
+        sizes = []
+        enc_times = []
+        dec_times = []
+        for _, _, entry in entries:
+            blob = encode(entry)
+            assert decode(blob) == entry
+            sizes.append(len(blob))
+            enc_times.append(_time_per_call(encode, entry, args.repeat))
+            dec_times.append(_time_per_call(decode, blob, args.repeat))
+        total = sum(sizes)
+        baseline = baseline or total
+        dec_sorted = sorted(dec_times)
+        p95 = dec_sorted[min(len(dec_sorted) - 1, int(0.95 * len(dec_sorted)))]
+        print(f"{name:<15} {total / 1024:>9.1f} {statistics.mean(sizes):>13.0f} {baseline / total:>5.1f}x "
+              f"{statistics.mean(enc_times) * 1e6:>10.0f} {statistics.mean(dec_times) * 1e6:>10.0f} "
+              f"{p95 * 1e6:>14.0f}")
+
+    print("\nper entry (codec default):")
+    for search_type, term, entry in entries:
+        blob = cache_codec.encode(entry, level=args.level)
+        print(f"  {search_type:<8} {term:<16} rows={len(entry['rows']):>4} "
+              f"json={len(json.dumps(entry)):>7} B  stored={len(blob):>6} B  "
+              f"decode={_time_per_call(cache_codec.decode, blob, args.repeat) * 1e6:>6.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Parser benchmark: shared single-pass interaction parser vs the previous
+per-direction parsers.
+
+Runs both over the MDD gene and drug panel fixtures (see
+benchmarks/fixtures.py) plus one large synthetic gene in the DRD2 range,
+checks they produce identical rows and reports interactions parsed per
+second.
+
+    python benchmarks/bench_parsers.py --repeat 20 --large 3000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parsers import parseInteractionResults, iterInteractionRows
+from fixtures import mdd_panel, upstream_response
+
+
+# ---- previous parsers, kept verbatim as the baseline ----
+
+def legacy_parse_gene(json_data):
+    rows = []
+    nodes = (json_data.get("data",{}).get('genes',{}) or {}).get('nodes',[]) or []
+    for n in nodes:
+        for it in n.get("interactions", []) or []:
+            drug = it.get("drug") or {}
+            types = ", ".join([t.get("type","") for t in (it.get("interactionTypes") or []) if t.get("type")]) or "—"
+            type_list = [t.get("type","") for t in (it.get("interactionTypes") or []) if t.get("type")]
+            dirs  = ", ".join([t.get("directionality","") for t in (it.get("interactionTypes") or []) if t.get("directionality")]) or "—"
+            sources = ", ".join([s.get("sourceDbName","") for s in (it.get("sources") or []) if s.get("sourceDbName")]) or "—"
+            pmids = ", ".join([str(p.get("pmid")) for p in (it.get("publications") or []) if p.get("pmid")]) or "—"
+            rows.append({
+                "left_label": "Gene",
+                "left_name": n.get("name") or "",
+                "left_cid": n.get("conceptId") or "",
+
+                "right_label": "Drug",
+                "right_name": drug.get("name") or "",
+                "right_cid": drug.get("conceptId") or "",
+
+                "types": types,
+                "interaction_type_list": type_list,
+                "directions": dirs,
+                "score": it.get("interactionScore"),
+                "sources": sources,
+                "pmids": pmids
+            })
+    return rows
+
+
+def legacy_parse_drug(json_data):
+    rows = []
+    nodes = (json_data.get("data", {}).get("drugs", {}) or {}).get("nodes", []) or []
+    for n in nodes:
+        for it in n.get("interactions", []) or []:
+            gene = it.get("gene") or {}
+            types = ", ".join([t.get("type","") for t in (it.get("interactionTypes") or []) if t.get("type")]) or "—"
+            type_list = [t.get("type","") for t in (it.get("interactionTypes") or []) if t.get("type")]
+            dirs  = ", ".join([t.get("directionality","") for t in (it.get("interactionTypes") or []) if t.get("directionality")]) or "—"
+            sources = ", ".join([s.get("sourceDbName","") for s in (it.get("sources") or []) if s.get("sourceDbName")]) or "—"
+            pmids = ", ".join([str(p.get("pmid")) for p in (it.get("publications") or []) if p.get("pmid")]) or "—"
+            rows.append({
+                "left_label": "Drug",
+                "left_name": n.get("name") or "",
+                "left_cid": n.get("conceptId") or "",
+
+                "right_label": "Gene",
+                "right_name": gene.get("longName") or gene.get("name") or "",
+                "right_cid": gene.get("conceptId") or "",
+
+                "types": types,
+                "interaction_type_list": type_list,
+                "directions": dirs,
+                "score": it.get("interactionScore"),
+                "sources": sources,
+                "pmids": pmids
+            })
+    return rows
+
+
+LEGACY = {"gene": legacy_parse_gene, "drug": legacy_parse_drug}
+
+
+def _rate(fn, responses, repeat):
+    count = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for search_type, results in responses:
+            count += len(fn(search_type, results))
+    return count / (time.perf_counter() - started)
+
+
+def _report(label, responses, repeat):
+    n = sum(len(parseInteractionResults(r, t)) for t, r in responses)
+    for t, r in responses:
+        assert parseInteractionResults(r, t) == LEGACY[t](r), f"row mismatch for {label}"
+
+    legacy = _rate(lambda t, r: LEGACY[t](r), responses, repeat)
+    shared = _rate(lambda t, r: parseInteractionResults(r, t), responses, repeat)
+    objects = _rate(lambda t, r: list(iterInteractionRows(r, t)), responses, repeat)
+    print(f"{label:<22} {n:>6} interactions  legacy={legacy:>9,.0f}/s  shared={shared:>9,.0f}/s "
+          f"({shared / legacy:.2f}x)  row objects={objects:>9,.0f}/s ({objects / legacy:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--large", type=int, default=3000, help="interactions in the large synthetic gene")
+    args = parser.parse_args()
+
+    panel = mdd_panel()
+    genes = [("gene", upstream_response("gene", g)) for g in panel["gene"]]
+    drugs = [("drug", upstream_response("drug", d)) for d in panel["drug"]]
+    large = [("gene", upstream_response("gene", "DRD2-LARGE", args.large))]
+
+    _report("MDD genes", genes, args.repeat)
+    _report("MDD drugs", drugs, args.repeat)
+    _report(f"large gene ({args.large})", large, args.repeat)
+    print("\nshared = dict rows as cached/rendered; row objects = InteractionRow without to_dict()")
+
+
+if __name__ == "__main__":
+    main()
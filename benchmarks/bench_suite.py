@@ -0,0 +1,320 @@
+"""
+End-to-end benchmark suite: replays recorded upstream responses against the
+app's search, batch, chatbot and parse paths and flags regressions.
+
+DGIdb, UniProt and NCBI are served by a local stub (benchmarks/stub_upstream.py)
+from benchmarks/fixtures.py, Gemini is replaced with canned answers, and the
+MySQL cache tables by SQLite (benchmarks/sqlite_store.py) unless --db mysql
+is given. Each scenario runs --repeat passes over the MDD panel through the
+Flask test client, emptying or pre-filling the caches before every pass:
+
+    parse         parsers over the panel's upstream responses
+    search_cold   POST /search, nothing cached (one upstream call per term)
+    search_db     POST /search, served from the database tier
+    search_warm   POST /search, served from the memory tier
+    batch_cold    POST /api/search/batch per search type, nothing cached
+    batch_warm    POST /api/search/batch, everything cached
+    matrix_cold   GET /api/matrix (MDD genes × MDD drugs), nothing cached
+    matrix_warm   GET /api/matrix, every gene cached
+    ask_cold      POST /ask per MDD gene, nothing cached
+    ask_warm      POST /ask, NCBI and Gemini answers cached
+
+Reports throughput, p50/p95/p99 latency and peak Python heap per scenario.
+--save-baseline writes the results as JSON; --baseline compares against such
+a file and exits 1 when p95, throughput or peak memory is worse by more than
+--threshold.
+
+    python benchmarks/bench_suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_suite.py --baseline benchmarks/baseline.json
+
+--db mysql uses the configured database and empties its search_cache and
+ncbi_gene_summary tables between passes: point DB_NAME at a scratch database.
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set before the app is imported: the stub has no E-utilities rate limit, one
+# JSON log line per request would swamp the report, and the Gemini client
+# needs a key to construct even though StubGemini answers every call
+os.environ.setdefault("NCBI_RATE", "1000")
+os.environ.setdefault("REQUEST_LOG", "0")
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from fixtures import PARSERS, mdd_panel, upstream_response
+from stub_upstream import StubGemini, StubUpstream
+
+SCENARIOS = ("parse", "search_cold", "search_db", "search_warm",
+             "batch_cold", "batch_warm", "matrix_cold", "matrix_warm", "ask_cold", "ask_warm")
+
+
+class Scenario:
+    def __init__(self, name, ops, setup):
+        self.name = name
+        self.ops = ops
+        self.setup = setup
+
+
+class Suite:
+    def __init__(self, args):
+        import ai_helper
+        import app as dgit
+        import ncbi
+        from cache import search_cache
+
+        self.dgit = dgit
+        self.ncbi = ncbi
+        self.ai_helper = ai_helper
+        self.search_cache = search_cache
+        self.panel = mdd_panel()
+
+        self.upstream = StubUpstream(args.delay).start()
+        self.upstream.install(dgit, ncbi)
+        StubGemini(args.ai_delay).install(ai_helper)
+
+        self.store = None
+        if args.db == "sqlite":
+            from sqlite_store import SQLiteStore
+            self.store = SQLiteStore(args.sqlite_path)
+            self.store.install()
+
+    # ---- cache state ----
+
+    def clear_database(self):
+        if self.store is not None:
+            self.store.clear()
+            return
+        import db_conn
+        with self.dgit.app.app_context():
+            db_conn.purge_entries(expired_only=False)
+        conn = db_conn._connect()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM ncbi_gene_summary")
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+    def clear_memory(self):
+        self.search_cache.memory.clear()
+        self.ncbi._memory.clear()
+        self.ai_helper._response_cache.clear()
+        self.ai_helper._scope_cache.clear()
+
+    def cold(self):
+        self.clear_memory()
+        self.clear_database()
+
+    def warm_with(self, ops, keep_memory=True):
+        def setup():
+            self.cold()
+            for op in ops:
+                op()
+            if not keep_memory:
+                self.clear_memory()
+        return setup
+
+    # ---- requests ----
+
+    def _request(self, method, path, **kwargs):
+        with self.dgit.app.test_client() as client:
+            resp = client.open(path, method=method, **kwargs)
+        if resp.status_code != 200:
+            raise RuntimeError(f"{path} returned {resp.status_code}")
+        return resp
+
+    def _post(self, path, **kwargs):
+        return self._request("POST", path, **kwargs)
+
+    def search_ops(self):
+        return [lambda t=t, q=q: self._post("/search", data={"type": t, "query": q})
+                for t, terms in self.panel.items() for q in terms]
+
+    def batch_ops(self):
+        return [lambda t=t, terms=terms: self._post("/api/search/batch", json={"type": t, "queries": terms})
+                for t, terms in self.panel.items()]
+
+    def matrix_ops(self):
+        return [lambda: self._request("GET", "/api/matrix")]
+
+    def ask_ops(self):
+        return [lambda g=g: self._post("/ask", json={"question": f"Which drugs target {g}?"})
+                for g in self.panel["gene"]]
+
+    def parse_ops(self):
+        responses = [(t, upstream_response(t, q)) for t, terms in self.panel.items() for q in terms]
+        return [lambda t=t, r=r: PARSERS[t](r) for t, r in responses]
+
+    def scenarios(self):
+        search, batch, matrix, ask = self.search_ops(), self.batch_ops(), self.matrix_ops(), self.ask_ops()
+        return [
+            Scenario("parse", self.parse_ops(), lambda: None),
+            Scenario("search_cold", search, self.cold),
+            Scenario("search_db", search, self.warm_with(search, keep_memory=False)),
+            Scenario("search_warm", search, self.warm_with(search)),
+            Scenario("batch_cold", batch, self.cold),
+            Scenario("batch_warm", batch, self.warm_with(batch)),
+            Scenario("matrix_cold", matrix, self.cold),
+            Scenario("matrix_warm", matrix, self.warm_with(matrix)),
+            Scenario("ask_cold", ask, self.cold),
+            Scenario("ask_warm", ask, self.warm_with(ask)),
+        ]
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list."""
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def run_pass(ops, concurrency):
+    def timed(op):
+        started = time.perf_counter()
+        op()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    # The app prints progress (UniProt URLs, cache notes); keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                latencies = list(pool.map(timed, ops))
+        else:
+            latencies = [timed(op) for op in ops]
+    return latencies, time.perf_counter() - started
+
+
+def measure(suite, scenario, repeat, concurrency, memory):
+    latencies = []
+    wall = 0.0
+    upstream_calls = 0
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            scenario.setup()
+        calls_before = suite.upstream.calls
+        lat, elapsed = run_pass(scenario.ops, concurrency)
+        latencies.extend(lat)
+        wall += elapsed
+        # upstream calls made by one pass (all passes start from the same cache state)
+        upstream_calls = suite.upstream.calls - calls_before
+
+    peak_kb = None
+    if memory:
+        # Separate pass: tracemalloc slows allocation-heavy code, so it isn't timed
+        with contextlib.redirect_stdout(io.StringIO()):
+            scenario.setup()
+        tracemalloc.start()
+        run_pass(scenario.ops, concurrency)
+        peak_kb = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "ops": len(latencies),
+        "throughput": round(len(latencies) / wall, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "peak_kb": peak_kb,
+        "upstream_calls": upstream_calls,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Returns [(scenario, metric, baseline, current)] for every regression beyond `threshold`."""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        for metric in ("p95_ms", "throughput", "peak_kb"):
+            old, new = base.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            worse = new < old * (1 - threshold) if metric == "throughput" else new > old * (1 + threshold)
+            if worse:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def print_report(results):
+    print(f"{'scenario':<12} {'ops':>5} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'peak KB':>9} {'upstream':>8}")
+    for name, r in results.items():
+        peak = f"{r['peak_kb']:,.0f}" if r["peak_kb"] is not None else "-"
+        print(f"{name:<12} {r['ops']:>5} {r['throughput']:>10,.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+              f"{r['p99_ms']:>9.2f} {peak:>9} {r['upstream_calls']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--only", default="", help="comma-separated scenarios to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=10, help="timed passes per scenario")
+    parser.add_argument("--concurrency", type=int, default=1, help="requests in flight per pass")
+    parser.add_argument("--delay", type=float, default=0.0, help="stub upstream latency in seconds")
+    parser.add_argument("--ai-delay", type=float, default=0.0, help="stub Gemini latency in seconds")
+    parser.add_argument("--db", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--sqlite-path", default=":memory:")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak-memory pass")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", help="write this run's results to a baseline JSON")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative regression")
+    args = parser.parse_args()
+
+    only = [s.strip() for s in args.only.split(",") if s.strip()]
+    unknown = set(only) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        suite = Suite(args)
+
+    results = {}
+    for scenario in suite.scenarios():
+        if only and scenario.name not in only:
+            continue
+        results[scenario.name] = measure(suite, scenario, args.repeat, args.concurrency, not args.no_memory)
+
+    print(f"{args.repeat} passes, concurrency {args.concurrency}, upstream delay {args.delay}s, db {args.db}")
+    print_report(results)
+    suite.upstream.stop()
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "repeat": args.repeat,
+                "concurrency": args.concurrency,
+                "db": args.db,
+                "scenarios": results,
+            }, f, indent=2)
+        print(f"\nbaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for key in ("concurrency", "db"):
+            if baseline.get(key) != getattr(args, key):
+                print(f"\nnote: baseline was recorded with {key}={baseline.get(key)}, this run used {getattr(args, key)}")
+        regressions = compare(results, baseline, args.threshold)
+        if not regressions:
+            print(f"\nno regressions against {args.baseline} (threshold {args.threshold:.0%})")
+            return 0
+        print(f"\nREGRESSIONS against {args.baseline} (threshold {args.threshold:.0%}):")
+        for name, metric, old, new in regressions:
+            print(f"  {name:<12} {metric:<10} {old:>10,.2f} -> {new:>10,.2f} ({(new - old) / old:+.0%})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
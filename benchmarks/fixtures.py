@@ -0,0 +1,152 @@
+"""
+Upstream response fixtures for the benchmarks.
+
+Responses recorded from the real APIs can be dropped into
+benchmarks/fixtures/<type>/<TERM>.json (the raw DGIdb GraphQL or UniProt
+JSON, or for type "ncbi" one esummary gene document) and are used as-is. Anything not recorded is synthesized with a
+seeded RNG in the same shape and at a realistic size, so runs are
+repeatable without network access.
+"""
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parsers import parseGeneResults, parseDrugResults, parseProteinResults, build_cache_entry
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+INTERACTION_TYPES = [
+    ("inhibitor", "INHIBITORY"), ("agonist", "ACTIVATING"), ("antagonist", "INHIBITORY"),
+    ("modulator", None), ("blocker", "INHIBITORY"), ("positive modulator", "ACTIVATING"),
+    ("binder", None), ("partial agonist", "ACTIVATING"),
+]
+SOURCES = ["DrugBank", "ChEMBL", "GuideToPharmacology", "PharmGKB", "TTD", "DTC",
+           "CIViC", "NCI", "TdgClinicalTrial", "FDA", "TEND", "CGI"]
+
+# Interactions per node: MDD genes range from a handful (CELF4) to hundreds (SLC6A4, DRD2)
+MIN_INTERACTIONS = 5
+MAX_INTERACTIONS = 250
+
+
+def mdd_panel():
+    """{search_type: [terms]} for the MDD panel shown on the search page."""
+    import app as dgit
+    return {"gene": list(dgit.MDD_GENES), "drug": list(dgit.MDD_DRUGS), "protein": list(dgit.MDD_PROTEINS)}
+
+
+def _recorded(search_type, term):
+    path = os.path.join(FIXTURE_DIR, search_type, f"{term.upper()}.json")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return None
+
+
+def _rng(search_type, term):
+    return random.Random(f"{search_type}:{term.upper()}")
+
+
+def _interaction(rng, other):
+    types = rng.sample(INTERACTION_TYPES, rng.choice((0, 1, 1, 1, 2)))
+    return {
+        **other,
+        "interactionScore": round(rng.lognormvariate(-1.0, 1.2), 6),
+        "interactionTypes": [{"type": t, "directionality": d} for t, d in types],
+        "publications": [{"pmid": rng.randint(1_000_000, 39_999_999)} for _ in range(rng.choice((0, 1, 1, 2, 3, 6)))],
+        "sources": [{"sourceDbName": s} for s in rng.sample(SOURCES, rng.randint(1, 4))],
+    }
+
+
+def gene_response(term, n=None):
+    """DGIdb genes(names: [term]) response; `n` fixes the synthetic interaction count."""
+    recorded = _recorded("gene", term)
+    if recorded is not None:
+        return recorded
+    rng = _rng("gene", term)
+    count = n or rng.randint(MIN_INTERACTIONS, MAX_INTERACTIONS)
+    interactions = [
+        _interaction(rng, {"drug": {"name": f"DRUG-{rng.randint(1, 4000):04d}",
+                                    "conceptId": f"rxcui:{rng.randint(1000, 2_000_000)}"}})
+        for _ in range(count)
+    ]
+    node = {"name": term.upper(), "conceptId": f"hgnc:{rng.randint(1, 50000)}", "interactions": interactions}
+    return {"data": {"genes": {"nodes": [node]}}}
+
+
+def drug_response(term, n=None):
+    """DGIdb drugs(names: [term]) response; `n` fixes the synthetic interaction count."""
+    recorded = _recorded("drug", term)
+    if recorded is not None:
+        return recorded
+    rng = _rng("drug", term)
+    interactions = []
+    for _ in range(n or rng.randint(MIN_INTERACTIONS, MAX_INTERACTIONS // 2)):
+        symbol = f"GENE{rng.randint(1, 20000)}"
+        interactions.append(_interaction(rng, {"gene": {
+            "name": symbol,
+            "conceptId": f"hgnc:{rng.randint(1, 50000)}",
+            "longName": f"{symbol} protein family member {rng.randint(1, 40)}",
+        }}))
+    node = {"name": term.upper(), "conceptId": f"rxcui:{rng.randint(1000, 2_000_000)}", "interactions": interactions}
+    return {"data": {"drugs": {"nodes": [node]}}}
+
+
+def protein_response(term, n=None):
+    """UniProt search response (size=5, fields from app.uniprotParams)."""
+    recorded = _recorded("protein", term)
+    if recorded is not None:
+        return recorded
+    rng = _rng("protein", term)
+    hits = []
+    for i in range(5):
+        gene = f"{term.upper().replace('‑', '')}{'' if i == 0 else i}"
+        hits.append({
+            "entryType": "UniProtKB reviewed (Swiss-Prot)",
+            "primaryAccession": f"P{rng.randint(10000, 99999)}",
+            "organism": {"scientificName": "Homo sapiens", "commonName": "Human", "taxonId": 9606},
+            "proteinDescription": {"recommendedName": {
+                "fullName": {"value": f"{term} related protein {i + 1}"},
+                "shortNames": [{"value": gene}],
+            }},
+            "genes": [{"geneName": {"value": gene},
+                       "synonyms": [{"value": f"{gene}S{j}"} for j in range(rng.randint(0, 3))]}],
+        })
+    return {"results": hits}
+
+
+def ncbi_gene(symbol):
+    """E-utilities esummary document ({"uid", "name", "description"}) for a gene symbol."""
+    recorded = _recorded("ncbi", symbol)
+    if recorded is not None:
+        return recorded
+    rng = _rng("ncbi", symbol)
+    name = symbol.upper()
+    sentences = " ".join(
+        f"This gene encodes a member of the {name} family involved in pathway {rng.randint(1, 400)}."
+        for _ in range(rng.randint(2, 6))
+    )
+    return {"uid": str(rng.randint(1, 999_999)), "name": name, "description": sentences}
+
+
+RESPONSES = {"gene": gene_response, "drug": drug_response, "protein": protein_response}
+PARSERS = {"gene": parseGeneResults, "drug": parseDrugResults, "protein": parseProteinResults}
+
+
+def upstream_response(search_type, term, n=None):
+    return RESPONSES[search_type](term, n)
+
+
+def cache_entry(search_type, term):
+    """The {"results", "rows", "aggregates"} dict the app caches for a term."""
+    results = upstream_response(search_type, term)
+    return build_cache_entry(results, PARSERS[search_type](results))
+
+
+def panel_entries():
+    """Yields (search_type, term, cache_entry) for every MDD panel term."""
+    for search_type, terms in mdd_panel().items():
+        for term in terms:
+            yield search_type, term, cache_entry(search_type, term)
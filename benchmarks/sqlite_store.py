@@ -0,0 +1,254 @@
+"""
+SQLite stand-in for the MySQL cache tables, for running the benchmarks
+without a database server.
+
+It replaces the search_cache and ncbi_gene_summary reads and writes that
+cache.py and ncbi.py call, keeping the cache_codec encode/decode so the
+stored bytes and decode cost match production. Gene/drug entries are kept
+as whole payloads rather than in the normalized interaction tables, so
+use --db mysql to measure interaction_store itself.
+
+SQLiteStore.connection() also serves the normalized interaction and
+DGIdb mirror tables behind a MySQL-dialect cursor (%s placeholders,
+INSERT IGNORE, ON DUPLICATE KEY UPDATE), which lets the tests run
+interaction_store's save/load path and a mirror load without a server.
+Names compare with NOCASE, an ASCII-only approximation of MySQL's
+accent-insensitive collation.
+"""
+import re
+import sqlite3
+import threading
+import time
+
+import cache
+import cache_codec
+import ncbi
+from db_conn import normalize_cache_key, CACHE_TTL_SECONDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_cache (
+    query TEXT NOT NULL,
+    search_type TEXT NOT NULL,
+    result_blob BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (query, search_type)
+);
+CREATE TABLE IF NOT EXISTS ncbi_gene_summary (
+    symbol TEXT PRIMARY KEY,
+    gene_id TEXT,
+    description TEXT,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ncbi_gene_id ON ncbi_gene_summary (gene_id);
+"""
+
+# db_conn.INTERACTION_TABLES in SQLite's dialect
+INTERACTION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS genes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL COLLATE NOCASE UNIQUE,
+    concept_id TEXT,
+    long_name TEXT
+);
+CREATE TABLE IF NOT EXISTS drugs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL COLLATE NOCASE UNIQUE,
+    concept_id TEXT
+);
+CREATE TABLE IF NOT EXISTS interactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    gene_id INTEGER NOT NULL REFERENCES genes(id) ON DELETE CASCADE,
+    drug_id INTEGER NOT NULL REFERENCES drugs(id) ON DELETE CASCADE,
+    score REAL,
+    cached INTEGER NOT NULL DEFAULT 0,
+    mirror_release_id INTEGER,
+    UNIQUE (gene_id, drug_id)
+);
+CREATE TABLE IF NOT EXISTS interaction_types (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL COLLATE NOCASE,
+    directionality TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+    UNIQUE (type, directionality)
+);
+CREATE TABLE IF NOT EXISTS interaction_type_links (
+    interaction_id INTEGER NOT NULL,
+    type_id INTEGER NOT NULL,
+    PRIMARY KEY (interaction_id, type_id)
+);
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL COLLATE NOCASE UNIQUE
+);
+CREATE TABLE IF NOT EXISTS interaction_sources (
+    interaction_id INTEGER NOT NULL,
+    source_id INTEGER NOT NULL,
+    PRIMARY KEY (interaction_id, source_id)
+);
+CREATE TABLE IF NOT EXISTS interaction_publications (
+    interaction_id INTEGER NOT NULL,
+    pmid INTEGER NOT NULL,
+    PRIMARY KEY (interaction_id, pmid)
+);
+CREATE TABLE IF NOT EXISTS gene_categories (
+    gene_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    PRIMARY KEY (gene_id, category)
+);
+CREATE TABLE IF NOT EXISTS dgidb_mirror_releases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    label TEXT NOT NULL,
+    genes INTEGER NOT NULL DEFAULT 0,
+    drugs INTEGER NOT NULL DEFAULT 0,
+    interactions INTEGER NOT NULL DEFAULT 0,
+    complete INTEGER NOT NULL DEFAULT 0,
+    loaded_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# MySQL -> SQLite rewrites for the statements interaction_store issues
+_DIALECT = [
+    (re.compile(r"%s"), "?"),
+    (re.compile(r"\bINSERT IGNORE\b"), "INSERT OR IGNORE"),
+    (re.compile(r"\bON DUPLICATE KEY UPDATE\b"), "ON CONFLICT DO UPDATE SET"),
+    (re.compile(r"\bVALUES\((\w+)\)"), r"excluded.\1"),
+]
+
+
+class _DialectCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    @staticmethod
+    def _translate(sql):
+        for pattern, replacement in _DIALECT:
+            sql = pattern.sub(replacement, sql)
+        return sql
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(self._translate(sql), tuple(params or ()))
+
+    def executemany(self, sql, rows):
+        self._cursor.executemany(self._translate(sql), [tuple(r) for r in rows])
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+class _DialectConnection:
+    """The slice of a MySQL connection interaction_store and dgidb_mirror use."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return _DialectCursor(self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        # Every connection() shares the store's one SQLite connection
+        pass
+
+
+class SQLiteStore:
+    def __init__(self, path=":memory:"):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.conn.executescript(INTERACTION_SCHEMA)
+        self._lock = threading.Lock()
+
+    # ---- search_cache (db_conn.get_cached_entry / save_results) ----
+
+    def get_cached_entry(self, query, search_type):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT result_blob FROM search_cache WHERE query = ? AND search_type = ? AND expires_at > ?",
+                (normalize_cache_key(query), search_type, time.time()),
+            ).fetchone()
+        return cache_codec.decode_sized(row[0]) if row else None
+
+    def save_results(self, query, search_type, results, ttl=None, result_count=None):
+        payload, json_bytes = cache_codec.encode_sized(results)
+        expires = time.time() + (ttl if ttl is not None else CACHE_TTL_SECONDS)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO search_cache (query, search_type, result_blob, expires_at) VALUES (?, ?, ?, ?)",
+                (normalize_cache_key(query), search_type, payload, expires),
+            )
+            self.conn.commit()
+        return json_bytes
+
+    def save_interaction_results(self, query, search_type, data, size=None):
+        self.save_results(query, search_type, data)
+
+    # ---- ncbi_gene_summary ----
+
+    def get_ncbi_summaries(self, symbols):
+        keys = list({s.strip().upper() for s in symbols if s})
+        if not keys:
+            return {}
+        marks = ", ".join("?" * len(keys))
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT symbol, gene_id, description FROM ncbi_gene_summary "
+                f"WHERE symbol IN ({marks}) AND expires_at > ?", keys + [time.time()],
+            ).fetchall()
+        return {r[0]: (r[1], r[2]) for r in rows}
+
+    def get_ncbi_summary_by_gene_id(self, gene_id):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT symbol, description FROM ncbi_gene_summary WHERE gene_id = ? AND expires_at > ? LIMIT 1",
+                (str(gene_id), time.time()),
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def save_ncbi_summaries(self, entries, ttl):
+        if not entries:
+            return
+        expires = time.time() + int(ttl)
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO ncbi_gene_summary (symbol, gene_id, description, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(sym.strip().upper(), gid, desc, expires) for sym, gid, desc in entries],
+            )
+            self.conn.commit()
+
+    # ---- normalized interaction tables ----
+
+    def connection(self):
+        """A MySQL-dialect connection to the interaction tables (used like flask_mysqldb's mysql.connection)."""
+        return _DialectConnection(self.conn)
+
+    # ---- benchmark helpers ----
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM search_cache")
+            self.conn.execute("DELETE FROM ncbi_gene_summary")
+            self.conn.commit()
+
+    def install(self):
+        """Routes the cache and NCBI lookups through this store."""
+        cache.get_cached_entry = self.get_cached_entry
+        cache.save_results = self.save_results
+        cache.load_interaction_results = self.get_cached_entry
+        cache.save_interaction_results = self.save_interaction_results
+        ncbi.get_ncbi_summaries = self.get_ncbi_summaries
+        ncbi.get_ncbi_summary_by_gene_id = self.get_ncbi_summary_by_gene_id
+        ncbi.save_ncbi_summaries = self.save_ncbi_summaries
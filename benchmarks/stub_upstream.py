@@ -0,0 +1,174 @@
+"""
+Local stand-ins for every upstream the app calls, replaying the responses
+in benchmarks/fixtures.py (recorded JSON where present, synthetic otherwise).
+
+StubUpstream serves DGIdb GraphQL (the genes/drugs queries and the paged
+interactions connection), UniProt search and NCBI E-utilities on
+127.0.0.1 and points app/ncbi at itself; StubGemini replaces the Gemini
+client with canned answers. Both take an optional fixed delay so runs can
+model network latency.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from fixtures import drug_response, gene_response, ncbi_gene, protein_response
+
+_SYMBOL = re.compile(r"([\w.-]+)\[sym\]", re.IGNORECASE)
+_UNIPROT_TERM = re.compile(r"^\((.*)\) AND organism_id:")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self.server.stub.pause()
+        self._send(self.server.stub.dgidb(body.get("query", ""), body.get("variables", {})))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.server.stub.pause()
+        if url.path.endswith("/uniprotkb/search"):
+            self._send(self.server.stub.uniprot(params.get("query", "")))
+        elif url.path.endswith("/esearch.fcgi"):
+            self._send(self.server.stub.esearch(params.get("term", "")))
+        elif url.path.endswith("/esummary.fcgi"):
+            self._send(self.server.stub.esummary(params.get("id", "")))
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubUpstream:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self._ncbi_ids = {}  # uid -> esummary doc, filled by esearch
+        self._lock = threading.Lock()
+        ThreadingHTTPServer.request_queue_size = 1024
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+
+    def pause(self):
+        with self._lock:
+            self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+
+    # ---- responses ----
+
+    @staticmethod
+    def dgidb(query, variables):
+        names = variables.get("names", [])
+        if "interactions(" in query:
+            return StubUpstream.interaction_page(query, names, variables.get("first") or 500, variables.get("after"))
+        root = "drugs" if "drugs(" in query else "genes"
+        respond = drug_response if root == "drugs" else gene_response
+        nodes = []
+        for name in names:
+            nodes.extend(respond(name)["data"][root]["nodes"])
+        return {"data": {root: {"nodes": nodes}}}
+
+    @staticmethod
+    def interaction_page(query, names, first, after):
+        """One page of the interactions connection; cursors are plain offsets."""
+        drug_search = "drugNames" in query
+        root, anchor = ("drugs", "drug") if drug_search else ("genes", "gene")
+        respond = drug_response if drug_search else gene_response
+        items = []
+        for name in names:
+            for node in respond(name)["data"][root]["nodes"]:
+                for it in node["interactions"]:
+                    items.append({**it, anchor: {"name": node["name"], "conceptId": node["conceptId"]}})
+        offset = int(after or 0)
+        end = offset + int(first)
+        return {"data": {"interactions": {
+            "pageInfo": {"hasNextPage": end < len(items), "endCursor": str(end)},
+            "nodes": items[offset:end],
+        }}}
+
+    @staticmethod
+    def uniprot(query):
+        match = _UNIPROT_TERM.match(query)
+        return protein_response(match.group(1) if match else query)
+
+    def esearch(self, term):
+        symbols = _SYMBOL.findall(term) or [term.strip()]
+        ids = []
+        for symbol in symbols:
+            doc = ncbi_gene(symbol)
+            with self._lock:
+                self._ncbi_ids[doc["uid"]] = doc
+            ids.append(doc["uid"])
+        return {"esearchresult": {"idlist": ids}}
+
+    def esummary(self, ids):
+        uids = [i for i in ids.split(",") if i]
+        result = {"uids": uids}
+        with self._lock:
+            for uid in uids:
+                if uid in self._ncbi_ids:
+                    result[uid] = self._ncbi_ids[uid]
+        return {"result": result}
+
+    # ---- lifecycle ----
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def install(self, dgit, ncbi):
+        """Points the app's upstream URLs at this server."""
+        dgit.DGIDB_API_URL = f"{self.base}/dgidb/api/graphql"
+        dgit.UNIPROT_SEARCH_URL = f"{self.base}/uniprot/uniprotkb/search"
+        ncbi.NCBI_ESEARCH_URL = f"{self.base}/ncbi/esearch.fcgi"
+        ncbi.NCBI_ESUMMARY_URL = f"{self.base}/ncbi/esummary.fcgi"
+
+    def stop(self):
+        self.server.shutdown()
+
+
+class _GeminiResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubGemini:
+    """Stands in for genai.Client: answers the scope classifier IN_SCOPE and everything else with fixed text."""
+
+    ANSWER = ("Selective serotonin reuptake inhibitors bind the serotonin transporter and block reuptake, "
+              "raising synaptic serotonin. (Source: DGIdb, NCBI summary.)")
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.models = self
+
+    def generate_content(self, model=None, contents=""):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if "strict classifier" in contents:
+            return _GeminiResponse("IN_SCOPE")
+        return _GeminiResponse(self.ANSWER)
+
+    def install(self, ai_helper):
+        ai_helper.client = self
@@ -0,0 +1,455 @@
+import asyncio
+import os
+import threading
+import time
+import json
+from collections import OrderedDict
+
+import metrics
+from db_conn import get_cached_entry, save_results, normalize_cache_key
+from interaction_store import RELATIONAL_TYPES, load_interaction_results, save_interaction_results
+
+MEMORY_CACHE_MAX_ENTRIES = int(os.getenv("MEMORY_CACHE_MAX_ENTRIES", "512"))
+MEMORY_CACHE_MAX_BYTES = int(os.getenv("MEMORY_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+MEMORY_CACHE_TTL_SECONDS = int(os.getenv("MEMORY_CACHE_TTL_SECONDS", "900"))
+# How long a coalesced request waits for the in-flight fetch before fetching itself
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_TIMEOUT", "60"))
+
+
+class MemoryCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL and a total byte budget.
+    Values are stored as-is (already parsed), so a hit costs a dict lookup.
+    """
+
+    def __init__(self, max_entries=MEMORY_CACHE_MAX_ENTRIES, max_bytes=MEMORY_CACHE_MAX_BYTES,
+                 ttl=MEMORY_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at <= now:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, size=None, ttl=None):
+        if size is None:
+            size = estimate_size(value)
+        if size > self.max_bytes:
+            # Never let one oversized entry flush the whole tier
+            return False
+        expires_at = time.monotonic() + (ttl if ttl is not None else self.ttl)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, size, expires_at)
+            self._bytes += size
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def estimate_size(value):
+    """Approximate size of a cached value as its JSON length."""
+    try:
+        return len(json.dumps(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exc = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    function, later callers block until it finishes and share its result.
+    """
+
+    def __init__(self, timeout=SINGLE_FLIGHT_TIMEOUT):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Returns (result, shared) where shared is True if another caller did the work."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if call.done.wait(self.timeout):
+                if call.exc is not None:
+                    raise call.exc
+                return call.result, True
+            # The leader is stuck; don't hold this request hostage to it
+            return fn(), False
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.exc = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def do_many(self, keys, fn):
+        """
+        Batch form of do. Leads every key nobody is fetching yet with a single
+        fn(led_keys) call, which returns {key: result}, and waits on the rest.
+        Returns {key: (result, shared)}.
+        """
+        led = {}
+        joined = {}
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                call = self._calls.get(key)
+                if call is None:
+                    led[key] = self._calls[key] = _Call()
+                else:
+                    self.coalesced += 1
+                    joined[key] = call
+
+        out = {}
+        if led:
+            try:
+                results = fn(list(led))
+                for key, call in led.items():
+                    call.result = results.get(key)
+                    out[key] = (call.result, False)
+            except Exception as e:
+                for call in led.values():
+                    call.exc = e
+                raise
+            finally:
+                with self._lock:
+                    for key in led:
+                        self._calls.pop(key, None)
+                for call in led.values():
+                    call.done.set()
+
+        stuck = []
+        for key, call in joined.items():
+            if not call.done.wait(self.timeout):
+                stuck.append(key)
+            elif call.exc is not None:
+                raise call.exc
+            else:
+                out[key] = (call.result, True)
+        if stuck:
+            results = fn(stuck)
+            for key in stuck:
+                out[key] = (results.get(key), False)
+        return out
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines running on one event loop."""
+
+    def __init__(self):
+        self._calls = {}
+        self.coalesced = 0
+
+    async def do(self, key, coro_fn):
+        """
+        Returns (result, shared) like SingleFlight.do. If the leader is
+        cancelled, its waiters retry the call instead of waiting forever.
+        """
+        fut = self._calls.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            try:
+                # shield: a cancelled waiter must not cancel the leader's fetch
+                return await asyncio.shield(fut), True
+            except asyncio.CancelledError:
+                if not fut.cancelled():
+                    raise  # this waiter itself was cancelled
+            return await self.do(key, coro_fn)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._calls[key] = fut
+        try:
+            result = await coro_fn()
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved when nobody was waiting
+            raise
+        else:
+            fut.set_result(result)
+        finally:
+            if self._calls.get(key) is fut:
+                del self._calls[key]
+            if not fut.done():
+                # the leader was cancelled (a BaseException): release the waiters
+                fut.cancel()
+        return result, False
+
+
+class SearchCache:
+    """
+    Two-tier search cache: in-process MemoryCache first, then MySQL. Values
+    are the parsed {"results", "rows", "aggregates"} dicts that the
+    search page renders. Gene and drug entries live in the normalized
+    interaction tables, protein entries in the search_cache blob.
+    """
+
+    def __init__(self, memory=None, flight=None):
+        self.memory = memory if memory is not None else MemoryCache()
+        self.flight = flight if flight is not None else SingleFlight()
+        self.async_flight = AsyncSingleFlight()
+        self._lock = threading.Lock()
+        self.counters = {
+            "memory": {"hits": 0, "misses": 0},
+            "db": {"hits": 0, "misses": 0},
+            "upstream": {"fetches": 0, "errors": 0, "coalesced": 0},
+        }
+
+    @staticmethod
+    def key(query, search_type):
+        return (normalize_cache_key(query), search_type)
+
+    def _count(self, tier, name, search_type=None):
+        with self._lock:
+            self.counters[tier][name] += 1
+        metrics.count_cache(tier, search_type, name)
+
+    def get(self, query, search_type):
+        """Returns (data, tier) where tier is "memory", "db" or None on a miss."""
+        data = self.get_memory(query, search_type)
+        if data is not None:
+            return data, "memory"
+        data = self.get_db(query, search_type)
+        if data is not None:
+            return data, "db"
+        return None, None
+
+    def get_memory(self, query, search_type):
+        data = self.memory.get(self.key(query, search_type))
+        self._count("memory", "hits" if data is not None else "misses", search_type)
+        return data
+
+    def get_db(self, query, search_type):
+        """Reads the MySQL tier and promotes a hit into memory."""
+        with metrics.span("cache_db"):
+            if search_type in RELATIONAL_TYPES:
+                entry = load_interaction_results(query, search_type)
+            else:
+                entry = get_cached_entry(query, search_type)
+        if entry is None:
+            self._count("db", "misses", search_type)
+            return None
+        self._count("db", "hits", search_type)
+        data, size = entry
+        self.memory.set(self.key(query, search_type), data, size=size)
+        return data
+
+    def put(self, query, search_type, data):
+        with metrics.span("cache_write"):
+            if search_type in RELATIONAL_TYPES:
+                # sized once here; DB-tier reads of the entry report the stored size
+                size = estimate_size(data)
+                save_interaction_results(query, search_type, data, size)
+            else:
+                size = save_results(query, search_type, data)
+        self.memory.set(self.key(query, search_type), data, size=size)
+
+    def get_or_fetch(self, query, search_type, fetch):
+        """
+        Returns (data, error, tier). On a miss `fetch()` is called and must
+        return (data, error); successful results are written to both tiers.
+        Concurrent misses on the same key share a single upstream fetch.
+        """
+        data, tier = self.get(query, search_type)
+        if data is not None:
+            return data, None, tier
+
+        (data, error, tier), shared = self.flight.do(
+            self.key(query, search_type),
+            lambda: self._fetch_and_store(query, search_type, fetch)
+        )
+        if shared:
+            self._count("upstream", "coalesced", search_type)
+        return data, error, tier
+
+    def _fetch_and_store(self, query, search_type, fetch):
+        # A previous leader may have filled the cache between our miss and taking the lead
+        data = self.memory.get(self.key(query, search_type))
+        if data is not None:
+            return data, None, "memory"
+
+        self._count("upstream", "fetches", search_type)
+        data, error = fetch()
+        if error or not data:
+            self._count("upstream", "errors", search_type)
+            return data, error, "upstream"
+        self.put(query, search_type, data)
+        return data, None, "upstream"
+
+    def get_or_fetch_many(self, queries, search_type, fetch_many):
+        """
+        Batch get_or_fetch. Returns {query: (data, error, tier)}; the misses
+        are passed to one `fetch_many(queries)` call returning
+        {query: (data, error)}. Misses share the per-key flights with
+        get_or_fetch, so a term already being fetched by /search (or another
+        batch) is waited on instead of fetched again.
+        """
+        out = {}
+        keys = {}
+        for q in queries:
+            data, tier = self.get(q, search_type)
+            if data is not None:
+                out[q] = (data, None, tier)
+            else:
+                keys.setdefault(self.key(q, search_type), q)
+        if not keys:
+            return out
+
+        def lead(led):
+            fetched = self._fetch_and_store_many([keys[k] for k in led], search_type, fetch_many)
+            return {k: fetched[keys[k]] for k in led}
+
+        for key, (result, shared) in self.flight.do_many(list(keys), lead).items():
+            if shared:
+                self._count("upstream", "coalesced", search_type)
+            out[keys[key]] = result
+        for q in queries:
+            if q not in out:  # spelled differently from the query that shares its key
+                out[q] = out[keys[self.key(q, search_type)]]
+        return out
+
+    def _fetch_and_store_many(self, queries, search_type, fetch_many):
+        out = {}
+        todo = []
+        for q in queries:
+            data = self.memory.get(self.key(q, search_type))
+            if data is not None:
+                out[q] = (data, None, "memory")
+            else:
+                todo.append(q)
+        if not todo:
+            return out
+
+        for _ in todo:
+            self._count("upstream", "fetches", search_type)
+        fetched = fetch_many(todo)
+        for q in todo:
+            data, error = fetched.get(q, (None, "No result returned"))
+            if error or not data:
+                self._count("upstream", "errors", search_type)
+                out[q] = (data, error, "upstream")
+            else:
+                self.put(q, search_type, data)
+                out[q] = (data, None, "upstream")
+        return out
+
+    async def aget_or_fetch(self, query, search_type, fetch, run_blocking):
+        """
+        Async get_or_fetch for the ASGI path. `fetch` is a coroutine function
+        returning (data, error); `run_blocking(fn, *args)` runs the MySQL
+        calls off the event loop. Memory hits never leave the loop.
+        """
+        data = self.get_memory(query, search_type)
+        if data is not None:
+            return data, None, "memory"
+        data = await run_blocking(self.get_db, query, search_type)
+        if data is not None:
+            return data, None, "db"
+
+        (data, error, tier), shared = await self.async_flight.do(
+            self.key(query, search_type),
+            lambda: self._afetch_and_store(query, search_type, fetch, run_blocking)
+        )
+        if shared:
+            self._count("upstream", "coalesced", search_type)
+        return data, error, tier
+
+    async def _afetch_and_store(self, query, search_type, fetch, run_blocking):
+        data = self.memory.get(self.key(query, search_type))
+        if data is not None:
+            return data, None, "memory"
+
+        self._count("upstream", "fetches", search_type)
+        data, error = await fetch()
+        if error or not data:
+            self._count("upstream", "errors", search_type)
+            return data, error, "upstream"
+        await run_blocking(self.put, query, search_type, data)
+        return data, None, "upstream"
+
+    def invalidate(self, query, search_type):
+        self.memory.delete(self.key(query, search_type))
+
+    def stats(self):
+        with self._lock:
+            counters = {tier: dict(c) for tier, c in self.counters.items()}
+        counters["memory"].update(self.memory.stats())
+        return counters
+
+
+search_cache = SearchCache()
@@ -0,0 +1,120 @@
+"""
+Codec for cached search payloads.
+
+Encoded values are bytes laid out as
+
+    b"DGC" | version (1 byte) | serializer id (1 byte) | compression id (1 byte) | body
+
+Values without the header are plain JSON text written before the codec
+existed, so decode() accepts both.
+"""
+import json
+import os
+import zlib
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is in requirements.txt
+    zstandard = None
+
+MAGIC = b"DGC"
+VERSION = 1
+HEADER_LEN = len(MAGIC) + 3
+
+SERIALIZER_JSON = 0
+SERIALIZER_ORJSON = 1
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+
+COMPRESSION_NAMES = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "zstd": COMPRESSION_ZSTD}
+
+CACHE_CODEC_COMPRESSION = os.getenv("CACHE_CODEC_COMPRESSION", "zstd" if zstandard else "zlib")
+CACHE_CODEC_LEVEL = int(os.getenv("CACHE_CODEC_LEVEL", "3"))
+# Payloads smaller than this are stored uncompressed
+CACHE_CODEC_MIN_SIZE = int(os.getenv("CACHE_CODEC_MIN_SIZE", "512"))
+
+
+def _dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value), SERIALIZER_ORJSON
+    return json.dumps(value, separators=(",", ":")).encode("utf-8"), SERIALIZER_JSON
+
+
+def _loads(body):
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def _compress(body, compression, level):
+    if compression == COMPRESSION_ZSTD:
+        return zstandard.ZstdCompressor(level=level).compress(body)
+    if compression == COMPRESSION_ZLIB:
+        return zlib.compress(body, min(level, 9))
+    return body
+
+
+def _decompress(body, compression):
+    if compression == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise ValueError("cache entry is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(body)
+    if compression == COMPRESSION_ZLIB:
+        return zlib.decompress(body)
+    if compression == COMPRESSION_NONE:
+        return body
+    raise ValueError(f"unknown cache compression id {compression}")
+
+
+def encode_sized(value, compression=None, level=CACHE_CODEC_LEVEL):
+    """
+    Serializes and (if large enough) compresses `value` into header-tagged
+    bytes. Returns (blob, serialized_bytes) like decode_sized().
+    """
+    compression = COMPRESSION_NAMES[compression or CACHE_CODEC_COMPRESSION]
+    if compression == COMPRESSION_ZSTD and zstandard is None:
+        compression = COMPRESSION_ZLIB
+
+    body, serializer = _dumps(value)
+    if len(body) < CACHE_CODEC_MIN_SIZE:
+        compression = COMPRESSION_NONE
+    blob = MAGIC + bytes((VERSION, serializer, compression)) + _compress(body, compression, level)
+    return blob, len(body)
+
+
+def encode(value, compression=None, level=CACHE_CODEC_LEVEL):
+    return encode_sized(value, compression, level)[0]
+
+
+def decode_sized(blob):
+    """
+    Returns (value, serialized_bytes) where serialized_bytes is the length of
+    the uncompressed JSON body, which approximates the value's memory size.
+    Plain JSON str/bytes from rows written before the codec are accepted.
+    """
+    if blob is None:
+        return None, 0
+    if isinstance(blob, str):
+        return json.loads(blob), len(blob)
+    blob = bytes(blob)
+    if not blob.startswith(MAGIC):
+        return _loads(blob), len(blob)
+
+    version, _serializer, compression = blob[len(MAGIC):HEADER_LEN]
+    if version != VERSION:
+        raise ValueError(f"unsupported cache codec version {version}")
+    # Both serializers emit JSON, so either decoder reads either body
+    body = _decompress(blob[HEADER_LEN:], compression)
+    return _loads(body), len(body)
+
+
+def decode(blob):
+    """Inverse of encode()."""
+    return decode_sized(blob)[0]
@@ -0,0 +1,139 @@
+"""
+Chart and graph aggregates for a search's interaction rows.
+
+They are computed once when an entry is built (parsers.build_cache_entry)
+and cached with it, so rendering the search page only embeds these small
+summaries: interaction type counts for the pie chart, score buckets, the
+top-N interactions by score for the bar chart, and a deduplicated
+gene/drug graph for the network view.
+"""
+import heapq
+import os
+from collections import Counter
+
+# Bump when the shape changes; entries with another version are recomputed on read
+AGGREGATES_VERSION = 1
+
+TOP_N = int(os.getenv("CHART_TOP_N", "100"))
+GRAPH_MAX_EDGES = int(os.getenv("CHART_GRAPH_MAX_EDGES", "300"))
+
+# Upper bounds of the score distribution buckets (the last one is open-ended)
+SCORE_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+
+
+def _bucket(score):
+    for i, bound in enumerate(SCORE_BUCKETS):
+        if score <= bound:
+            return i
+    return len(SCORE_BUCKETS)
+
+
+def _node_id(label, name):
+    return f"{label}:{name}"
+
+
+def _score_key(item):
+    return item.get("score") if item.get("score") is not None else float("-inf")
+
+
+def _cap_graph(nodes, edges):
+    """Keeps the GRAPH_MAX_EDGES strongest edges and the nodes they touch."""
+    edge_count = len(edges)
+    if edge_count > GRAPH_MAX_EDGES:
+        edges = heapq.nlargest(GRAPH_MAX_EDGES, edges, key=lambda e: e["value"] if e["value"] is not None else -1)
+    used = set()
+    for e in edges:
+        used.add(e["from"])
+        used.add(e["to"])
+    return {
+        "nodes": [n for n in nodes if n["id"] in used],
+        "edges": edges,
+        "edge_count": edge_count,
+    }
+
+
+def _add_edge(edges, key, score, types):
+    edge = edges.get(key)
+    if edge is None:
+        edges[key] = {"from": key[0], "to": key[1], "value": score, "types": list(types)}
+        return
+    if score is not None and (edge["value"] is None or score > edge["value"]):
+        edge["value"] = score
+    for t in types:
+        if t not in edge["types"]:
+            edge["types"].append(t)
+
+
+def build_aggregates(rows):
+    """Aggregates for gene/drug interaction rows (protein rows produce empty ones)."""
+    type_counts = Counter()
+    bucket_counts = [0] * (len(SCORE_BUCKETS) + 1)
+    unscored = 0
+    scored = []
+    nodes = {}
+    edges = {}
+
+    for r in rows:
+        types = r.get("interaction_type_list") or []
+        type_counts.update(types)
+        if "left_label" not in r:
+            continue
+
+        score = r.get("score")
+        if score is None:
+            unscored += 1
+        else:
+            bucket_counts[_bucket(score)] += 1
+            scored.append({"left_name": r.get("left_name"), "right_name": r.get("right_name"), "score": score})
+
+        left = _node_id(r["left_label"], r.get("left_name"))
+        right = _node_id(r.get("right_label"), r.get("right_name"))
+        nodes.setdefault(left, {"id": left, "label": r.get("left_name"), "group": r["left_label"]})
+        nodes.setdefault(right, {"id": right, "label": r.get("right_name"), "group": r.get("right_label")})
+        _add_edge(edges, (left, right), score, types)
+
+    return {
+        "version": AGGREGATES_VERSION,
+        "type_counts": dict(type_counts),
+        "score_histogram": {"bounds": list(SCORE_BUCKETS), "counts": bucket_counts, "unscored": unscored},
+        "top_scores": heapq.nlargest(TOP_N, scored, key=_score_key),
+        "graph": _cap_graph(list(nodes.values()), list(edges.values())),
+    }
+
+
+def aggregates_for(data):
+    """The entry's stored aggregates, recomputed from its rows if missing or from an older version."""
+    data = data or {}
+    aggregates = data.get("aggregates")
+    if aggregates and aggregates.get("version") == AGGREGATES_VERSION:
+        return aggregates
+    return build_aggregates(data.get("rows") or [])
+
+
+def merge_aggregates(parts):
+    """Combines per-term aggregates (batch searches) without touching their rows."""
+    type_counts = Counter()
+    bucket_counts = [0] * (len(SCORE_BUCKETS) + 1)
+    unscored = 0
+    scored = []
+    nodes = {}
+    edges = {}
+
+    for agg in parts:
+        type_counts.update(agg["type_counts"])
+        histogram = agg["score_histogram"]
+        bucket_counts = [a + b for a, b in zip(bucket_counts, histogram["counts"])]
+        unscored += histogram["unscored"]
+        scored.extend(agg["top_scores"])
+        for n in agg["graph"]["nodes"]:
+            nodes.setdefault(n["id"], n)
+        for e in agg["graph"]["edges"]:
+            _add_edge(edges, (e["from"], e["to"]), e["value"], e["types"])
+
+    return {
+        "version": AGGREGATES_VERSION,
+        "type_counts": dict(type_counts),
+        "score_histogram": {"bounds": list(SCORE_BUCKETS), "counts": bucket_counts, "unscored": unscored},
+        "top_scores": heapq.nlargest(TOP_N, scored, key=_score_key),
+        "graph": _cap_graph(list(nodes.values()), list(edges.values())),
+    }
@@ -1,19 +1,261 @@
-from flask_mysqldb import MySQL
 from dotenv import load_dotenv
 import os
-import json
-import mysql.connector as mysql_conn
-from mysql.connector import Error
+import threading
+import time
+
+try:
+    from flask_mysqldb import MySQL
+except ImportError:  # the benchmarks' SQLite mode and the unit tests run without MySQL drivers
+    MySQL = None
+try:
+    import mysql.connector as mysql_conn
+    from mysql.connector import Error
+except ImportError:
+    mysql_conn = None
+    Error = Exception
+
+import cache_codec
+import metrics
 
 load_dotenv()
 
-mysql = MySQL()
+
+class _NoMySQL:
+    """Takes flask_mysqldb's place when it isn't installed: every query fails like a lost connection."""
+
+    def init_app(self, app):
+        print("flask_mysqldb is not installed; MySQL queries will fail")
+
+    @property
+    def connection(self):
+        raise RuntimeError("flask_mysqldb is not installed")
+
+
+mysql = MySQL() if MySQL is not None else _NoMySQL()
 
 DB_HOST = os.getenv("DB_HOST")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_NAME = os.getenv("DB_NAME")
 
+# Cache expiry settings (entries are refreshed on every save)
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_PURGE_INTERVAL = int(os.getenv("CACHE_PURGE_INTERVAL", "3600"))
+CACHE_PURGE_BATCH = int(os.getenv("CACHE_PURGE_BATCH", "1000"))
+
+_purge_thread = None
+
+INTERACTION_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS genes (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        concept_id VARCHAR(64) NULL,
+        long_name VARCHAR(255) NULL,
+        UNIQUE KEY uq_gene_name (name),
+        INDEX idx_gene_concept (concept_id)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS drugs (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        concept_id VARCHAR(64) NULL,
+        UNIQUE KEY uq_drug_name (name),
+        INDEX idx_drug_concept (concept_id)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS interactions (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        gene_id INT NOT NULL,
+        drug_id INT NOT NULL,
+        score DOUBLE NULL,
+        cached TINYINT(1) NOT NULL DEFAULT 0,
+        mirror_release_id INT NULL,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        UNIQUE KEY uq_gene_drug (gene_id, drug_id),
+        INDEX idx_drug_gene (drug_id, gene_id),
+        INDEX idx_mirror_release (mirror_release_id),
+        FOREIGN KEY (gene_id) REFERENCES genes(id) ON DELETE CASCADE,
+        FOREIGN KEY (drug_id) REFERENCES drugs(id) ON DELETE CASCADE
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS interaction_types (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        type VARCHAR(64) NOT NULL,
+        directionality VARCHAR(32) NOT NULL DEFAULT '',
+        UNIQUE KEY uq_type_dir (type, directionality)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS interaction_type_links (
+        interaction_id INT NOT NULL,
+        type_id INT NOT NULL,
+        PRIMARY KEY (interaction_id, type_id),
+        FOREIGN KEY (interaction_id) REFERENCES interactions(id) ON DELETE CASCADE,
+        FOREIGN KEY (type_id) REFERENCES interaction_types(id)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sources (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        name VARCHAR(128) NOT NULL,
+        UNIQUE KEY uq_source_name (name)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS interaction_sources (
+        interaction_id INT NOT NULL,
+        source_id INT NOT NULL,
+        PRIMARY KEY (interaction_id, source_id),
+        FOREIGN KEY (interaction_id) REFERENCES interactions(id) ON DELETE CASCADE,
+        FOREIGN KEY (source_id) REFERENCES sources(id)
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS interaction_publications (
+        interaction_id INT NOT NULL,
+        pmid BIGINT NOT NULL,
+        PRIMARY KEY (interaction_id, pmid),
+        INDEX idx_pmid (pmid),
+        FOREIGN KEY (interaction_id) REFERENCES interactions(id) ON DELETE CASCADE
+    );
+    """,
+    # Filled by dgidb_mirror.py from DGIdb's bulk downloads
+    """
+    CREATE TABLE IF NOT EXISTS gene_categories (
+        gene_id INT NOT NULL,
+        category VARCHAR(128) NOT NULL,
+        PRIMARY KEY (gene_id, category),
+        INDEX idx_category (category),
+        FOREIGN KEY (gene_id) REFERENCES genes(id) ON DELETE CASCADE
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dgidb_mirror_releases (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        label VARCHAR(64) NOT NULL,
+        genes INT NOT NULL DEFAULT 0,
+        drugs INT NOT NULL DEFAULT 0,
+        interactions INT NOT NULL DEFAULT 0,
+        complete TINYINT(1) NOT NULL DEFAULT 0,
+        loaded_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    """,
+]
+
+
+def normalize_cache_key(query):
+    """Cache keys are stored trimmed and lowercased so lookups hit the unique index."""
+    return (query or "").strip().lower()
+
+
+def _connect():
+    return mysql_conn.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        database=DB_NAME
+    )
+
+
+def _column_exists(cursor, table, column):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (DB_NAME, table, column))
+    return cursor.fetchone()[0] > 0
+
+
+def _index_exists(cursor, table, index):
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND INDEX_NAME = %s
+    """, (DB_NAME, table, index))
+    return cursor.fetchone()[0] > 0
+
+
+def _migrate_interactions(cursor):
+    """
+    Adds the provenance columns to interaction tables created by older
+    versions. Existing rows count as API-cached, so a mirror replace never
+    drops them.
+    """
+    if not _column_exists(cursor, "interactions", "cached"):
+        cursor.execute("ALTER TABLE interactions ADD COLUMN cached TINYINT(1) NOT NULL DEFAULT 0 AFTER score")
+        cursor.execute("UPDATE interactions SET cached = 1")
+    if not _column_exists(cursor, "interactions", "mirror_release_id"):
+        cursor.execute("ALTER TABLE interactions ADD COLUMN mirror_release_id INT NULL AFTER cached")
+    if not _index_exists(cursor, "interactions", "idx_mirror_release"):
+        cursor.execute("ALTER TABLE interactions ADD INDEX idx_mirror_release (mirror_release_id)")
+    if not _column_exists(cursor, "dgidb_mirror_releases", "complete"):
+        cursor.execute("ALTER TABLE dgidb_mirror_releases ADD COLUMN complete TINYINT(1) NOT NULL DEFAULT 0")
+        cursor.execute("UPDATE dgidb_mirror_releases SET complete = 1")
+
+
+def _migrate_search_cache(cursor):
+    """Bring a search_cache table created by older versions up to the indexed schema."""
+    if not _column_exists(cursor, "search_cache", "refreshed_at"):
+        cursor.execute("""
+            ALTER TABLE search_cache
+            ADD COLUMN refreshed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        """)
+    if not _column_exists(cursor, "search_cache", "expires_at"):
+        cursor.execute("""
+            ALTER TABLE search_cache
+            ADD COLUMN expires_at TIMESTAMP NULL DEFAULT NULL
+        """)
+        cursor.execute(
+            "UPDATE search_cache SET expires_at = created_at + INTERVAL %s SECOND",
+            (CACHE_TTL_SECONDS,)
+        )
+
+    if not _index_exists(cursor, "search_cache", "uq_query_type"):
+        # Rows without a key can't be looked up, and would fail (strict mode) or be
+        # coerced to '' and collide (non-strict) when the columns become NOT NULL
+        cursor.execute("DELETE FROM search_cache WHERE query IS NULL OR search_type IS NULL")
+        # Old tables were append-only: normalize keys and keep only the newest row per key
+        cursor.execute("UPDATE search_cache SET query = LOWER(TRIM(query))")
+        cursor.execute("""
+            DELETE older FROM search_cache older
+            JOIN search_cache newer
+              ON older.query = newer.query
+             AND older.search_type = newer.search_type
+             AND older.id < newer.id
+        """)
+        cursor.execute("""
+            ALTER TABLE search_cache
+            MODIFY query VARCHAR(255) NOT NULL,
+            MODIFY search_type VARCHAR(50) NOT NULL,
+            ADD UNIQUE KEY uq_query_type (query, search_type)
+        """)
+    if not _index_exists(cursor, "search_cache", "idx_expires_at"):
+        cursor.execute("ALTER TABLE search_cache ADD INDEX idx_expires_at (expires_at)")
+    if not _column_exists(cursor, "search_cache", "result_blob"):
+        # Encoded (cache_codec) payloads; rows that still only have result_json are read as-is
+        cursor.execute("ALTER TABLE search_cache ADD COLUMN result_blob LONGBLOB NULL AFTER result_json")
+
+    # Listing/stats metadata so the Database page never has to read payloads
+    if not _column_exists(cursor, "search_cache", "result_count"):
+        cursor.execute("ALTER TABLE search_cache ADD COLUMN result_count INT NULL AFTER result_blob")
+    if not _column_exists(cursor, "search_cache", "payload_bytes"):
+        cursor.execute("ALTER TABLE search_cache ADD COLUMN payload_bytes INT NULL AFTER result_count")
+        cursor.execute("""
+            UPDATE search_cache
+            SET payload_bytes = COALESCE(LENGTH(result_blob), LENGTH(result_json))
+        """)
+    if not _index_exists(cursor, "search_cache", "idx_type_stats"):
+        cursor.execute("""
+            ALTER TABLE search_cache
+            ADD INDEX idx_type_stats (search_type, refreshed_at, result_count, payload_bytes)
+        """)
+    if not _index_exists(cursor, "search_cache", "idx_type_query"):
+        cursor.execute("ALTER TABLE search_cache ADD INDEX idx_type_query (search_type, query)")
+    if not _index_exists(cursor, "search_cache", "idx_refreshed_at"):
+        cursor.execute("ALTER TABLE search_cache ADD INDEX idx_refreshed_at (refreshed_at)")
+
 def initialize_database():
     try:
         #Connect WITHOUT selecting a database yet
@@ -44,12 +286,23 @@ def initialize_database():
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS search_cache (
                 id INT AUTO_INCREMENT PRIMARY KEY,
-                query VARCHAR(255),
-                search_type VARCHAR(50),
+                query VARCHAR(255) NOT NULL,
+                search_type VARCHAR(50) NOT NULL,
                 result_json LONGTEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                result_blob LONGBLOB,
+                result_count INT NULL,
+                payload_bytes INT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                refreshed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                expires_at TIMESTAMP NULL DEFAULT NULL,
+                UNIQUE KEY uq_query_type (query, search_type),
+                INDEX idx_expires_at (expires_at),
+                INDEX idx_type_stats (search_type, refreshed_at, result_count, payload_bytes),
+                INDEX idx_type_query (search_type, query),
+                INDEX idx_refreshed_at (refreshed_at)
             );
         """)
+        _migrate_search_cache(cursor)
 
         print("Table `search_cache` ready.")
 
@@ -63,6 +316,26 @@ def initialize_database():
                 time timestamp default current_timestamp)""")
         
         print("Table 'messages' ready.")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ncbi_gene_summary (
+                symbol VARCHAR(64) NOT NULL PRIMARY KEY,
+                gene_id VARCHAR(20) NULL,
+                description TEXT NULL,
+                fetched_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                expires_at TIMESTAMP NULL DEFAULT NULL,
+                INDEX idx_gene_id (gene_id)
+            );
+        """)
+
+        print("Table 'ncbi_gene_summary' ready.")
+
+        # Normalized interaction storage shared by gene and drug searches
+        for ddl in INTERACTION_TABLES:
+            cursor.execute(ddl)
+        _migrate_interactions(cursor)
+
+        print("Interaction tables ready.")
         
         conn.commit()
         cursor.close()
@@ -82,28 +355,100 @@ def init_app(app):
     app.config['MYSQL_PASSWORD'] = DB_PASSWORD
     app.config['MYSQL_DB'] = DB_NAME
 
+    start_purge_thread()
+
+
+def purge_entries(expired_only=True, search_type=None, batch_size=CACHE_PURGE_BATCH):
+    """
+    Deletes search_cache rows in small batches so the purge never holds long
+    locks on the table: expired rows only, or every row (optionally of one
+    search_type). Returns the number of rows removed.
+    """
+    where = []
+    params = []
+    if expired_only:
+        where.append("expires_at < NOW()")
+    if search_type:
+        where.append("search_type = %s")
+        params.append(search_type)
+    sql = "DELETE FROM search_cache"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " LIMIT %s"
+
+    removed = 0
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        while True:
+            cursor.execute(sql, (*params, batch_size))
+            conn.commit()
+            removed += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                break
+        cursor.close()
+        conn.close()
+    except Exception as e:
+        print("\n[DB ERROR - purge_entries]\n", e)
+    return removed
+
+
+def purge_expired_entries(batch_size=CACHE_PURGE_BATCH):
+    """Deletes expired search_cache rows. Returns the number of rows removed."""
+    return purge_entries(expired_only=True, batch_size=batch_size)
+
+
+def _purge_loop(interval):
+    while True:
+        time.sleep(interval)
+        removed = purge_expired_entries()
+        if removed:
+            print(f"Purged {removed} expired cache entries")
+
+
+def start_purge_thread(interval=CACHE_PURGE_INTERVAL):
+    """Starts the background purge of stale cache entries (once per process)."""
+    global _purge_thread
+    if interval <= 0 or (_purge_thread is not None and _purge_thread.is_alive()):
+        return
+    _purge_thread = threading.Thread(target=_purge_loop, args=(interval,), daemon=True)
+    _purge_thread.start()
+
 # CACHE SYSTEM FOR SEARCH RESULTS
 def get_cached_results(query, search_type):
     """
     Returns cached results from the search_cache table.
     """
+    entry = get_cached_entry(query, search_type)
+    return entry[0] if entry else None
+
+
+def get_cached_entry(query, search_type):
+    """
+    Returns (results, json_bytes) for a fresh cache row, or None. The size is
+    that of the decoded JSON body, so the in-memory tier can account for the
+    entry without re-encoding it.
+    """
     try:
         conn = mysql.connection
         cursor = conn.cursor()
 
         sql = """
-            SELECT result_json
+            SELECT result_blob, result_json
             FROM search_cache
             WHERE query = %s AND search_type = %s
+              AND (expires_at IS NULL OR expires_at > NOW())
         """
 
-        cursor.execute(sql, (query.lower(), search_type))
-        row = cursor.fetchone()
+        with metrics.span("mysql"):
+            cursor.execute(sql, (normalize_cache_key(query), search_type))
+            row = cursor.fetchone()
 
         cursor.close()
 
         if row:
-            return json.loads(row[0])
+            with metrics.span("decode"):
+                return cache_codec.decode_sized(row[0] if row[0] is not None else row[1])
 
         return None
 
@@ -112,27 +457,321 @@ def get_cached_results(query, search_type):
         return None
 
 
-def save_results(query, search_type, results):
+def save_results(query, search_type, results, ttl=None, result_count=None):
     """
-    Saves API results into the search_cache table.
+    Saves API results into the search_cache table. An existing entry for the
+    same (query, search_type) is replaced and its expiry pushed forward.
+    The value is written through cache_codec (compressed, versioned) and the
+    legacy result_json column is cleared. `result_count` (number of table
+    rows, for the Database page) defaults to len(results["rows"]). Returns
+    the entry's uncompressed JSON size (for memory-tier accounting), or None
+    if the write failed.
     """
     try:
+        payload, json_bytes = cache_codec.encode_sized(results)
+        if result_count is None and isinstance(results, dict) and isinstance(results.get("rows"), list):
+            result_count = len(results["rows"])
         conn = mysql.connection
         cursor = conn.cursor()
 
         sql = """
-            INSERT INTO search_cache (query, search_type, result_json)
-            VALUES (%s, %s, %s)
+            INSERT INTO search_cache (query, search_type, result_blob, result_json, result_count,
+                                      payload_bytes, refreshed_at, expires_at)
+            VALUES (%s, %s, %s, NULL, %s, %s, NOW(), NOW() + INTERVAL %s SECOND)
+            ON DUPLICATE KEY UPDATE
+                result_blob = VALUES(result_blob),
+                result_json = NULL,
+                result_count = VALUES(result_count),
+                payload_bytes = VALUES(payload_bytes),
+                refreshed_at = VALUES(refreshed_at),
+                expires_at = VALUES(expires_at)
         """
 
         cursor.execute(sql, (
-            query.lower(),
+            normalize_cache_key(query),
             search_type,
-            json.dumps(results)
+            payload,
+            result_count,
+            len(payload),
+            ttl if ttl is not None else CACHE_TTL_SECONDS
         ))
 
         conn.commit()
         cursor.close()
+        return json_bytes
 
     except Exception as e:
         print("\n[DB ERROR - save_results]\n", e)
+        return None
+
+
+def get_fresh_queries(queries, search_type, min_remaining=0):
+    """
+    Returns the subset of `queries` (as normalized keys) whose cache entries
+    stay valid for at least `min_remaining` more seconds.
+    """
+    keys = list({normalize_cache_key(q) for q in queries if q})
+    if not keys:
+        return set()
+    try:
+        conn = mysql.connection
+        cursor = conn.cursor()
+
+        placeholders = ", ".join(["%s"] * len(keys))
+        sql = f"""
+            SELECT query
+            FROM search_cache
+            WHERE search_type = %s AND query IN ({placeholders})
+              AND (expires_at IS NULL OR expires_at > NOW() + INTERVAL %s SECOND)
+        """
+
+        cursor.execute(sql, (search_type, *keys, int(min_remaining)))
+        fresh = {row[0] for row in cursor.fetchall()}
+        cursor.close()
+        return fresh
+
+    except Exception as e:
+        print("\n[DB ERROR - get_fresh_queries]\n", e)
+        return set()
+
+
+# DATABASE PAGE: listing, stats and export over search_cache metadata (never the payloads)
+ENTRY_COLUMNS = ("id", "query", "search_type", "result_count", "payload_bytes",
+                 "created_at", "refreshed_at", "expires_at")
+LISTING_SORTS = {
+    "query": "query",
+    "type": "search_type",
+    "timestamp": "refreshed_at",
+    "results": "result_count",
+}
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _entry_dict(row):
+    entry_id, query, search_type, result_count, payload_bytes, created_at, refreshed_at, expires_at = row
+    return {
+        "id": entry_id,
+        "query": query,
+        "search_type": search_type,
+        "result_count": result_count,
+        "payload_bytes": payload_bytes,
+        "created_at": _iso(created_at),
+        "refreshed_at": _iso(refreshed_at),
+        "expires_at": _iso(expires_at),
+    }
+
+
+def _listing_where(search_type=None, prefix=""):
+    """WHERE clause for the listing filters; the query prefix match uses idx_type_query / uq_query_type."""
+    where = []
+    params = []
+    if search_type:
+        where.append("search_type = %s")
+        params.append(search_type)
+    prefix = normalize_cache_key(prefix)
+    if prefix:
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        where.append("query LIKE %s")
+        params.append(escaped + "%")
+    return (" WHERE " + " AND ".join(where)) if where else "", params
+
+
+def cache_stats():
+    """
+    Aggregate search_cache statistics from covering indexes, plus approximate
+    row counts of the interaction tables. Returns a dict, or None on error.
+    """
+    try:
+        conn = mysql.connection
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT search_type, COUNT(*), COALESCE(SUM(result_count), 0),
+                   COALESCE(SUM(payload_bytes), 0), MAX(refreshed_at)
+            FROM search_cache
+            GROUP BY search_type
+        """)
+        by_type = {}
+        for search_type, entries, results, payload_bytes, last_refreshed in cursor.fetchall():
+            by_type[search_type] = {
+                "entries": entries,
+                "results": int(results),
+                "payload_bytes": int(payload_bytes),
+                "last_refreshed": _iso(last_refreshed),
+                "expired": 0,
+            }
+
+        cursor.execute("""
+            SELECT search_type, COUNT(*)
+            FROM search_cache
+            WHERE expires_at < NOW()
+            GROUP BY search_type
+        """)
+        for search_type, expired in cursor.fetchall():
+            if search_type in by_type:
+                by_type[search_type]["expired"] = expired
+
+        # InnoDB COUNT(*) scans the table; the statistics estimate is enough here
+        cursor.execute("""
+            SELECT TABLE_NAME, TABLE_ROWS FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = %s
+              AND TABLE_NAME IN ('genes', 'drugs', 'interactions', 'ncbi_gene_summary')
+        """, (DB_NAME,))
+        tables = {name: rows for name, rows in cursor.fetchall()}
+
+        cursor.close()
+    except Exception as e:
+        print("\n[DB ERROR - cache_stats]\n", e)
+        return None
+
+    return {
+        "total": sum(t["entries"] for t in by_type.values()),
+        "expired": sum(t["expired"] for t in by_type.values()),
+        "payload_bytes": sum(t["payload_bytes"] for t in by_type.values()),
+        "by_type": by_type,
+        "tables_approx": tables,
+    }
+
+
+def list_cache_entries(search_type=None, prefix="", sort="timestamp", order="desc", limit=25, offset=0):
+    """
+    One page of search_cache metadata. Returns (matched, entries) or None on
+    error. Rows are picked on the index first and only then joined back, so
+    deep pages don't read the skipped rows.
+    """
+    column = LISTING_SORTS.get(sort, "refreshed_at")
+    direction = "ASC" if order == "asc" else "DESC"
+    where, params = _listing_where(search_type, prefix)
+
+    try:
+        conn = mysql.connection
+        cursor = conn.cursor()
+
+        cursor.execute(f"SELECT COUNT(*) FROM search_cache{where}", params)
+        matched = cursor.fetchone()[0]
+
+        cursor.execute(f"""
+            SELECT {", ".join("c." + c for c in ENTRY_COLUMNS)}
+            FROM search_cache c
+            JOIN (
+                SELECT id FROM search_cache{where}
+                ORDER BY {column} {direction}, id {direction}
+                LIMIT %s OFFSET %s
+            ) page ON page.id = c.id
+            ORDER BY c.{column} {direction}, c.id {direction}
+        """, (*params, limit, offset))
+        entries = [_entry_dict(row) for row in cursor.fetchall()]
+
+        cursor.close()
+        return matched, entries
+    except Exception as e:
+        print("\n[DB ERROR - list_cache_entries]\n", e)
+        return None
+
+
+def iter_cache_entries(search_type=None, prefix="", batch_size=CACHE_PURGE_BATCH):
+    """
+    Yields every matching search_cache metadata row in id order, reading
+    batch_size rows per query (keyset on id) on its own connection, so an
+    export can stream a large cache without holding it in memory.
+    """
+    where, params = _listing_where(search_type, prefix)
+    where = (where + " AND" if where else " WHERE") + " id > %s"
+
+    conn = None
+    try:
+        conn = _connect()
+        cursor = conn.cursor()
+        last_id = 0
+        while True:
+            cursor.execute(
+                f"SELECT {', '.join(ENTRY_COLUMNS)} FROM search_cache{where} ORDER BY id LIMIT %s",
+                (*params, last_id, batch_size)
+            )
+            rows = cursor.fetchall()
+            for row in rows:
+                yield _entry_dict(row)
+            if len(rows) < batch_size:
+                break
+            last_id = rows[-1][0]
+        cursor.close()
+    except Exception as e:
+        print("\n[DB ERROR - iter_cache_entries]\n", e)
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+# NCBI GENE SUMMARY CACHE
+def get_ncbi_summaries(symbols):
+    """
+    Returns {SYMBOL: (gene_id, description)} for fresh rows. A row with no
+    gene_id records that NCBI had no match, so the lookup isn't repeated.
+    """
+    keys = list({s.strip().upper() for s in symbols if s})
+    if not keys:
+        return {}
+    try:
+        conn = mysql.connection
+        cursor = conn.cursor()
+
+        placeholders = ", ".join(["%s"] * len(keys))
+        cursor.execute(f"""
+            SELECT symbol, gene_id, description
+            FROM ncbi_gene_summary
+            WHERE symbol IN ({placeholders})
+              AND (expires_at IS NULL OR expires_at > NOW())
+        """, keys)
+        found = {row[0].upper(): (row[1], row[2]) for row in cursor.fetchall()}
+        cursor.close()
+        return found
+
+    except Exception as e:
+        print("\n[DB ERROR - get_ncbi_summaries]\n", e)
+        return {}
+
+
+def get_ncbi_summary_by_gene_id(gene_id):
+    """Returns (symbol, description) for a cached Entrez gene ID, or None."""
+    try:
+        conn = mysql.connection
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT symbol, description
+            FROM ncbi_gene_summary
+            WHERE gene_id = %s AND (expires_at IS NULL OR expires_at > NOW())
+            LIMIT 1
+        """, (str(gene_id),))
+        row = cursor.fetchone()
+        cursor.close()
+        return (row[0], row[1]) if row else None
+
+    except Exception as e:
+        print("\n[DB ERROR - get_ncbi_summary_by_gene_id]\n", e)
+        return None
+
+
+def save_ncbi_summaries(entries, ttl):
+    """Upserts (symbol, gene_id, description) tuples with a `ttl` in seconds."""
+    if not entries:
+        return
+    try:
+        conn = mysql.connection
+        cursor = conn.cursor()
+        cursor.executemany("""
+            INSERT INTO ncbi_gene_summary (symbol, gene_id, description, fetched_at, expires_at)
+            VALUES (%s, %s, %s, NOW(), NOW() + INTERVAL %s SECOND)
+            ON DUPLICATE KEY UPDATE
+                gene_id = VALUES(gene_id),
+                description = VALUES(description),
+                fetched_at = VALUES(fetched_at),
+                expires_at = VALUES(expires_at)
+        """, [(sym.strip().upper(), gid, desc, int(ttl)) for sym, gid, desc in entries])
+        conn.commit()
+        cursor.close()
+
+    except Exception as e:
+        print("\n[DB ERROR - save_ncbi_summaries]\n", e)
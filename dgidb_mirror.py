@@ -0,0 +1,439 @@
+"""
+Local DGIdb mirror built from DGIdb's bulk TSV downloads.
+
+A release directory holds interactions.tsv, genes.tsv, drugs.tsv and
+categories.tsv (https://dgidb.org/downloads). Loading it fills the same
+genes / drugs / interactions tables interaction_store uses, plus
+gene_categories, and records the release in dgidb_mirror_releases. Its
+interactions carry the release id; --replace retires the previous
+release's rows afterwards, deleting only those no search cache entry
+relies on:
+
+    python dgidb_mirror.py load /data/dgidb/2024-12 --release 2024-12 --replace
+    python dgidb_mirror.py status
+
+With DGIDB_SOURCE=mirror (or mirror_fallback, which asks the live API only
+for names the mirror doesn't know) app.queryDgidb answers gene and drug
+searches from the mirror's rows in the GraphQL shape the parsers expect.
+A name counts as known to the mirror once it has a mirror interaction;
+genes and drugs that only API caching stored go to the live API.
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+
+import metrics
+from db_conn import mysql, _connect
+from interaction_store import ROOTS, name_key, chunks, marks, name_ids, select_interactions, build_results, \
+    upsert_nodes, store_interactions
+
+RELEASE_FILES = {
+    "interactions": "interactions.tsv",
+    "genes": "genes.tsv",
+    "drugs": "drugs.tsv",
+    "categories": "categories.tsv",
+}
+BATCH_SIZE = 2000
+
+# How long a "is a release loaded" answer is trusted before asking MySQL again
+RELEASE_CHECK_SECONDS = 60
+
+# Header names across DGIdb release formats; the first one present is used
+COLUMNS = {
+    "gene_name": ("gene_name", "name"),
+    "gene_concept_id": ("gene_concept_id", "concept_id"),
+    "gene_long_name": ("gene_long_name", "long_name"),
+    "drug_name": ("drug_name", "name"),
+    "drug_concept_id": ("drug_concept_id", "concept_id"),
+    "interaction_type": ("interaction_type", "interaction_types"),
+    "directionality": ("interaction_directionality", "directionality"),
+    "source": ("interaction_source_db_name", "source_db_name", "interaction_claim_source"),
+    "score": ("interaction_score",),
+    "pmids": ("pmids", "PMIDs", "publications"),
+    "category_gene": ("gene_name", "name_of_gene", "entrez_gene_symbol"),
+    "category": ("category", "gene_category", "category_name"),
+}
+
+# The bulk files have no directionality column; DGIdb reports these for its types
+DIRECTIONALITY = {
+    "inhibitor": "INHIBITORY", "antagonist": "INHIBITORY", "blocker": "INHIBITORY",
+    "channel blocker": "INHIBITORY", "inverse agonist": "INHIBITORY", "negative modulator": "INHIBITORY",
+    "suppressor": "INHIBITORY", "antisense oligonucleotide": "INHIBITORY", "inhibitory allosteric modulator": "INHIBITORY",
+    "agonist": "ACTIVATING", "partial agonist": "ACTIVATING", "activator": "ACTIVATING", "inducer": "ACTIVATING",
+    "positive modulator": "ACTIVATING", "stimulator": "ACTIVATING", "potentiator": "ACTIVATING",
+    "positive allosteric modulator": "ACTIVATING",
+}
+
+# Values the dumps use for "no value"
+_EMPTY = {"", "NULL", "null", "None", "NA", "N/A"}
+_LIST_SPLIT = re.compile(r"[,|;]")
+
+# Names longer than the genes/drugs name columns are skipped
+MAX_NAME_LENGTH = 255
+
+_release_checked = [0.0, False]  # [checked_at, loaded]
+
+
+# ---- reading the TSVs ----
+
+def _value(row, columns, key):
+    column = columns.get(key)
+    value = (row.get(column) or "").strip() if column else ""
+    return None if value in _EMPTY else value
+
+
+def _split(value):
+    return [v.strip() for v in _LIST_SPLIT.split(value or "") if v.strip() and v.strip() not in _EMPTY]
+
+
+def _read(path, keys):
+    """Yields (row, columns) for a TSV, where columns maps each key in `keys` to its header."""
+    with open(path, encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f, delimiter="\t")
+        header = reader.fieldnames or []
+        columns = {}
+        for key in keys:
+            column = next((c for c in COLUMNS[key] if c in header), None)
+            if column:
+                columns[key] = column
+        for row in reader:
+            yield row, columns
+
+
+def _usable(name):
+    return bool(name) and len(name) <= MAX_NAME_LENGTH
+
+
+def read_genes(path):
+    """{UPPER(name): (name, concept_id, long_name)} from genes.tsv (one row per claim)."""
+    genes = {}
+    for row, columns in _read(path, ("gene_name", "gene_concept_id", "gene_long_name")):
+        name = _value(row, columns, "gene_name")
+        if not _usable(name):
+            continue
+        current = genes.get(name.upper())
+        cid = _value(row, columns, "gene_concept_id") or (current[1] if current else None)
+        long_name = _value(row, columns, "gene_long_name") or (current[2] if current else None)
+        genes[name.upper()] = (name, cid, long_name)
+    return genes
+
+
+def read_drugs(path):
+    """{UPPER(name): (name, concept_id)} from drugs.tsv (one row per claim)."""
+    drugs = {}
+    for row, columns in _read(path, ("drug_name", "drug_concept_id")):
+        name = _value(row, columns, "drug_name")
+        if not _usable(name):
+            continue
+        current = drugs.get(name.upper())
+        drugs[name.upper()] = (name, _value(row, columns, "drug_concept_id") or (current[1] if current else None))
+    return drugs
+
+
+def read_interactions(path):
+    """
+    Interaction records in interaction_store's format, one per gene/drug
+    pair: the dump has a row per source claim, so types, sources and PMIDs
+    are merged and the highest score kept.
+    """
+    pairs = {}
+    keys = ("gene_name", "gene_concept_id", "drug_name", "drug_concept_id",
+            "interaction_type", "directionality", "source", "score", "pmids")
+    for row, columns in _read(path, keys):
+        gene = _value(row, columns, "gene_name")
+        drug = _value(row, columns, "drug_name")
+        # claims DGIdb couldn't normalize to a gene and a drug aren't served by its API either
+        if not _usable(gene) or not _usable(drug):
+            continue
+
+        key = (gene.upper(), drug.upper())
+        record = pairs.get(key)
+        if record is None:
+            record = pairs[key] = {
+                "gene": (gene, _value(row, columns, "gene_concept_id"), None),
+                "drug": (drug, _value(row, columns, "drug_concept_id")),
+                "score": None, "types": [], "sources": [], "pmids": [],
+            }
+
+        try:
+            score = float(_value(row, columns, "score"))
+        except (TypeError, ValueError):
+            score = None
+        if score is not None and (record["score"] is None or score > record["score"]):
+            record["score"] = score
+
+        direction = _value(row, columns, "directionality")
+        for t in _split(_value(row, columns, "interaction_type")):
+            entry = (t, (direction or DIRECTIONALITY.get(t.lower(), "")).upper())
+            if entry not in record["types"]:
+                record["types"].append(entry)
+        source = _value(row, columns, "source")
+        if source and source not in record["sources"]:
+            record["sources"].append(source)
+        for p in _split(_value(row, columns, "pmids")):
+            if p not in record["pmids"]:
+                record["pmids"].append(p)
+
+    # gene-ordered batches keep each store_interactions batch to few genes
+    return [pairs[k] for k in sorted(pairs)]
+
+
+def read_categories(path):
+    """{UPPER(gene name): {category, ...}} from categories.tsv."""
+    categories = {}
+    for row, columns in _read(path, ("category_gene", "category")):
+        gene = _value(row, columns, "category_gene")
+        category = _value(row, columns, "category")
+        if _usable(gene) and category:
+            categories.setdefault(gene.upper(), set()).add(category[:128])
+    return categories
+
+
+# ---- loading a release ----
+
+def _retire(conn, cursor, release_id, batch_size):
+    """
+    Removes earlier releases from the mirror: their rows that a cache entry
+    relies on stay as plain cached rows, the rest are deleted (links
+    cascade) in batches. Returns the number of rows deleted.
+    """
+    deleted = 0
+    while True:
+        cursor.execute("""
+            DELETE FROM interactions
+            WHERE mirror_release_id IS NOT NULL AND mirror_release_id <> %s AND cached = 0
+            LIMIT %s
+        """, (release_id, batch_size))
+        conn.commit()
+        deleted += cursor.rowcount
+        if cursor.rowcount < batch_size:
+            break
+    cursor.execute("UPDATE interactions SET mirror_release_id = NULL WHERE mirror_release_id <> %s", (release_id,))
+    conn.commit()
+    return deleted
+
+
+def load_release(paths, label=None, replace=False, batch_size=BATCH_SIZE):
+    """
+    Loads one DGIdb release from {"interactions", "genes", "drugs", "categories"}
+    TSV paths (missing files are skipped; interactions is required). Each batch
+    is committed on its own, so a failed load can simply be rerun; searches
+    keep using the last complete release until this one is marked complete.
+    Returns the row counts recorded for the release.
+    """
+    started = time.time()
+    conn = _connect()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("INSERT INTO dgidb_mirror_releases (label) VALUES (%s)", (label or time.strftime("%Y-%m-%d"),))
+        release_id = cursor.lastrowid
+        conn.commit()
+
+        genes = read_genes(paths["genes"]) if paths.get("genes") else {}
+        drugs = read_drugs(paths["drugs"]) if paths.get("drugs") else {}
+        for chunk in chunks(genes.values(), batch_size):
+            upsert_nodes(cursor, chunk, [])
+            conn.commit()
+        for chunk in chunks(drugs.values(), batch_size):
+            upsert_nodes(cursor, [], chunk)
+            conn.commit()
+        print(f"Genes: {len(genes)}, drugs: {len(drugs)} ({time.time() - started:.1f}s)")
+
+        records = read_interactions(paths["interactions"])
+        for i, chunk in enumerate(chunks(records, batch_size)):
+            store_interactions(cursor, chunk, release_id)
+            conn.commit()
+            if i % 10 == 9:
+                print(f"Interactions: {min((i + 1) * batch_size, len(records))}/{len(records)}")
+        print(f"Interactions: {len(records)} ({time.time() - started:.1f}s)")
+
+        categories = read_categories(paths["categories"]) if paths.get("categories") else {}
+        if replace and categories:
+            cursor.execute("DELETE FROM gene_categories")
+            conn.commit()
+        category_rows = 0
+        for chunk in chunks(categories, batch_size):
+            gene_ids = name_ids(cursor, "genes", chunk)
+            rows = [(gene_ids[name_key(g)], c) for g in chunk if name_key(g) in gene_ids for c in categories[g]]
+            if rows:
+                cursor.executemany("INSERT IGNORE INTO gene_categories (gene_id, category) VALUES (%s, %s)", rows)
+                conn.commit()
+            category_rows += len(rows)
+        print(f"Gene categories: {category_rows}")
+
+        if replace:
+            print(f"Retired earlier releases: {_retire(conn, cursor, release_id, batch_size)} interactions deleted")
+
+        counts = {"genes": len(genes), "drugs": len(drugs), "interactions": len(records)}
+        cursor.execute("""
+            UPDATE dgidb_mirror_releases SET genes = %s, drugs = %s, interactions = %s, complete = 1
+            WHERE id = %s
+        """, (counts["genes"], counts["drugs"], counts["interactions"], release_id))
+        conn.commit()
+        return counts
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def latest_release(cursor):
+    """(label, loaded_at, genes, drugs, interactions) of the last completely loaded release, or None."""
+    cursor.execute("""
+        SELECT label, loaded_at, genes, drugs, interactions
+        FROM dgidb_mirror_releases WHERE complete = 1 ORDER BY id DESC LIMIT 1
+    """)
+    return cursor.fetchone()
+
+
+def release_loaded():
+    """True once a release has been loaded (checked at most every RELEASE_CHECK_SECONDS)."""
+    checked_at, loaded = _release_checked
+    if time.time() - checked_at < RELEASE_CHECK_SECONDS:
+        return loaded
+    try:
+        cursor = mysql.connection.cursor()
+        loaded = latest_release(cursor) is not None
+        cursor.close()
+    except Exception as e:
+        print("\n[DB ERROR - release_loaded]\n", e)
+        loaded = False
+    if not loaded:
+        print("DGIdb mirror: no release loaded (run `python dgidb_mirror.py load <dir>`)")
+    _release_checked[:] = [time.time(), loaded]
+    return loaded
+
+
+# ---- queries ----
+
+def _known_nodes(cursor, search_type, names):
+    """{name_key(name): (name, concept_id)} for the gene or drug names with a mirror interaction."""
+    table, column = ("genes", "gene_id") if search_type == "gene" else ("drugs", "drug_id")
+    known = {}
+    for chunk in chunks(set(names)):
+        cursor.execute(f"""
+            SELECT a.name, a.concept_id
+            FROM {table} a
+            WHERE a.name IN ({marks(len(chunk))})
+              AND EXISTS (SELECT 1 FROM interactions i WHERE i.{column} = a.id AND i.mirror_release_id IS NOT NULL)
+        """, chunk)
+        for name, cid in cursor.fetchall():
+            known[name_key(name)] = (name, cid)
+    return known
+
+
+def _gene_categories(cursor, names):
+    categories = {}
+    for chunk in chunks(names):
+        cursor.execute(f"""
+            SELECT g.name, c.category
+            FROM gene_categories c
+            JOIN genes g ON g.id = c.gene_id
+            WHERE g.name IN ({marks(len(chunk))})
+            ORDER BY c.category
+        """, chunk)
+        for name, category in cursor.fetchall():
+            categories.setdefault(name_key(name), []).append({"name": category})
+    return categories
+
+
+def query(search_type, names):
+    """
+    Answers a gene or drug search from the mirror as DGIdb GraphQL JSON.
+    Returns (results, missing) where `missing` lists the names the mirror
+    doesn't know; with no release loaded, or on a DB error, results is None
+    and every name is missing. Nodes are tagged "source": "mirror" so the
+    search cache pins their rows instead of writing them back.
+    """
+    names = [n for n in names if n]
+    if not names or not release_loaded():
+        return None, names
+
+    try:
+        cursor = mysql.connection.cursor()
+        with metrics.span("mirror"):
+            known = _known_nodes(cursor, search_type, names)
+            found = [name for name, _ in known.values()]
+            base, links = select_interactions(cursor, search_type, found, mirror_only=True) if found else ([], None)
+            categories = _gene_categories(cursor, found) if found and search_type == "gene" else {}
+        cursor.close()
+    except Exception as e:
+        print("\n[DB ERROR - dgidb_mirror.query]\n", e)
+        return None, names
+
+    root = ROOTS[search_type]
+    built = {}
+    if base:
+        built = {name_key(n["name"]): n for n in build_results(search_type, base, links)["data"][root]["nodes"]}
+
+    nodes = []
+    for key, (name, cid) in known.items():
+        node = built.get(key) or {"name": name, "conceptId": cid, "interactions": []}
+        node["source"] = "mirror"
+        if search_type == "gene":
+            node["geneCategories"] = categories.get(key, [])
+        nodes.append(node)
+    missing = [n for n in names if name_key(n) not in known]
+    return {"data": {root: {"nodes": nodes}}}, missing
+
+
+def merge(search_type, mirrored, fetched):
+    """Mirror results plus the API's nodes for the names the mirror was missing."""
+    root = ROOTS[search_type]
+    nodes = []
+    for results in (mirrored, fetched):
+        nodes.extend(((results or {}).get("data", {}).get(root, {}) or {}).get("nodes", []) or [])
+    return {"data": {root: {"nodes": nodes}}}
+
+
+# ---- CLI ----
+
+def main():
+    parser = argparse.ArgumentParser(description="Load DGIdb bulk TSV releases into the local mirror tables.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    load = sub.add_parser("load", help="load a release directory")
+    load.add_argument("directory", help="directory holding the release TSVs")
+    for kind, filename in RELEASE_FILES.items():
+        load.add_argument(f"--{kind}", help=f"path to the {kind} TSV (default: <directory>/{filename})")
+    load.add_argument("--release", help="label recorded for the release (default: today's date)")
+    load.add_argument("--replace", action="store_true",
+                      help="retire earlier releases' interactions and categories once this one is loaded")
+    load.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows written per transaction")
+
+    sub.add_parser("status", help="show the last loaded release")
+    args = parser.parse_args()
+
+    if args.command == "status":
+        conn = _connect()
+        cursor = conn.cursor()
+        release = latest_release(cursor)
+        cursor.close()
+        conn.close()
+        if release is None:
+            print("No DGIdb release loaded.")
+            return 1
+        label, loaded_at, genes, drugs, interactions = release
+        print(f"Release {label} loaded {loaded_at}: {genes} genes, {drugs} drugs, {interactions} interactions")
+        return 0
+
+    paths = {}
+    for kind, filename in RELEASE_FILES.items():
+        path = getattr(args, kind) or os.path.join(args.directory, filename)
+        if os.path.exists(path):
+            paths[kind] = path
+        else:
+            print(f"No {kind} file at {path}, skipping")
+    if "interactions" not in paths:
+        print("An interactions TSV is required.")
+        return 1
+
+    counts = load_release(paths, args.release, args.replace, args.batch_size)
+    print(f"Loaded DGIdb release: {counts}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
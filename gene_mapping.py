@@ -6,12 +6,13 @@ GENE_MAPPING = {
     "TPH2": ["Tryptophan Hydroxylase 2"]
 }
 
+# lowercased symbol/alias -> symbol, built once instead of per lookup
+_SYMBOLS = {}
+for _symbol, _aliases in GENE_MAPPING.items():
+    _SYMBOLS.setdefault(_symbol.lower(), _symbol)
+    for _alias in _aliases:
+        _SYMBOLS.setdefault(_alias.lower(), _symbol)
+
 def map_to_symbol(query):
     """Return the gene symbol for a given alias or symbol."""
-    query_lower = query.lower().strip()
-    for symbol, aliases in GENE_MAPPING.items():
-        if query_lower == symbol.lower():
-            return symbol
-        if query_lower in [a.lower() for a in aliases]:
-            return symbol
-    return None
+    return _SYMBOLS.get(query.lower().strip())
@@ -0,0 +1,345 @@
+"""
+In-process gene–drug graph over every interaction stored in MySQL.
+
+Genes and drugs get dense integer ids; edges are kept twice in CSR form
+(gene -> drugs and drug -> genes: an offsets array plus flat neighbour and
+score arrays), so a node's neighbours are one slice. Interactions saved
+after the arrays were built go into a small overlay that queries read
+alongside them, and the arrays are rebuilt once the overlay grows past
+GRAPH_COMPACT_EDGES. The graph is loaded on first use and reloaded every
+GRAPH_REFRESH_SECONDS to pick up rows written by other processes (other
+workers, dgidb_mirror.py).
+
+Query results carry a {"nodes", "edges", "edge_count"} graph in the same
+shape as the search page's chart aggregates, so the network view can draw
+them directly.
+"""
+import math
+import os
+import threading
+import time
+from array import array
+from collections import Counter, deque
+
+from db_conn import mysql
+
+GRAPH_REFRESH_SECONDS = int(os.getenv("GRAPH_REFRESH_SECONDS", "600"))
+GRAPH_COMPACT_EDGES = int(os.getenv("GRAPH_COMPACT_EDGES", "5000"))
+
+DEFAULT_NEIGHBORS = 50
+MAX_NEIGHBORS = 500
+MAX_PATH_HOPS = 8
+
+GENE, DRUG = "Gene", "Drug"
+_NO_SCORE = float("nan")
+
+
+def _score(value):
+    return None if value is None or math.isnan(value) else value
+
+
+class _CSR:
+    """Adjacency of `n` source nodes: neighbours of i are adj[ptr[i]:ptr[i + 1]]."""
+
+    def __init__(self, n, edges):
+        counts = [0] * (n + 1)
+        for src, _, _ in edges:
+            counts[src + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        self.ptr = array("i", counts)
+        self.adj = array("i", bytes(4 * len(edges)))
+        self.score = array("d", [0.0]) * len(edges)
+        fill = counts[:-1]
+        for src, dst, score in edges:
+            pos = fill[src]
+            self.adj[pos] = dst
+            self.score[pos] = _NO_SCORE if score is None else score
+            fill[src] = pos + 1
+
+    def __len__(self):
+        return len(self.adj)
+
+    def row(self, i):
+        """(neighbour, score) pairs of node i (empty for nodes added after the build)."""
+        if i + 1 >= len(self.ptr):
+            return ()
+        start, end = self.ptr[i], self.ptr[i + 1]
+        return zip(self.adj[start:end], self.score[start:end])
+
+
+class InteractionGraph:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loading = threading.Lock()
+        self.loaded_at = 0.0
+        self._reset()
+
+    def _reset(self):
+        self.names = {GENE: [], DRUG: []}    # dense id -> name
+        self._index = {GENE: {}, DRUG: {}}   # UPPER(name) -> dense id
+        self._csr = {GENE: _CSR(0, []), DRUG: _CSR(0, [])}
+        self._overlay = {GENE: {}, DRUG: {}}  # id -> {neighbour id: score}, edges saved since the build
+
+    # ---- building ----
+
+    def _node(self, kind, name):
+        key = name.upper()
+        node = self._index[kind].get(key)
+        if node is None:
+            node = self._index[kind][key] = len(self.names[kind])
+            self.names[kind].append(name)
+        return node
+
+    def _build(self, genes, drugs, edges):
+        """Replaces the arrays with `edges` [(gene id, drug id, score)] over the given name lists."""
+        self.names = {GENE: genes, DRUG: drugs}
+        self._index = {GENE: {n.upper(): i for i, n in enumerate(genes)},
+                       DRUG: {n.upper(): i for i, n in enumerate(drugs)}}
+        self._csr = {
+            GENE: _CSR(len(genes), edges),
+            DRUG: _CSR(len(drugs), [(d, g, s) for g, d, s in edges]),
+        }
+
+    def load(self):
+        """(Re)loads every stored interaction. Saves made meanwhile stay in the overlay."""
+        started = time.time()
+        try:
+            cursor = mysql.connection.cursor()
+            cursor.execute("SELECT id, name FROM genes")
+            gene_rows = cursor.fetchall()
+            cursor.execute("SELECT id, name FROM drugs")
+            drug_rows = cursor.fetchall()
+            cursor.execute("SELECT gene_id, drug_id, score FROM interactions")
+            interaction_rows = cursor.fetchall()
+            cursor.close()
+        except Exception as e:
+            print("\n[DB ERROR - interaction_graph.load]\n", e)
+            return False
+
+        gene_ids = {row_id: i for i, (row_id, _) in enumerate(gene_rows)}
+        drug_ids = {row_id: i for i, (row_id, _) in enumerate(drug_rows)}
+        edges = [(gene_ids[g], drug_ids[d], s) for g, d, s in interaction_rows if g in gene_ids and d in drug_ids]
+
+        with self._lock:
+            overlay = [(self.names[GENE][g], self.names[DRUG][d], s)
+                       for g, drugs in self._overlay[GENE].items() for d, s in drugs.items()]
+            self._build([n for _, n in gene_rows], [n for _, n in drug_rows], edges)
+            self._overlay = {GENE: {}, DRUG: {}}
+            self._add(overlay)
+            self.loaded_at = time.time()
+        print(f"Interaction graph: {len(gene_rows)} genes, {len(drug_rows)} drugs, "
+              f"{len(edges)} edges ({time.time() - started:.2f}s)")
+        return True
+
+    def ensure_loaded(self):
+        if time.time() - self.loaded_at < GRAPH_REFRESH_SECONDS:
+            return
+        # one request reloads; the others keep answering from the current arrays
+        if self._loading.acquire(blocking=self.loaded_at == 0):
+            try:
+                if time.time() - self.loaded_at >= GRAPH_REFRESH_SECONDS:
+                    self.load()
+            finally:
+                self._loading.release()
+
+    def _add(self, edges):
+        for gene, drug, score in edges:
+            g = self._node(GENE, gene)
+            d = self._node(DRUG, drug)
+            self._overlay[GENE].setdefault(g, {})[d] = _NO_SCORE if score is None else score
+            self._overlay[DRUG].setdefault(d, {})[g] = _NO_SCORE if score is None else score
+
+    def add_interactions(self, edges):
+        """
+        Applies [(gene name, drug name, score)] just saved to the tables.
+        Before the first load this is a no-op: the load will read them.
+        """
+        if not self.loaded_at:
+            return
+        with self._lock:
+            self._add(edges)
+            if self.overlay_size() > GRAPH_COMPACT_EDGES:
+                self._compact()
+
+    def overlay_size(self):
+        return sum(len(v) for v in self._overlay[GENE].values())
+
+    def _compact(self):
+        edges = [(g, d, s) for g in range(len(self.names[GENE])) for d, s in self._neighbors(GENE, g).items()]
+        self._build(list(self.names[GENE]), list(self.names[DRUG]), edges)
+        self._overlay = {GENE: {}, DRUG: {}}
+
+    # ---- lookups ----
+
+    def _neighbors(self, kind, node):
+        """{neighbour id: score} of a gene (drugs) or drug (genes); saved edges override the arrays."""
+        found = dict(self._csr[kind].row(node))
+        found.update(self._overlay[kind].get(node, {}))
+        return found
+
+    def lookup(self, kind, name):
+        return self._index[kind].get((name or "").upper())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "genes": len(self.names[GENE]),
+                "drugs": len(self.names[DRUG]),
+                "edges": len(self._csr[GENE]),
+                "overlay_edges": self.overlay_size(),
+                "loaded_at": self.loaded_at,
+            }
+
+    # ---- queries ----
+
+    def _graph(self, nodes, edges):
+        node_list = [{"id": f"{kind}:{self.names[kind][i]}", "label": self.names[kind][i], "group": kind}
+                     for kind, i in nodes]
+        edge_list = [{"from": f"{GENE}:{self.names[GENE][g]}", "to": f"{DRUG}:{self.names[DRUG][d]}",
+                      "value": _score(s), "types": []} for g, d, s in edges]
+        return {"nodes": node_list, "edges": edge_list, "edge_count": len(edge_list)}
+
+    def neighborhood(self, kind, name, hops=2, limit=DEFAULT_NEIGHBORS):
+        """
+        The node's direct partners and, with hops=2, the same-kind nodes they
+        lead to (genes sharing a drug with a gene, or drugs sharing a target),
+        ranked by how many partners they share. Returns None for unknown names.
+        """
+        other = DRUG if kind == GENE else GENE
+        limit = max(1, min(limit, MAX_NEIGHBORS))
+        with self._lock:
+            center = self.lookup(kind, name)
+            if center is None:
+                return None
+            partners = self._neighbors(kind, center)
+            ranked = sorted(partners.items(), key=lambda p: (-p[1] if not math.isnan(p[1]) else math.inf, p[0]))
+            direct = ranked[:limit]
+
+            shared = Counter()
+            via = {}
+            if hops >= 2:
+                for p, _ in direct:
+                    for n, s in self._neighbors(other, p).items():
+                        if n != center:
+                            shared[n] += 1
+                            via.setdefault(n, []).append((p, s))
+            second = shared.most_common(limit)
+
+            nodes = [(kind, center)] + [(other, p) for p, _ in direct] + [(kind, n) for n, _ in second]
+            edges = [self._edge(kind, center, p, s) for p, s in direct]
+            for n, _ in second:
+                edges.extend(self._edge(kind, n, p, s) for p, s in via[n])
+            return {
+                "center": {"type": kind.lower(), "name": self.names[kind][center]},
+                "partners": [{"name": self.names[other][p], "score": _score(s)} for p, s in direct],
+                "partner_count": len(partners),
+                "related": [{"name": self.names[kind][n], "shared": c,
+                             "via": [self.names[other][p] for p, _ in via[n]]} for n, c in second],
+                "graph": self._graph(nodes, edges),
+            }
+
+    @staticmethod
+    def _edge(kind, node, partner, score):
+        """(gene id, drug id, score) whichever side `node` is on."""
+        return (node, partner, score) if kind == GENE else (partner, node, score)
+
+    def shared_partners(self, kind, names, min_shared=2, limit=DEFAULT_NEIGHBORS):
+        """
+        Partners hit by at least `min_shared` of the given genes (their drugs)
+        or drugs (their targets). Returns (result, unknown names).
+        """
+        other = DRUG if kind == GENE else GENE
+        limit = max(1, min(limit, MAX_NEIGHBORS))
+        with self._lock:
+            found = []
+            unknown = []
+            for name in names:
+                node = self.lookup(kind, name)
+                if node is None:
+                    unknown.append(name)
+                elif node not in found:
+                    found.append(node)
+
+            hits = {}
+            for node in found:
+                for p, s in self._neighbors(kind, node).items():
+                    hits.setdefault(p, []).append((node, s))
+            need = max(1, min(min_shared, len(found)))
+            ranked = sorted(((p, h) for p, h in hits.items() if len(h) >= need), key=lambda x: (-len(x[1]), x[0]))
+            ranked = ranked[:limit]
+
+            nodes = [(kind, n) for n in found] + [(other, p) for p, _ in ranked]
+            edges = [self._edge(kind, n, p, s) for p, h in ranked for n, s in h]
+            return {
+                "type": kind.lower(),
+                "queried": [self.names[kind][n] for n in found],
+                "min_shared": need,
+                "shared": [{"name": self.names[other][p], "count": len(h),
+                            "by": [self.names[kind][n] for n, _ in h]} for p, h in ranked],
+                "graph": self._graph(nodes, edges),
+            }, unknown
+
+    def shortest_path(self, gene, drug, max_hops=MAX_PATH_HOPS):
+        """
+        Shortest gene–drug chain between a gene and a drug (bidirectional BFS
+        over the bipartite graph). Returns None for unknown names and
+        {"path": []} when they aren't connected within `max_hops` edges.
+        """
+        with self._lock:
+            g = self.lookup(GENE, gene)
+            d = self.lookup(DRUG, drug)
+            if g is None or d is None:
+                return None
+            start, goal = (GENE, g), (DRUG, d)
+            parents = [{start: None}, {goal: None}]
+            frontiers = [deque([start]), deque([goal])]
+            meet = None
+            hops = 0
+            while meet is None and frontiers[0] and frontiers[1] and hops < max_hops:
+                side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+                next_frontier = deque()
+                for kind, node in frontiers[side]:
+                    other = DRUG if kind == GENE else GENE
+                    for n in self._neighbors(kind, node):
+                        key = (other, n)
+                        if key in parents[side]:
+                            continue
+                        parents[side][key] = (kind, node)
+                        if key in parents[1 - side]:
+                            meet = key
+                            break
+                        next_frontier.append(key)
+                    if meet is not None:
+                        break
+                frontiers[side] = next_frontier
+                hops += 1
+
+            if meet is None:
+                return {"gene": self.names[GENE][g], "drug": self.names[DRUG][d], "path": [],
+                        "graph": self._graph([], [])}
+            path = []
+            step = meet
+            while step is not None:
+                path.append(step)
+                step = parents[0][step]
+            path.reverse()
+            step = parents[1][meet]
+            while step is not None:
+                path.append(step)
+                step = parents[1][step]
+
+            edges = []
+            for a, b in zip(path, path[1:]):
+                gene_node, drug_node = (a[1], b[1]) if a[0] == GENE else (b[1], a[1])
+                edges.append((gene_node, drug_node, self._neighbors(GENE, gene_node).get(drug_node)))
+            return {
+                "gene": self.names[GENE][g],
+                "drug": self.names[DRUG][d],
+                "hops": len(path) - 1,
+                "path": [{"type": kind.lower(), "name": self.names[kind][i]} for kind, i in path],
+                "graph": self._graph(path, edges),
+            }
+
+
+graph = InteractionGraph()
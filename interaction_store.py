@@ -0,0 +1,474 @@
+"""
+Normalized storage for DGIdb interactions.
+
+Gene and drug searches are stored once in the genes / drugs / interactions
+tables (plus type, source and publication link tables) instead of as a JSON
+blob per search term. The search_cache row for the term only records which
+DGIdb nodes and interaction ids it resolved to (plus the entry's chart
+aggregates and size); reads rebuild exactly those interactions as
+GraphQL-shaped results with indexed joins and run them through the usual
+parsers.
+
+dgidb_mirror.py loads into the same tables. Each interaction records its
+provenance: `cached` once a search cache entry relies on it, and
+`mirror_release_id` while it belongs to a loaded DGIdb release, so
+replacing a release only removes rows no cache entry points at.
+"""
+import unicodedata
+from bisect import bisect_right
+
+import interaction_graph
+import metrics
+import similarity
+from chart_aggregates import aggregates_for
+from db_conn import mysql, get_cached_entry, save_results
+from parsers import parseGeneResults, parseDrugResults, iterInteractionRows, build_cache_entry
+
+RELATIONAL_TYPES = ("gene", "drug")
+ROOTS = {"gene": "genes", "drug": "drugs"}
+
+# Max values bound into one IN (...) list
+IN_CHUNK = 1000
+
+
+def chunks(items, size=IN_CHUNK):
+    """Lists of at most `size` items, for binding into IN (...) lists."""
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def marks(n):
+    """`n` comma-separated %s placeholders."""
+    return ", ".join(["%s"] * n)
+
+
+def name_key(name):
+    """
+    Lookup key matching how MySQL's case- and accent-insensitive collation
+    compares names (Fluoxétine = FLUOXETINE, Straße = STRASSE; trailing
+    spaces are ignored), so names read back from the tables find their input.
+    """
+    decomposed = unicodedata.normalize("NFKD", name or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold().rstrip()
+
+
+def is_relational_marker(value):
+    return isinstance(value, dict) and value.get("storage") == "relational"
+
+
+def _extract(search_type, results):
+    """
+    Flattens a gene or drug search response into (node_names, records,
+    mirrored_names). Returns None if the response can't be keyed (e.g.
+    nodes without names).
+    """
+    nodes = ((results or {}).get("data", {}).get(ROOTS[search_type], {}) or {}).get("nodes", []) or []
+    node_names = []
+    records = []
+    mirrored = []
+    for n in nodes:
+        if not n.get("name"):
+            return None
+        node_names.append(n["name"])
+        if n.get("source") == "mirror":
+            # Answered from the local DGIdb mirror: already in the tables
+            mirrored.append(n["name"])
+            continue
+        for it in n.get("interactions", []) or []:
+            if search_type == "gene":
+                other = it.get("drug") or {}
+                gene = (n["name"], n.get("conceptId"), None)
+                drug = (other.get("name"), other.get("conceptId"))
+            else:
+                other = it.get("gene") or {}
+                gene = (other.get("name"), other.get("conceptId"), other.get("longName"))
+                drug = (n["name"], n.get("conceptId"))
+            if not other.get("name"):
+                continue
+            records.append({
+                "gene": gene,
+                "drug": drug,
+                "score": it.get("interactionScore"),
+                "types": [(t.get("type"), t.get("directionality") or "")
+                          for t in (it.get("interactionTypes") or []) if t.get("type")],
+                "sources": [s.get("sourceDbName") for s in (it.get("sources") or []) if s.get("sourceDbName")],
+                "pmids": [p.get("pmid") for p in (it.get("publications") or []) if p.get("pmid")],
+            })
+    return node_names, records, mirrored
+
+
+def name_ids(cursor, table, names):
+    """{name_key(stored name): id} for the given names, keyed on the names the SELECT returned."""
+    ids = {}
+    for chunk in chunks(set(names)):
+        cursor.execute(f"SELECT id, name FROM {table} WHERE name IN ({marks(len(chunk))})", chunk)
+        for row_id, name in cursor.fetchall():
+            ids[name_key(name)] = row_id
+    return ids
+
+
+def _replace_links(cursor, table, column, links, interaction_ids):
+    for chunk in chunks(interaction_ids):
+        cursor.execute(f"DELETE FROM {table} WHERE interaction_id IN ({marks(len(chunk))})", chunk)
+    if links:
+        cursor.executemany(
+            f"INSERT IGNORE INTO {table} (interaction_id, {column}) VALUES (%s, %s)",
+            list(links)
+        )
+
+
+def upsert_nodes(cursor, genes, drugs):
+    """Upserts (name, concept_id, long_name) genes and (name, concept_id) drugs; known values are kept over NULLs."""
+    if genes:
+        cursor.executemany("""
+            INSERT INTO genes (name, concept_id, long_name) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                concept_id = COALESCE(VALUES(concept_id), concept_id),
+                long_name = COALESCE(VALUES(long_name), long_name)
+        """, list(genes))
+    if drugs:
+        cursor.executemany("""
+            INSERT INTO drugs (name, concept_id) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE concept_id = COALESCE(VALUES(concept_id), concept_id)
+        """, list(drugs))
+
+
+def store_interactions(cursor, records, release_id=None):
+    """
+    Upserts interaction records and their links. Returns the interaction ids.
+    Rows are marked as cached, or as part of mirror release `release_id`.
+    """
+    genes = {}
+    drugs = {}
+    for r in records:
+        genes[name_key(r["gene"][0])] = r["gene"]
+        drugs[name_key(r["drug"][0])] = r["drug"]
+    if not records:
+        return []
+
+    upsert_nodes(cursor, genes.values(), drugs.values())
+    gene_ids = name_ids(cursor, "genes", [g[0] for g in genes.values()])
+    drug_ids = name_ids(cursor, "drugs", [d[0] for d in drugs.values()])
+
+    pairs = {}
+    for r in records:
+        g = gene_ids.get(name_key(r["gene"][0]))
+        d = drug_ids.get(name_key(r["drug"][0]))
+        if g is None or d is None:
+            # the collation matched the name to a row name_key doesn't equate it with
+            print("Skipping interaction with an unmatched name:", r["gene"][0], r["drug"][0])
+            continue
+        pairs[(g, d)] = r
+    if not pairs:
+        return []
+    if release_id is None:
+        cursor.executemany("""
+            INSERT INTO interactions (gene_id, drug_id, score, cached) VALUES (%s, %s, %s, 1)
+            ON DUPLICATE KEY UPDATE score = VALUES(score), cached = 1
+        """, [(g, d, r["score"]) for (g, d), r in pairs.items()])
+    else:
+        cursor.executemany("""
+            INSERT INTO interactions (gene_id, drug_id, score, mirror_release_id) VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE score = VALUES(score), mirror_release_id = VALUES(mirror_release_id)
+        """, [(g, d, r["score"], release_id) for (g, d), r in pairs.items()])
+
+    # Only the stored pairs: a gene_id IN (...) lookup would read every interaction of every partner
+    interaction_ids = {}
+    for chunk in chunks(pairs, IN_CHUNK // 2):
+        cursor.execute(
+            f"SELECT id, gene_id, drug_id FROM interactions WHERE (gene_id, drug_id) IN "
+            f"({', '.join(['(%s, %s)'] * len(chunk))})",
+            [v for pair in chunk for v in pair]
+        )
+        for row_id, g, d in cursor.fetchall():
+            interaction_ids[(g, d)] = row_id
+
+    type_keys = {t for r in pairs.values() for t in r["types"]}
+    type_ids = {}
+    if type_keys:
+        cursor.executemany(
+            "INSERT IGNORE INTO interaction_types (type, directionality) VALUES (%s, %s)",
+            list(type_keys)
+        )
+        cursor.execute("SELECT id, type, directionality FROM interaction_types")
+        type_ids = {(t.lower(), d.lower()): row_id for row_id, t, d in cursor.fetchall()}
+
+    source_names = {s for r in pairs.values() for s in r["sources"]}
+    source_ids = {}
+    if source_names:
+        cursor.executemany("INSERT IGNORE INTO sources (name) VALUES (%s)", [(s,) for s in source_names])
+        source_ids = name_ids(cursor, "sources", source_names)
+
+    type_links = set()
+    source_links = set()
+    pub_links = set()
+    for pair, r in pairs.items():
+        iid = interaction_ids.get(pair)
+        if iid is None:
+            continue
+        for t, d in r["types"]:
+            if (t.lower(), d.lower()) in type_ids:
+                type_links.add((iid, type_ids[(t.lower(), d.lower())]))
+        source_links.update((iid, source_ids[name_key(s)]) for s in r["sources"] if name_key(s) in source_ids)
+        pub_links.update((iid, int(p)) for p in r["pmids"] if str(p).isdigit())
+
+    ids = list(interaction_ids.values())
+    _replace_links(cursor, "interaction_type_links", "type_id", type_links, ids)
+    _replace_links(cursor, "interaction_sources", "source_id", source_links, ids)
+    _replace_links(cursor, "interaction_publications", "pmid", pub_links, ids)
+    return ids
+
+
+def pin_mirror_rows(cursor, search_type, names):
+    """
+    Marks the mirror rows a search entry was answered from as cached, so a
+    release replace keeps them. Returns their interaction ids.
+    """
+    anchor = "genes a ON a.id = i.gene_id" if search_type == "gene" else "drugs a ON a.id = i.drug_id"
+    ids = []
+    for chunk in chunks(names):
+        cursor.execute(f"""
+            UPDATE interactions i JOIN {anchor}
+            SET i.cached = 1
+            WHERE a.name IN ({marks(len(chunk))}) AND i.mirror_release_id IS NOT NULL
+        """, chunk)
+        cursor.execute(f"""
+            SELECT i.id FROM interactions i JOIN {anchor}
+            WHERE a.name IN ({marks(len(chunk))}) AND i.mirror_release_id IS NOT NULL
+        """, chunk)
+        ids.extend(row[0] for row in cursor.fetchall())
+    return ids
+
+
+def save_interaction_results(query, search_type, data, size=None):
+    """
+    Stores a gene/drug search entry relationally and records the term in
+    search_cache. Falls back to the JSON blob if the response can't be keyed.
+    `size` is the entry's JSON size, kept so reads can report it without
+    re-encoding the rebuilt entry. Returns True on success.
+    """
+    extracted = _extract(search_type, data.get("results"))
+    if extracted is None:
+        return save_results(query, search_type, data) is not None
+    node_names, records, mirrored = extracted
+
+    try:
+        conn = mysql.connection
+        cursor = conn.cursor()
+        interaction_ids = store_interactions(cursor, records)
+        if mirrored:
+            interaction_ids += pin_mirror_rows(cursor, search_type, mirrored)
+        conn.commit()
+        cursor.close()
+        interaction_graph.graph.add_interactions([(r["gene"][0], r["drug"][0], r["score"]) for r in records])
+        if records:
+            similarity.index.mark_stale()
+    except Exception as e:
+        print("\n[DB ERROR - save_interaction_results]\n", e)
+        try:
+            mysql.connection.rollback()
+        except Exception:
+            pass
+        return False
+
+    # Reads rebuild exactly these interactions, so the stored chart aggregates keep matching
+    # the rows even after other searches or a mirror load add interactions for the same nodes
+    marker = {
+        "storage": "relational",
+        "nodes": node_names,
+        "interactions": sorted(set(interaction_ids)),
+        "aggregates": aggregates_for(data),
+        "payload_bytes": size,
+    }
+    return save_results(query, search_type, marker, result_count=len(data.get("rows") or [])) is not None
+
+
+LINK_QUERIES = {
+    "interactionTypes": """
+        SELECT l.interaction_id, t.type, t.directionality
+        FROM interaction_type_links l
+        JOIN interaction_types t ON t.id = l.type_id
+        WHERE l.interaction_id IN ({marks})
+    """,
+    "sources": """
+        SELECT l.interaction_id, s.name
+        FROM interaction_sources l
+        JOIN sources s ON s.id = l.source_id
+        WHERE l.interaction_id IN ({marks})
+    """,
+    "publications": """
+        SELECT l.interaction_id, l.pmid
+        FROM interaction_publications l
+        WHERE l.interaction_id IN ({marks})
+    """,
+}
+
+
+BASE_COLUMNS = """
+    SELECT i.id, g.name, g.concept_id, g.long_name, d.name, d.concept_id, i.score
+    FROM interactions i
+"""
+
+
+def select_interactions(cursor, search_type, names, after_id=0, limit=None, mirror_only=False):
+    """
+    Base interaction rows for gene or drug `names` (ordered by id, keyset
+    after `after_id`; with `mirror_only`, rows of a loaded DGIdb release)
+    and their type/source/publication links.
+    Returns (base_rows, {link_key: {interaction_id: [values]}}).
+    """
+    anchor = "JOIN genes a ON a.id = i.gene_id" if search_type == "gene" else "JOIN drugs a ON a.id = i.drug_id"
+    mirror_filter = " AND i.mirror_release_id IS NOT NULL" if mirror_only else ""
+    sql = f"""{BASE_COLUMNS}
+        {anchor}
+        JOIN genes g ON g.id = i.gene_id
+        JOIN drugs d ON d.id = i.drug_id
+        WHERE a.name IN ({marks(len(names))}) AND i.id > %s{mirror_filter}
+        ORDER BY i.id
+    """
+    params = [*names, after_id]
+    if limit:
+        sql += " LIMIT %s"
+        params.append(limit)
+    cursor.execute(sql, params)
+    base = cursor.fetchall()
+    return base, select_links(cursor, base)
+
+
+def select_interactions_by_id(cursor, ids):
+    """Like select_interactions, for the given interaction ids (rows ordered by id)."""
+    base = []
+    for chunk in chunks(sorted(ids)):
+        cursor.execute(f"""{BASE_COLUMNS}
+            JOIN genes g ON g.id = i.gene_id
+            JOIN drugs d ON d.id = i.drug_id
+            WHERE i.id IN ({marks(len(chunk))})
+            ORDER BY i.id
+        """, chunk)
+        base.extend(cursor.fetchall())
+    return base, select_links(cursor, base)
+
+
+def select_links(cursor, base):
+    """{link_key: {interaction_id: [values]}} for base rows from select_interactions."""
+    links = {key: {} for key in LINK_QUERIES}
+    for chunk in chunks([row[0] for row in base]):
+        for key, sql in LINK_QUERIES.items():
+            cursor.execute(sql.format(marks=marks(len(chunk))), chunk)
+            grouped = links[key]
+            for row in cursor.fetchall():
+                grouped.setdefault(row[0], []).append(row[1:])
+    return links
+
+
+def build_results(search_type, base, links):
+    """GraphQL-shaped {"data": {root: {"nodes": [...]}}} for rows from select_interactions."""
+    nodes = {}
+    for iid, g_name, g_cid, g_long, d_name, d_cid, score in base:
+        interaction = {
+            "interactionScore": score,
+            "interactionTypes": [{"type": t, "directionality": d or None}
+                                 for t, d in links["interactionTypes"].get(iid, [])],
+            "publications": [{"pmid": p} for (p,) in links["publications"].get(iid, [])],
+            "sources": [{"sourceDbName": s} for (s,) in links["sources"].get(iid, [])],
+        }
+        if search_type == "gene":
+            node = nodes.setdefault(g_name, {"name": g_name, "conceptId": g_cid, "interactions": []})
+            interaction["drug"] = {"name": d_name, "conceptId": d_cid}
+        else:
+            node = nodes.setdefault(d_name, {"name": d_name, "conceptId": d_cid, "interactions": []})
+            interaction["gene"] = {"name": g_name, "conceptId": g_cid, "longName": g_long}
+        node["interactions"].append(interaction)
+    return {"data": {ROOTS[search_type]: {"nodes": list(nodes.values())}}}
+
+
+def load_interactions(search_type, names, aggregates=None, interaction_ids=None):
+    """
+    Rebuilds a cache entry ({"results", "rows", "aggregates"}) for gene or
+    drug `names` from the interaction tables, reusing stored `aggregates`
+    when given. With `interaction_ids` only those interactions are read;
+    otherwise every stored interaction of the names, which also answers
+    reverse lookups: a drug's genes are available once any gene search
+    stored them.
+    """
+    parse = parseGeneResults if search_type == "gene" else parseDrugResults
+    names = [n for n in names if n]
+    if not names or interaction_ids == []:
+        results = {"data": {ROOTS[search_type]: {"nodes": []}}}
+        return build_cache_entry(results, [])
+
+    try:
+        conn = mysql.connection
+        cursor = conn.cursor()
+        with metrics.span("mysql"):
+            if interaction_ids is not None:
+                base, links = select_interactions_by_id(cursor, interaction_ids)
+            else:
+                base, links = select_interactions(cursor, search_type, names)
+        cursor.close()
+    except Exception as e:
+        print("\n[DB ERROR - load_interactions]\n", e)
+        return None
+
+    with metrics.span("parse"):
+        results = build_results(search_type, base, links)
+        return build_cache_entry(results, parse(results), aggregates)
+
+
+def iter_stored_rows(search_type, names, batch_size=IN_CHUNK, interaction_ids=None):
+    """
+    Yields table row dicts for gene or drug `names` (only `interaction_ids`,
+    when given) straight from the interaction tables, batch_size
+    interactions per query, so exports of large result sets never hold
+    more than one batch.
+    """
+    names = [n for n in names if n]
+    if not names:
+        return
+    if interaction_ids is not None:
+        interaction_ids = sorted(interaction_ids)
+    after_id = 0
+    while True:
+        try:
+            cursor = mysql.connection.cursor()
+            if interaction_ids is not None:
+                start = bisect_right(interaction_ids, after_id)
+                batch = interaction_ids[start:start + batch_size]
+                base, links = select_interactions_by_id(cursor, batch)
+            else:
+                base, links = select_interactions(cursor, search_type, names, after_id, batch_size)
+                batch = [row[0] for row in base]
+            cursor.close()
+        except Exception as e:
+            print("\n[DB ERROR - iter_stored_rows]\n", e)
+            return
+        if not batch:
+            return
+        for row in iterInteractionRows(build_results(search_type, base, links), search_type):
+            yield row.to_dict()
+        if len(batch) < batch_size:
+            return
+        after_id = batch[-1]
+
+
+def load_interaction_results(query, search_type):
+    """
+    Cache read for gene/drug searches. Returns (data, stored_bytes) like
+    db_conn.get_cached_entry, or None on a miss. Entries written before the
+    relational tables existed are returned unchanged.
+    """
+    entry = get_cached_entry(query, search_type)
+    if entry is None:
+        return None
+    marker, size = entry
+    if not is_relational_marker(marker):
+        return entry
+    if "interactions" in marker:
+        data = load_interactions(search_type, marker.get("nodes", []), marker.get("aggregates"),
+                                 marker["interactions"])
+    else:
+        # written before markers kept their interaction ids: the rows may have
+        # gained interactions since, so the charts are recomputed from them
+        data = load_interactions(search_type, marker.get("nodes", []))
+    return (data, marker.get("payload_bytes")) if data is not None else None
@@ -0,0 +1,225 @@
+"""
+In-process request metrics: stage timing spans, upstream call histograms
+and cache counters, rendered in the Prometheus text format on /metrics and
+summarized as one structured (JSON) log line per request.
+
+Metrics are per process; with several workers, scrape each one or sum them.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# One JSON line per request with its stage timings
+REQUEST_LOG = os.getenv("REQUEST_LOG", "1") == "1"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Upstream hosts reported under a short name
+HOST_NAMES = {
+    "dgidb.org": "dgidb",
+    "rest.uniprot.org": "uniprot",
+    "eutils.ncbi.nlm.nih.gov": "ncbi",
+}
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            lines.append(f"{self.name}{_label_text(self.labels, label_values)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, series in items:
+            for bound, count in zip(self.buckets + (float("inf"),), series[:len(self.buckets)] + [series[-1]]):
+                labels = _label_text(self.labels + ("le",), label_values + (_number(bound),))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _label_text(self.labels, label_values)
+            lines.append(f"{self.name}_sum{labels} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram("dgit_http_request_seconds", "Request latency by route.",
+                            ("route", "method", "status"))
+STAGE_SECONDS = Histogram("dgit_stage_seconds", "Time spent in each stage of a request.", ("route", "stage"))
+UPSTREAM_SECONDS = Histogram("dgit_upstream_request_seconds", "Upstream API call latency by host.", ("host",))
+UPSTREAM_REQUESTS = Counter("dgit_upstream_requests_total", "Upstream API calls by host and outcome.",
+                            ("host", "status"))
+CACHE_REQUESTS = Counter("dgit_cache_requests_total", "Search cache lookups by tier, search type and result.",
+                         ("tier", "search_type", "result"))
+AI_CACHE_REQUESTS = Counter("dgit_ai_cache_requests_total", "Gemini response cache lookups.", ("kind", "result"))
+
+_REGISTRY = [REQUEST_SECONDS, STAGE_SECONDS, UPSTREAM_SECONDS, UPSTREAM_REQUESTS, CACHE_REQUESTS, AI_CACHE_REQUESTS]
+
+# Gauges computed at scrape time: name -> (help, fn returning {label tuple: value}, label names)
+_gauges = {}
+
+
+def register_gauge(name, help_text, fn, labels=()):
+    _gauges[name] = (help_text, fn, tuple(labels))
+
+
+# Per-request trace: route label and the spans recorded under it
+_trace = contextvars.ContextVar("dgit_trace", default=None)
+
+
+class Trace:
+    __slots__ = ("route", "started", "spans", "fields")
+
+    def __init__(self, route):
+        self.route = route
+        self.started = time.perf_counter()
+        self.spans = []
+        self.fields = {}
+
+
+def start_trace(route):
+    """Begins a trace for the current request (thread or task). Returns the reset token."""
+    return _trace.set(Trace(route))
+
+
+def current_trace():
+    return _trace.get()
+
+
+def annotate(**fields):
+    """Adds fields (e.g. search_type, cache tier) to the request's log line."""
+    trace = _trace.get()
+    if trace is not None:
+        trace.fields.update(fields)
+
+
+def end_trace(token, method, status):
+    """Records the request histogram and writes the structured log line."""
+    trace = _trace.get()
+    _trace.reset(token)
+    if trace is None:
+        return
+    elapsed = time.perf_counter() - trace.started
+    if METRICS_ENABLED:
+        REQUEST_SECONDS.observe(elapsed, trace.route, method, str(status))
+    if REQUEST_LOG:
+        stages = {}
+        for stage, seconds in trace.spans:
+            stages[stage] = round(stages.get(stage, 0) + seconds * 1000, 2)
+        record = {"event": "request", "route": trace.route, "method": method, "status": status,
+                  "duration_ms": round(elapsed * 1000, 2), "stages_ms": stages}
+        record.update(trace.fields)
+        print(json.dumps(record, default=str), flush=True)
+
+
+@contextmanager
+def span(stage):
+    """Times a stage of the current request (dgit_stage_seconds and the request log line)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        trace = _trace.get()
+        if trace is not None:
+            trace.spans.append((stage, elapsed))
+        if METRICS_ENABLED:
+            STAGE_SECONDS.observe(elapsed, trace.route if trace is not None else "background", stage)
+
+
+def host_label(url):
+    host = urlparse(url).hostname or "unknown"
+    return HOST_NAMES.get(host, host)
+
+
+def observe_upstream(host, seconds, status):
+    """`status` is the HTTP status code, or "error" when no response came back."""
+    if METRICS_ENABLED:
+        UPSTREAM_SECONDS.observe(seconds, host)
+        UPSTREAM_REQUESTS.inc(host, str(status))
+    trace = _trace.get()
+    if trace is not None:
+        trace.spans.append((f"upstream:{host}", seconds))
+
+
+def count_cache(tier, search_type, result):
+    if METRICS_ENABLED:
+        CACHE_REQUESTS.inc(tier, search_type or "", result)
+
+
+def count_ai_cache(kind, result):
+    if METRICS_ENABLED:
+        AI_CACHE_REQUESTS.inc(kind, result)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    for name, (help_text, fn, labels) in _gauges.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        try:
+            values = fn()
+        except Exception as e:
+            print("Metrics gauge failed:", name, e)
+            continue
+        for label_values, value in sorted(values.items()):
+            lines.append(f"{name}{_label_text(labels, label_values)} {_number(value)}")
+    return "\n".join(lines) + "\n"
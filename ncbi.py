@@ -0,0 +1,196 @@
+import os
+import threading
+import time
+
+import upstream
+from cache import MemoryCache
+from db_conn import get_ncbi_summaries, get_ncbi_summary_by_gene_id, save_ncbi_summaries
+
+NCBI_ESEARCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
+NCBI_ESUMMARY_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
+
+ENTREZ_API_KEY = os.getenv("ENTREZ_API_KEY")
+ENTREZ_EMAIL = os.getenv("ENTREZ_EMAIL")
+
+# Gene descriptions rarely change; "not found" answers are kept for less time
+NCBI_SUMMARY_TTL = int(os.getenv("NCBI_SUMMARY_TTL", str(30 * 24 * 3600)))
+NCBI_NEGATIVE_TTL = int(os.getenv("NCBI_NEGATIVE_TTL", str(24 * 3600)))
+NCBI_MEMORY_TTL = int(os.getenv("NCBI_MEMORY_TTL", str(6 * 3600)))
+
+# E-utilities allow 3 requests/s without an API key and 10/s with one
+NCBI_RATE = float(os.getenv("NCBI_RATE", "10" if ENTREZ_API_KEY else "3"))
+ESUMMARY_BATCH = 200
+
+# Memory marker for genes NCBI has no record of (None means "not cached")
+_NOT_FOUND = ""
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across all threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+_limiter = RateLimiter(NCBI_RATE)
+_memory = MemoryCache(max_entries=4096, max_bytes=16 * 1024 * 1024, ttl=NCBI_MEMORY_TTL)
+
+
+def _eutils_get(url, params):
+    params = dict(params, retmode="json", tool="DGIT")
+    if ENTREZ_API_KEY:
+        params["api_key"] = ENTREZ_API_KEY
+    if ENTREZ_EMAIL:
+        params["email"] = ENTREZ_EMAIL
+    _limiter.acquire()
+    r = upstream.get(url, params=params)
+    r.raise_for_status()
+    return r.json()
+
+
+def _esearch(term, retmax=1):
+    result = _eutils_get(NCBI_ESEARCH_URL, {"db": "gene", "term": term, "retmax": retmax})
+    return result.get("esearchresult", {}).get("idlist", [])
+
+
+def _esummary(gene_ids):
+    """One esummary call per ESUMMARY_BATCH ids. Returns {gene_id: doc}."""
+    gene_ids = list(dict.fromkeys(str(g) for g in gene_ids))
+    docs = {}
+    for i in range(0, len(gene_ids), ESUMMARY_BATCH):
+        chunk = gene_ids[i:i + ESUMMARY_BATCH]
+        result = _eutils_get(NCBI_ESUMMARY_URL, {"db": "gene", "id": ",".join(chunk)}).get("result", {})
+        for gid in result.get("uids", chunk):
+            if isinstance(result.get(gid), dict):
+                docs[gid] = result[gid]
+    return docs
+
+
+def _fetch_upstream(symbols):
+    """Returns {SYMBOL: (gene_id, description)}; (None, None) when NCBI has no match."""
+    found = {}
+    if len(symbols) > 1:
+        # One human-restricted esearch for every symbol, then one esummary
+        term = "(" + " OR ".join(f"{s}[sym]" for s in symbols) + ") AND 9606[taxid]"
+        wanted = set(symbols)
+        for gid, doc in _esummary(_esearch(term, retmax=len(symbols) * 5)).items():
+            name = (doc.get("name") or "").upper()
+            if name in wanted and name not in found:
+                found[name] = (gid, doc.get("description"))
+
+    # Whatever the batch didn't resolve uses the free-text lookup (first hit)
+    first_ids = {}
+    for s in symbols:
+        if s not in found:
+            ids = _esearch(s)
+            if ids:
+                first_ids[s] = ids[0]
+    docs = _esummary(first_ids.values()) if first_ids else {}
+    for s in symbols:
+        if s not in found:
+            doc = docs.get(first_ids.get(s))
+            found[s] = (first_ids[s], doc.get("description")) if doc else (None, None)
+    return found
+
+
+def _remember(symbol, description):
+    _memory.set(symbol, description if description is not None else _NOT_FOUND)
+
+
+def cached_summary(term):
+    """Memory-only lookup. Returns (hit, description)."""
+    value = _memory.get((term or "").strip().upper())
+    if value is None:
+        return False, None
+    return True, value or None
+
+
+def fetch_ncbi_summaries(symbols):
+    """
+    Returns {SYMBOL: description or None} for gene symbols, checking the
+    memory tier, then the ncbi_gene_summary table, then E-utilities (batched).
+    Must run inside a Flask app context.
+    """
+    wanted = list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+    out = {}
+
+    missing = []
+    for sym in wanted:
+        hit, description = cached_summary(sym)
+        if hit:
+            out[sym] = description
+        else:
+            missing.append(sym)
+    if not missing:
+        return out
+
+    stored = get_ncbi_summaries(missing)
+    for sym, (gene_id, description) in stored.items():
+        out[sym] = description
+        _remember(sym, description)
+    missing = [s for s in missing if s not in stored]
+    if not missing:
+        return out
+
+    try:
+        fetched = _fetch_upstream(missing)
+    except Exception as e:
+        print("NCBI lookup failed:", e)
+        for sym in missing:
+            out[sym] = None
+        return out
+
+    positive = [(s, gid, desc) for s, (gid, desc) in fetched.items() if gid]
+    negative = [(s, None, None) for s, (gid, _) in fetched.items() if not gid]
+    save_ncbi_summaries(positive, NCBI_SUMMARY_TTL)
+    save_ncbi_summaries(negative, NCBI_NEGATIVE_TTL)
+    for sym, (_, description) in fetched.items():
+        out[sym] = description
+        _remember(sym, description)
+    return out
+
+
+def fetch_ncbi_summary_by_gene_id(gene_id):
+    """Description for an Entrez gene ID, cached under its official symbol."""
+    gene_id = str(gene_id).strip()
+    key = f"ID:{gene_id}"
+    hit, description = cached_summary(key)
+    if hit:
+        return description
+
+    stored = get_ncbi_summary_by_gene_id(gene_id)
+    if stored:
+        _remember(key, stored[1])
+        return stored[1]
+
+    try:
+        doc = _esummary([gene_id]).get(gene_id)
+    except Exception as e:
+        print("NCBI lookup failed:", e)
+        return None
+    description = doc.get("description") if doc else None
+    if doc and doc.get("name"):
+        save_ncbi_summaries([(doc["name"], gene_id, description)], NCBI_SUMMARY_TTL)
+        _remember(doc["name"].upper(), description)
+    _remember(key, description)
+    return description
+
+
+def fetch_ncbi_summary(term):
+    """NCBI gene description for a symbol or Entrez ID, or None."""
+    if not term:
+        return None
+    term = str(term).strip()
+    if term.isdigit():
+        return fetch_ncbi_summary_by_gene_id(term)
+    return fetch_ncbi_summaries([term]).get(term.upper())
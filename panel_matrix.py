@@ -0,0 +1,51 @@
+"""
+Dense gene × drug interaction matrix for a pharmacogenomic panel.
+
+Cells are filled from the genes' search entries alone: a gene search
+already lists every drug it interacts with, so the drug side needs no
+lookups (drug searches name their gene partners by long name, which
+wouldn't line up with gene symbols anyway). The result is a compact set
+of parallel arrays the heatmap view indexes by (gene, drug) position:
+
+- scores[i][j]: the interaction score, or null;
+- types[i][j]: indices into type_legend, [] for an interaction without a
+  type, or null when the gene and drug don't interact.
+"""
+import os
+
+MATRIX_MAX_TERMS = int(os.getenv("MATRIX_MAX_TERMS", "100"))
+
+
+def build_matrix(genes, drugs, entries):
+    """The matrix payload for `genes` × `drugs` from {gene: cache entry}."""
+    drug_index = {d.upper(): j for j, d in enumerate(drugs)}
+    type_index = {}
+    scores = [[None] * len(drugs) for _ in genes]
+    types = [[None] * len(drugs) for _ in genes]
+    interactions = 0
+
+    for i, gene in enumerate(genes):
+        for r in (entries.get(gene) or {}).get("rows") or ():
+            j = drug_index.get((r.get("right_name") or "").upper())
+            if j is None:
+                continue
+            cell = types[i][j]
+            if cell is None:
+                cell = types[i][j] = []
+                interactions += 1
+            for t in r.get("interaction_type_list") or ():
+                k = type_index.setdefault(t, len(type_index))
+                if k not in cell:
+                    cell.append(k)
+            score = r.get("score")
+            if score is not None and (scores[i][j] is None or score > scores[i][j]):
+                scores[i][j] = score
+
+    return {
+        "genes": list(genes),
+        "drugs": list(drugs),
+        "scores": scores,
+        "types": types,
+        "type_legend": list(type_index),
+        "interactions": interactions,
+    }
@@ -0,0 +1,167 @@
+from itertools import islice
+
+from chart_aggregates import AGGREGATES_VERSION, build_aggregates
+
+# Node root and partner key for each interaction search direction
+INTERACTION_SIDES = {
+    "gene": ("genes", "Gene", "drug", "Drug"),
+    "drug": ("drugs", "Drug", "gene", "Gene"),
+}
+
+
+class InteractionRow:
+    """One gene-drug interaction as shown in the results table."""
+    __slots__ = ("left_label", "left_name", "left_cid", "right_label", "right_name", "right_cid",
+                 "type_list", "direction_list", "score", "source_list", "pmid_list")
+
+    def __init__(self, left_label, left_name, left_cid, right_label, right_name, right_cid,
+                 type_list, direction_list, score, source_list, pmid_list):
+        self.left_label = left_label
+        self.left_name = left_name
+        self.left_cid = left_cid
+        self.right_label = right_label
+        self.right_name = right_name
+        self.right_cid = right_cid
+        self.type_list = type_list
+        self.direction_list = direction_list
+        self.score = score
+        self.source_list = source_list
+        self.pmid_list = pmid_list
+
+    def to_dict(self):
+        """The row dict the templates, JSON APIs and search cache use."""
+        return {
+            "left_label": self.left_label,
+            "left_name": self.left_name,
+            "left_cid": self.left_cid,
+
+            "right_label": self.right_label,
+            "right_name": self.right_name,
+            "right_cid": self.right_cid,
+
+            "types": ", ".join(self.type_list) or "—",
+            "interaction_type_list": self.type_list,
+            "directions": ", ".join(self.direction_list) or "—",
+            "score": self.score,
+            "sources": ", ".join(self.source_list) or "—",
+            "pmids": ", ".join(self.pmid_list) or "—"
+        }
+
+
+def iterInteractionRows(json_data, search_type):
+    """
+    Yields an InteractionRow per interaction in a DGIdb gene or drug search
+    response, walking each interaction's lists once.
+    """
+    root, left_label, partner_key, right_label = INTERACTION_SIDES[search_type]
+    nodes = ((json_data or {}).get("data", {}).get(root, {}) or {}).get("nodes", []) or []
+    gene_partner = partner_key == "gene"
+    for n in nodes:
+        left_name = n.get("name") or ""
+        left_cid = n.get("conceptId") or ""
+        for it in n.get("interactions", []) or []:
+            partner = it.get(partner_key) or {}
+            if gene_partner:
+                right_name = partner.get("longName") or partner.get("name") or ""
+            else:
+                right_name = partner.get("name") or ""
+
+            type_list = []
+            direction_list = []
+            for t in it.get("interactionTypes") or ():
+                kind = t.get("type")
+                if kind:
+                    type_list.append(kind)
+                direction = t.get("directionality")
+                if direction:
+                    direction_list.append(direction)
+
+            yield InteractionRow(
+                left_label, left_name, left_cid,
+                right_label, right_name, partner.get("conceptId") or "",
+                type_list, direction_list, it.get("interactionScore"),
+                [s["sourceDbName"] for s in it.get("sources") or () if s.get("sourceDbName")],
+                [str(p["pmid"]) for p in it.get("publications") or () if p.get("pmid")],
+            )
+
+
+def parseInteractionResults(json_data, search_type, limit=None):
+    """Table rows (dicts) for a DGIdb gene or drug search response, optionally only the first `limit`."""
+    return [row.to_dict() for row in islice(iterInteractionRows(json_data, search_type), limit)]
+
+
+#for parsing the gene results that way we can easily put it in table form
+def parseGeneResults(json_data):
+    return parseInteractionResults(json_data, "gene")
+
+def parseProteinResults(json_data):
+    rows = []
+    if not json_data:
+        return rows
+    for hit in json_data.get("results", []):
+        protein_name = None
+        description = None
+        #protein description
+        if hit.get("proteinDescription", {}).get("recommendedName", {}).get("fullName", {}):
+            description = hit["proteinDescription"]["recommendedName"]["fullName"].get("value")
+        #protein name
+        if hit.get("proteinDescription", {}).get("recommendedName", {}).get("shortNames"):
+            sn = hit["proteinDescription"]["recommendedName"]["shortNames"]
+            if sn and isinstance(sn, list) and sn[0].get("value"):
+                protein_name = sn[0]["value"]
+
+        uniprot_id = hit.get("primaryAccession")
+        organism = hit.get("organism", {}).get("scientificName")
+
+        gene_symbols = []
+        for g in hit.get("genes", []):
+            if g.get("geneName", {}).get("value"):
+                gene_symbols.append(g["geneName"]["value"])
+            for syn in g.get("synonyms", []):
+                if syn.get("value"):
+                    gene_symbols.append(syn["value"])
+
+        rows.append({
+            "protein_name": protein_name,
+            "description": description,
+            "uniprot_id": uniprot_id,
+            "organism": organism,
+            "genes": ", ".join(gene_symbols) if gene_symbols else "—"
+        })
+    return rows
+
+#for parsing the drug results that way we can easily put it in table form
+def parseDrugResults(json_data):
+    return parseInteractionResults(json_data, "drug")
+
+def build_cache_entry(results, rows, aggregates=None):
+    # chart/graph summaries are computed here, once, and cached with the rows;
+    # `aggregates` saved earlier for the same rows are reused if still current
+    if not aggregates or aggregates.get("version") != AGGREGATES_VERSION:
+        aggregates = build_aggregates(rows)
+    return {
+        "results": results,
+        "rows": rows,
+        "aggregates": aggregates
+    }
+
+
+def regroupInteractionPage(items, search_type):
+    """
+    Regroups one page of DGIdb's interactions connection (flat interactions
+    carrying both gene and drug) into the genes/drugs {"nodes": [...]}
+    response shape the parsers above read.
+    """
+    root, _, partner_key, _ = INTERACTION_SIDES[search_type]
+    anchor_key = "gene" if partner_key == "drug" else "drug"
+    nodes = {}
+    for it in items or ():
+        anchor = it.get(anchor_key) or {}
+        name = anchor.get("name")
+        if not name:
+            continue
+        node = nodes.get(name)
+        if node is None:
+            node = nodes[name] = {"name": name, "conceptId": anchor.get("conceptId"), "interactions": []}
+        node["interactions"].append({k: v for k, v in it.items() if k != anchor_key})
+    return {"data": {root: {"nodes": list(nodes.values())}}}
@@ -0,0 +1,203 @@
+"""
+Streaming export of search results as CSV, NDJSON or Parquet.
+
+Rows are produced one term at a time: gene/drug terms already in the
+interaction tables are read from them in batches (interaction_store
+.iter_stored_rows), anything else comes from the memory tier or one
+upstream fetch through the search cache. Output is flushed in chunks, so
+memory stays bounded by one batch (or one upstream response) however many
+rows are exported.
+
+Terms that fail can only be known once the body is underway, so they are
+reported at the end of it: one {"query", "error"} line per term in
+NDJSON, "# error" rows after the table in CSV, and an "export_errors"
+JSON object in the Parquet file's key-value metadata.
+"""
+import csv
+import io
+import json
+
+from cache import search_cache
+from db_conn import get_cached_entry
+from interaction_store import RELATIONAL_TYPES, is_relational_marker, iter_stored_rows
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+MIMETYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+INTERACTION_FIELDS = ["query", "left_label", "left_name", "left_cid", "right_label", "right_name", "right_cid",
+                      "types", "directions", "score", "sources", "pmids"]
+PROTEIN_FIELDS = ["query", "protein_name", "description", "uniprot_id", "organism", "genes"]
+
+# Bytes buffered before a chunk is sent, and rows per Parquet row group
+FLUSH_BYTES = 64 * 1024
+PARQUET_BATCH_ROWS = 5000
+
+# Where failed terms are reported: first cell of CSV trailer rows, Parquet metadata key
+ERROR_MARK = "# error"
+ERROR_METADATA_KEY = "export_errors"
+
+
+def export_fields(search_type):
+    return PROTEIN_FIELDS if search_type == "protein" else INTERACTION_FIELDS
+
+
+def iter_term_rows(search_type, query, fetch):
+    """
+    Yields the table rows for one search term. `fetch()` returns
+    (data, error) like app.fetch_search_results and is only called on a
+    cache miss. Raises LookupError with the upstream error message.
+    """
+    data = search_cache.get_memory(query, search_type)
+    if data is not None:
+        yield from data.get("rows", [])
+        return
+
+    if search_type in RELATIONAL_TYPES:
+        entry = get_cached_entry(query, search_type)
+        if entry is not None and is_relational_marker(entry[0]):
+            marker = entry[0]
+            yield from iter_stored_rows(search_type, marker.get("nodes", []), interaction_ids=marker.get("interactions"))
+            return
+        if entry is not None:
+            yield from entry[0].get("rows", [])
+            return
+
+    data, error, _ = search_cache.get_or_fetch(query, search_type, fetch)
+    if error and not data:
+        raise LookupError(error)
+    yield from (data or {}).get("rows", [])
+
+
+def iter_export_rows(search_type, queries, fetch_for, errors):
+    """
+    Yields row dicts tagged with their "query" for every term in `queries`.
+    `fetch_for(query)` returns the fetch callable for a term; terms that
+    fail are recorded in `errors` ({query: message}) and skipped.
+    """
+    for query in queries:
+        try:
+            for row in iter_term_rows(search_type, query, fetch_for(query)):
+                yield dict(row, query=query)
+        except LookupError as e:
+            print("Export failed for", query, ":", e)
+            errors[query] = str(e)
+
+
+def stream_csv(rows, fields, errors=None):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buf.tell() >= FLUSH_BYTES:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    trailer = csv.writer(buf)
+    for query, message in (errors or {}).items():
+        trailer.writerow([ERROR_MARK, query, message])
+    yield buf.getvalue()
+
+
+def stream_ndjson(rows, fields, errors=None):
+    buf = io.StringIO()
+    for row in rows:
+        buf.write(json.dumps({f: row.get(f) for f in fields}))
+        buf.write("\n")
+        if buf.tell() >= FLUSH_BYTES:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    for query, message in (errors or {}).items():
+        buf.write(json.dumps({"query": query, "error": message}))
+        buf.write("\n")
+    yield buf.getvalue()
+
+
+class _ChunkSink:
+    """Write-only file object the Parquet writer fills; chunks are drained as they're written."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        out = b"".join(self.chunks)
+        self.chunks = []
+        return out
+
+
+def _parquet_schema(fields):
+    return pa.schema([(f, pa.float64() if f == "score" else pa.string()) for f in fields])
+
+
+def _record_batch(batch, fields, schema):
+    columns = {}
+    for f in fields:
+        values = [row.get(f) for row in batch]
+        if f != "score":
+            values = [None if v is None else str(v) for v in values]
+        columns[f] = values
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+
+def stream_parquet(rows, fields, errors=None):
+    """One row group per PARQUET_BATCH_ROWS rows; bytes are sent after each group."""
+    schema = _parquet_schema(fields)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= PARQUET_BATCH_ROWS:
+            writer.write_batch(_record_batch(batch, fields, schema))
+            batch = []
+            yield sink.drain()
+    if batch:
+        writer.write_batch(_record_batch(batch, fields, schema))
+    if errors:
+        writer.add_key_value_metadata({ERROR_METADATA_KEY: json.dumps(errors)})
+    writer.close()
+    yield sink.drain()
+
+
+def parquet_available():
+    return pq is not None
+
+
+def stream_export(fmt, search_type, queries, fetch_for):
+    """Body generator for an export of `queries` in format `fmt`."""
+    errors = {}
+    fields = export_fields(search_type)
+    rows = iter_export_rows(search_type, queries, fetch_for, errors)
+    if fmt == "csv":
+        return stream_csv(rows, fields, errors)
+    if fmt == "ndjson":
+        return stream_ndjson(rows, fields, errors)
+    return stream_parquet(rows, fields, errors)
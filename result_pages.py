@@ -0,0 +1,147 @@
+"""
+Server-side paging, sorting and filtering of interaction rows.
+
+The search page no longer embeds every row; it asks /api/search/results for
+one slice at a time. Sorted/filtered orderings are kept briefly per result
+set so paging through them doesn't re-sort on every request. While a paged
+DGIdb fetch is still running, FetchProgress holds the rows parsed so far so
+the first pages can be served before the entry is complete.
+"""
+import os
+import threading
+
+from cache import MemoryCache
+
+DEFAULT_PER_PAGE = 25
+MAX_PER_PAGE = int(os.getenv("RESULTS_MAX_PER_PAGE", "500"))
+
+# Sort keys accepted by the API (aliases map onto the table's column keys)
+SORT_ALIASES = {"name": "right", "type": "types", "directions": "direction"}
+SORT_KEYS = {
+    "left": lambda r: (r.get("left_name") or "").lower(),
+    "right": lambda r: (r.get("right_name") or "").lower(),
+    "types": lambda r: (r.get("types") or "").lower(),
+    "direction": lambda r: (r.get("directions") or "").lower(),
+}
+FILTER_FIELDS = ("left_name", "left_cid", "right_name", "right_cid", "types", "directions", "sources", "pmids")
+
+RESULTS_VIEW_TTL = int(os.getenv("RESULTS_VIEW_TTL", "120"))
+
+# (result set key, filter, sort, order) -> (rows, [row indexes])
+_views = MemoryCache(max_entries=256, max_bytes=32 * 1024 * 1024, ttl=RESULTS_VIEW_TTL)
+
+# batch result set key -> merged rows, so every page of a batch is served
+# from the same rows object (and so the same cached ordering)
+batch_views = MemoryCache(max_entries=64, max_bytes=8 * 1024 * 1024, ttl=RESULTS_VIEW_TTL)
+
+
+def normalize_sort(sort, order):
+    sort = SORT_ALIASES.get(sort, sort)
+    if sort not in SORT_KEYS and sort != "score":
+        sort = None
+    order = "asc" if order == "asc" else "desc"
+    return sort, order
+
+
+def _matches(row, term):
+    for field in FILTER_FIELDS:
+        value = row.get(field)
+        if value and term in str(value).lower():
+            return True
+    score = row.get("score")
+    return score is not None and term in str(score)
+
+
+def _ordering(rows, term, sort, order):
+    indexes = [i for i, r in enumerate(rows) if _matches(r, term)] if term else list(range(len(rows)))
+    if sort == "score":
+        # Rows without a score go last in either direction
+        scored = [i for i in indexes if rows[i].get("score") is not None]
+        unscored = [i for i in indexes if rows[i].get("score") is None]
+        scored.sort(key=lambda i: rows[i]["score"], reverse=(order == "desc"))
+        indexes = scored + unscored
+    elif sort:
+        key = SORT_KEYS[sort]
+        indexes.sort(key=lambda i: key(rows[i]), reverse=(order == "desc"))
+    return indexes
+
+
+def page_rows(rows, view_key=None, filter_text="", sort=None, order="desc", page=1, per_page=DEFAULT_PER_PAGE):
+    """
+    Returns one page of `rows` after filtering (case-insensitive substring
+    over the visible columns) and sorting. `view_key` identifies the result
+    set so its ordering can be reused by the following page requests.
+    """
+    term = (filter_text or "").strip().lower()
+    sort, order = normalize_sort(sort, order)
+    per_page = max(1, min(int(per_page or DEFAULT_PER_PAGE), MAX_PER_PAGE))
+
+    indexes = None
+    cache_key = (view_key, term, sort, order) if view_key is not None else None
+    if cache_key is not None:
+        cached = _views.get(cache_key)
+        # Only valid for the same rows object (the entry may have been refreshed since)
+        if cached is not None and cached[0] is rows:
+            indexes = cached[1]
+    if indexes is None:
+        indexes = _ordering(rows, term, sort, order)
+        if cache_key is not None and (term or sort):
+            _views.set(cache_key, (rows, indexes), size=8 * len(indexes) + 64)
+
+    matched = len(indexes)
+    pages = max(1, -(-matched // per_page))
+    page = max(1, min(int(page or 1), pages))
+    start = (page - 1) * per_page
+    return {
+        "total": len(rows),
+        "matched": matched,
+        "page": page,
+        "per_page": per_page,
+        "pages": pages,
+        "sort": sort,
+        "order": order,
+        "filter": filter_text or "",
+        "rows": [rows[i] for i in indexes[start:start + per_page]],
+    }
+
+
+class FetchProgress:
+    """Rows parsed so far by in-flight upstream fetches, keyed like the search cache."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._rows = {}
+
+    def start(self, key):
+        with self._cond:
+            self._rows[key] = []
+
+    def add(self, key, rows):
+        with self._cond:
+            if key in self._rows:
+                self._rows[key].extend(rows)
+                self._cond.notify_all()
+
+    def finish(self, key):
+        with self._cond:
+            self._rows.pop(key, None)
+            self._cond.notify_all()
+
+    def notify(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def rows(self, key):
+        """A snapshot of the rows for `key`, or None if no fetch for it is running."""
+        with self._cond:
+            rows = self._rows.get(key)
+            return list(rows) if rows is not None else None
+
+    def wait_for_rows(self, key, done, timeout=None):
+        """Blocks until `key` has rows or `done()` is true; returns a snapshot of the rows (possibly empty)."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._rows.get(key) or done(), timeout)
+            return list(self._rows.get(key) or [])
+
+
+fetch_progress = FetchProgress()
@@ -0,0 +1,446 @@
+"""
+Drug–drug and gene–gene similarity from shared interaction profiles.
+
+Every stored drug (or gene) becomes a sparse row over its interaction
+partners: one feature per partner, weighted by the interaction score, and
+one per (partner, interaction type), so two drugs that inhibit the same
+transporter score higher than two that merely touch it. Rows are kept as
+sorted feature/weight arrays with an inverted index over features; top-k
+cosine or Jaccard neighbours only visit rows that share a feature. When
+numpy and scipy are installed the same rows are also held as CSR matrices
+and a batch is scored with one sparse product.
+
+Catalogues with more than SIMILARITY_LSH_ROWS rows pick candidates with
+MinHash/LSH banding instead of walking every shared feature (a hub target
+such as SLC6A4 is shared by thousands of drugs). Neighbours of the MDD
+panel terms are precomputed after every load.
+
+The profiles are rebuilt from MySQL every SIMILARITY_REFRESH_SECONDS, or
+sooner once a search has saved new interactions.
+"""
+import heapq
+import math
+import os
+import random
+import threading
+import time
+from array import array
+from collections import defaultdict
+
+from db_conn import mysql
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # the pure-Python scoring gives the same results, just slower on large batches
+    np = None
+    sparse = None
+
+SIMILARITY_REFRESH_SECONDS = int(os.getenv("SIMILARITY_REFRESH_SECONDS", "600"))
+# A save marks the profiles stale; they are rebuilt on the next request at most this often
+SIMILARITY_STALE_SECONDS = int(os.getenv("SIMILARITY_STALE_SECONDS", "60"))
+SIMILARITY_LSH_ROWS = int(os.getenv("SIMILARITY_LSH_ROWS", "20000"))
+
+KINDS = {"drug": "gene", "gene": "drug"}   # profiled kind -> partner kind
+METRICS = ("cosine", "jaccard")
+DEFAULT_K = 10
+MAX_K = 100
+PANEL_K = 25
+MAX_SHARED_LISTED = 20
+
+# Weight of a (partner, type) feature relative to the partner feature itself
+TYPE_WEIGHT = 0.5
+
+# MinHash signature length and LSH banding (bands * rows_per_band == NUM_PERM); two hashes per
+# band make pairs with a Jaccard similarity around 0.2 and up likely to share a bucket
+NUM_PERM = 64
+LSH_BANDS = 32
+_PRIME = (1 << 31) - 1
+
+
+def score_weight(score):
+    """Partner feature weight: 1 for unscored interactions, growing with log(score)."""
+    if score is None or score <= 0:
+        return 1.0
+    return 1.0 + math.log1p(score)
+
+
+class _Profiles:
+    """Immutable profile rows of one kind; a reload builds a new instance and swaps it in."""
+
+    def __init__(self, names, profiles, partner_names):
+        # profiles: {row: {(partner, type or None): weight}}
+        self.names = names
+        self.index = {n.upper(): i for i, n in enumerate(names)}
+        self.partner_names = partner_names
+
+        keys = sorted({key for features in profiles.values() for key in features},
+                      key=lambda k: (k[0], k[1] or ""))
+        feature_ids = {key: f for f, key in enumerate(keys)}
+        self.feature_keys = keys
+
+        self.features = [array("i") for _ in names]
+        self.weights = [array("d") for _ in names]
+        self.norms = array("d", [0.0]) * len(names)
+        postings = defaultdict(lambda: (array("i"), array("d")))
+        for row in sorted(profiles):
+            items = sorted((feature_ids[key], w) for key, w in profiles[row].items())
+            self.features[row] = array("i", [f for f, _ in items])
+            self.weights[row] = array("d", [w for _, w in items])
+            self.norms[row] = math.sqrt(sum(w * w for _, w in items))
+            for f, w in items:
+                rows, ws = postings[f]
+                rows.append(row)
+                ws.append(w)
+        self.postings = dict(postings)
+
+        self.matrix = None
+        self.binary = None
+        if sparse is not None and names:
+            indptr = np.zeros(len(names) + 1, dtype=np.int64)
+            indptr[1:] = np.cumsum([len(f) for f in self.features])
+            indices = np.fromiter((f for row in self.features for f in row), dtype=np.int32, count=int(indptr[-1]))
+            data = np.fromiter((w for row in self.weights for w in row), dtype=np.float64, count=int(indptr[-1]))
+            norms = np.frombuffer(self.norms, dtype=np.float64)
+            scale = np.repeat(np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0), np.diff(indptr))
+            shape = (len(names), len(keys))
+            self.matrix = sparse.csr_matrix((data * scale, indices, indptr), shape=shape)
+            self.binary = sparse.csr_matrix((np.ones_like(data), indices, indptr), shape=shape)
+
+        self.buckets = None
+        if len(names) > SIMILARITY_LSH_ROWS:
+            self._build_lsh()
+
+    def __len__(self):
+        return len(self.names)
+
+    # ---- MinHash / LSH ----
+
+    def _build_lsh(self):
+        rng = random.Random(20240601)
+        a = [rng.randrange(1, _PRIME) for _ in range(NUM_PERM)]
+        b = [rng.randrange(0, _PRIME) for _ in range(NUM_PERM)]
+        # NUM_PERM hashes of every feature once; a row's signature is their element-wise minimum
+        if np is not None:
+            f = np.arange(len(self.feature_keys), dtype=np.int64)[:, None]
+            hashes = (np.array(a, dtype=np.int64) * f + np.array(b, dtype=np.int64)) % _PRIME
+            indptr = self.binary.indptr
+            filled = np.diff(indptr) > 0
+            minima = np.minimum.reduceat(hashes[self.binary.indices], indptr[:-1][filled], axis=0).tolist()
+            rows = iter(map(tuple, minima))
+            self.signatures = [next(rows) if full else None for full in filled.tolist()]
+        else:
+            hashes = [[(x * f + y) % _PRIME for x, y in zip(a, b)] for f in range(len(self.feature_keys))]
+            self.signatures = [tuple(map(min, zip(*(hashes[f] for f in features)))) if features else None
+                               for features in self.features]
+        self.buckets = [defaultdict(list) for _ in range(LSH_BANDS)]
+        for row, sig in enumerate(self.signatures):
+            if sig is None:
+                continue
+            for band, key in enumerate(self._band_keys(sig)):
+                self.buckets[band][key].append(row)
+
+    @staticmethod
+    def _band_keys(sig):
+        width = NUM_PERM // LSH_BANDS
+        return [sig[i * width:(i + 1) * width] for i in range(LSH_BANDS)]
+
+    def _candidates(self, row):
+        sig = self.signatures[row]
+        found = set()
+        if sig is not None:
+            for band, key in enumerate(self._band_keys(sig)):
+                found.update(self.buckets[band].get(key, ()))
+        found.discard(row)
+        return found
+
+    # ---- scoring ----
+
+    def _overlaps(self, row, k):
+        """
+        {other row: (dot product, shared feature count)} for rows sharing a
+        feature with `row`; with LSH only for its bucket mates, unless they
+        are fewer than `k`.
+        """
+        candidates = self._candidates(row) if self.buckets is not None else None
+        if candidates is not None and len(candidates) >= k:
+            mine = dict(zip(self.features[row], self.weights[row]))
+            found = {}
+            for other in candidates:
+                dot = 0.0
+                shared = 0
+                for f, w in zip(self.features[other], self.weights[other]):
+                    if f in mine:
+                        dot += mine[f] * w
+                        shared += 1
+                if shared:
+                    found[other] = (dot, shared)
+            return found
+
+        dots = defaultdict(float)
+        shared = defaultdict(int)
+        for f, wq in zip(self.features[row], self.weights[row]):
+            rows, ws = self.postings[f]
+            for other, w in zip(rows, ws):
+                dots[other] += wq * w
+                shared[other] += 1
+        dots.pop(row, None)
+        return {other: (dot, shared[other]) for other, dot in dots.items()}
+
+    def top_k(self, row, k, metric):
+        """[(other row, similarity)] best first, ties broken by name order."""
+        nq = len(self.features[row])
+        scored = []
+        for other, (dot, shared) in self._overlaps(row, k).items():
+            if metric == "cosine":
+                value = dot / (self.norms[row] * self.norms[other])
+            else:
+                value = shared / (nq + len(self.features[other]) - shared)
+            scored.append((value, other))
+        best = heapq.nsmallest(k, scored, key=lambda s: (-s[0], self.names[s[1]]))
+        return [(other, value) for value, other in best]
+
+    def top_k_batch(self, rows, k, metric):
+        """top_k for many rows; one sparse product per batch when scipy is available."""
+        if not rows:
+            return []
+        if self.matrix is None or self.buckets is not None:
+            return [self.top_k(row, k, metric) for row in rows]
+        if metric == "cosine":
+            product = (self.matrix[rows] @ self.matrix.T).tocsr()
+        else:
+            product = (self.binary[rows] @ self.binary.T).tocsr()
+            sizes = np.diff(self.binary.indptr)
+        out = []
+        for i, row in enumerate(rows):
+            start, end = product.indptr[i], product.indptr[i + 1]
+            others = product.indices[start:end]
+            values = product.data[start:end]
+            if metric == "jaccard":
+                values = values / (sizes[row] + sizes[others] - values)
+            keep = others != row
+            others, values = others[keep], values[keep]
+            ranked = sorted(zip(values.tolist(), others.tolist()), key=lambda s: (-s[0], self.names[s[1]]))[:k]
+            out.append([(other, value) for value, other in ranked])
+        return out
+
+    def shared(self, a, b):
+        """Partner ids both rows interact with, and {partner id: (types of a, types of b)}."""
+        def by_partner(row):
+            found = defaultdict(set)
+            for f in self.features[row]:
+                partner, kind = self.feature_keys[f]
+                found.setdefault(partner, set())
+                if kind:
+                    found[partner].add(kind)
+            return found
+        pa, pb = by_partner(a), by_partner(b)
+        common = sorted(set(pa) & set(pb), key=lambda p: self.partner_names[p])
+        return common, {p: (pa[p], pb[p]) for p in common}
+
+    def similarity(self, a, b):
+        fa = dict(zip(self.features[a], self.weights[a]))
+        dot = 0.0
+        shared = 0
+        for f, w in zip(self.features[b], self.weights[b]):
+            if f in fa:
+                dot += fa[f] * w
+                shared += 1
+        norm = self.norms[a] * self.norms[b]
+        union = len(self.features[a]) + len(self.features[b]) - shared
+        return {
+            "cosine": dot / norm if norm else 0.0,
+            "jaccard": shared / union if union else 0.0,
+        }
+
+
+class _Snapshot:
+    """Profiles and panel neighbours from one load, published together."""
+    __slots__ = ("profiles", "panel_results")
+
+    def __init__(self, profiles, panel_results):
+        self.profiles = profiles
+        self.panel_results = panel_results
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self._loading = threading.Lock()
+        self.loaded_at = 0.0
+        self.stale = False
+        self.panels = {}      # kind -> [names] precomputed after each load
+        # replaced in one assignment; readers take a single local reference
+        self._snapshot = _Snapshot({kind: _Profiles([], {}, []) for kind in KINDS}, {})
+
+    # ---- building ----
+
+    def load(self):
+        """Rebuilds the drug and gene profiles from the stored interactions."""
+        started = time.time()
+        try:
+            cursor = mysql.connection.cursor()
+            cursor.execute("SELECT id, name FROM genes")
+            genes = cursor.fetchall()
+            cursor.execute("SELECT id, name FROM drugs")
+            drugs = cursor.fetchall()
+            cursor.execute("SELECT id, gene_id, drug_id, score FROM interactions")
+            interactions = cursor.fetchall()
+            cursor.execute("""
+                SELECT l.interaction_id, t.type
+                FROM interaction_type_links l
+                JOIN interaction_types t ON t.id = l.type_id
+            """)
+            type_rows = cursor.fetchall()
+            cursor.close()
+        except Exception as e:
+            print("\n[DB ERROR - similarity.load]\n", e)
+            return False
+
+        types = defaultdict(list)
+        for interaction_id, kind in type_rows:
+            types[interaction_id].append(kind)
+        self._install(genes, drugs, [(g, d, s, types.get(i, ())) for i, g, d, s in interactions])
+        profiles = self._snapshot.profiles
+        print(f"Similarity profiles: {len(profiles['drug'])} drugs, {len(profiles['gene'])} genes "
+              f"({time.time() - started:.2f}s)")
+        return True
+
+    def _install(self, genes, drugs, interactions):
+        """Builds both kinds from (gene id, drug id, score, types) rows and precomputes the panels."""
+        gene_ids = {row_id: i for i, (row_id, _) in enumerate(genes)}
+        drug_ids = {row_id: i for i, (row_id, _) in enumerate(drugs)}
+        gene_names = [n for _, n in genes]
+        drug_names = [n for _, n in drugs]
+
+        by_drug = defaultdict(dict)
+        by_gene = defaultdict(dict)
+        for gene_id, drug_id, score, kinds in interactions:
+            g = gene_ids.get(gene_id)
+            d = drug_ids.get(drug_id)
+            if g is None or d is None:
+                continue
+            w = score_weight(score)
+            for profiles, row, partner in ((by_drug, d, g), (by_gene, g, d)):
+                features = profiles[row]
+                features[(partner, None)] = max(w, features.get((partner, None), 0.0))
+                for kind in kinds:
+                    features[(partner, kind)] = max(w * TYPE_WEIGHT, features.get((partner, kind), 0.0))
+
+        profiles = {
+            "drug": _Profiles(drug_names, by_drug, gene_names),
+            "gene": _Profiles(gene_names, by_gene, drug_names),
+        }
+        panel_results = {}
+        for kind, names in self.panels.items():
+            p = profiles[kind]
+            rows = sorted({p.index[n.upper()] for n in names if n.upper() in p.index})
+            for metric in METRICS:
+                for row, found in zip(rows, p.top_k_batch(rows, PANEL_K, metric)):
+                    panel_results[(kind, metric, row)] = found
+
+        self._snapshot = _Snapshot(profiles, panel_results)
+        self.loaded_at = time.time()
+        self.stale = False
+
+    def set_panels(self, panels):
+        """{kind: [names]} whose neighbours are precomputed on every load."""
+        self.panels = {kind: list(names) for kind, names in panels.items() if kind in KINDS}
+
+    def mark_stale(self):
+        self.stale = True
+
+    def ensure_loaded(self):
+        age = time.time() - self.loaded_at
+        if age < SIMILARITY_REFRESH_SECONDS and not (self.stale and age >= SIMILARITY_STALE_SECONDS):
+            return
+        # one request rebuilds; the others keep answering from the current profiles
+        if self._loading.acquire(blocking=self.loaded_at == 0):
+            try:
+                age = time.time() - self.loaded_at
+                if age >= SIMILARITY_REFRESH_SECONDS or (self.stale and age >= SIMILARITY_STALE_SECONDS):
+                    self.load()
+            finally:
+                self._loading.release()
+
+    def stats(self):
+        snap = self._snapshot
+        stats = {
+            kind: {
+                "profiles": len(p),
+                "features": len(p.feature_keys),
+                "method": "lsh" if p.buckets is not None else "exact",
+            } for kind, p in snap.profiles.items()
+        }
+        stats.update(vectorized=sparse is not None, loaded_at=self.loaded_at,
+                     panel_entries=len(snap.panel_results))
+        return stats
+
+    # ---- queries ----
+
+    def _neighbor(self, p, row, other, value):
+        common, _ = p.shared(row, other)
+        return {
+            "name": p.names[other],
+            "score": round(value, 4),
+            "shared_count": len(common),
+            "shared": [p.partner_names[c] for c in common[:MAX_SHARED_LISTED]],
+        }
+
+    def similar(self, kind, names, k=DEFAULT_K, metric="cosine"):
+        """
+        Top-k most similar drugs (or genes) for each name. Returns
+        (results in input order, unknown names); panel terms are served
+        from the precomputed neighbours.
+        """
+        snap = self._snapshot
+        p = snap.profiles[kind]
+        k = max(1, min(k, MAX_K))
+        rows = []
+        unknown = []
+        for name in names:
+            row = p.index.get((name or "").upper())
+            if row is None:
+                unknown.append(name)
+            elif row not in rows:
+                rows.append(row)
+
+        found = {}
+        missing = []
+        for row in rows:
+            cached = snap.panel_results.get((kind, metric, row)) if k <= PANEL_K else None
+            if cached is None:
+                missing.append(row)
+            else:
+                found[row] = cached[:k]
+        for row, neighbours in zip(missing, p.top_k_batch(missing, k, metric)):
+            found[row] = neighbours
+
+        results = [{
+            "name": p.names[row],
+            "partner_count": sum(1 for f in p.features[row] if p.feature_keys[f][1] is None),
+            "neighbors": [self._neighbor(p, row, other, value) for other, value in found[row]],
+        } for row in rows]
+        return results, unknown
+
+    def compare(self, kind, a, b):
+        """Both similarity scores and the partners two drugs (or genes) share, with each side's types."""
+        p = self._snapshot.profiles[kind]
+        ra = p.index.get((a or "").upper())
+        rb = p.index.get((b or "").upper())
+        if ra is None or rb is None:
+            return None
+        common, types = p.shared(ra, rb)
+        return {
+            "type": kind,
+            "a": p.names[ra],
+            "b": p.names[rb],
+            **{metric: round(value, 4) for metric, value in p.similarity(ra, rb).items()},
+            "shared": [{
+                "name": p.partner_names[c],
+                "types_a": sorted(types[c][0]),
+                "types_b": sorted(types[c][1]),
+            } for c in common],
+        }
+
+
+index = SimilarityIndex()
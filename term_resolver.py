@@ -0,0 +1,230 @@
+"""
+One index for every gene, drug and protein name the app recognizes.
+
+The alias tables in app.py, gene_mapping.GENE_MAPPING and any bulk synonym
+files (an HGNC complete-set export, a drug synonym TSV) are loaded once
+into per-type indexes:
+
+- hash maps from a normalized spelling (and a punctuation-free "compact"
+  spelling) to the canonical term, for normalize_term;
+- a sorted key list searched with bisect, with the best completions for
+  every short prefix precomputed, for /autocomplete;
+- a phrase map of the curated aliases only, for spotting a gene name in a
+  chatbot question (bulk HGNC aliases include ordinary words like SET).
+"""
+import csv
+import os
+import re
+import unicodedata
+from bisect import bisect_left
+
+SEARCH_TYPES = ("gene", "drug", "protein")
+
+# "gene:/data/hgnc_complete_set.txt,drug:/data/drug_synonyms.tsv"
+SYNONYM_FILES = os.getenv("TERM_SYNONYM_FILES", "")
+
+MAX_SUGGESTIONS = 20
+# Prefixes up to this length have their completions precomputed; longer ones scan a bisect range
+SHORT_PREFIX = 3
+SCAN_LIMIT = 5000
+
+# Suggestion ranking: MDD panel terms, curated canonical names, curated aliases, then synonym-file names and synonyms
+RANK_PANEL, RANK_CANONICAL, RANK_ALIAS, RANK_FILE_NAME, RANK_FILE_SYNONYM = range(5)
+
+# Canonical spelling for names that only come from synonym files (matches normalize_term's fallbacks)
+CANONICAL_CASE = {"gene": str.upper, "drug": str.title, "protein": str.upper}
+
+# Canonical-name and synonym columns recognized in synonym files (HGNC uses the first of each)
+NAME_COLUMNS = ("symbol", "name", "drug_name")
+SYNONYM_COLUMNS = ("alias_symbol", "prev_symbol", "name", "alias_name", "synonyms", "aliases", "brand_names")
+
+_DASHES = dict.fromkeys(map(ord, "‐‑‒–—−"), "-")
+_SPACES = re.compile(r"\s+")
+_NON_ALNUM = re.compile(r"[\W_]+")
+_WORDS = re.compile(r"[^\s,.;:!?()\[\]{}'\"/]+")
+
+
+def normalize_key(term):
+    """Uppercased, dash- and whitespace-normalized spelling used as the index key."""
+    term = unicodedata.normalize("NFKC", term or "").translate(_DASHES)
+    return _SPACES.sub(" ", term).strip().upper()
+
+
+def compact_key(key):
+    """`key` without spaces or punctuation, so IL-6, IL 6 and IL6 meet."""
+    return _NON_ALNUM.sub("", key)
+
+
+class _TypeIndex:
+    def __init__(self):
+        self.exact = {}      # key -> canonical
+        self.compact = {}    # compact key -> canonical
+        self.entries = {}    # key -> (rank, canonical, spelling shown)
+        self.phrases = {}    # curated key -> canonical
+        self.max_words = 1
+        self.keys = []
+        self.top = {}        # short prefix -> [suggestion, ...]
+
+    def add(self, spelling, canonical, rank, curated=True):
+        key = normalize_key(spelling)
+        if not key:
+            return
+        self.exact.setdefault(key, canonical)
+        compact = compact_key(key)
+        if compact:
+            self.compact.setdefault(compact, canonical)
+        for k in {key, compact} - {""}:
+            current = self.entries.get(k)
+            if current is None or rank < current[0]:
+                self.entries[k] = (rank, canonical, spelling.strip())
+        if curated:
+            self.phrases.setdefault(key, canonical)
+            self.max_words = max(self.max_words, key.count(" ") + 1)
+
+    def _order(self, key):
+        return self.entries[key][0], len(key), key
+
+    def build(self):
+        self.keys = sorted(self.entries)
+        # One pass in suggestion order fills every short prefix's list
+        self.top = {}
+        seen = {}
+        for key in sorted(self.entries, key=self._order):
+            rank, canonical, spelling = self.entries[key]
+            for n in range(1, min(SHORT_PREFIX, len(key)) + 1):
+                prefix = key[:n]
+                bucket = self.top.setdefault(prefix, [])
+                taken = seen.setdefault(prefix, set())
+                if len(bucket) < MAX_SUGGESTIONS and canonical not in taken:
+                    taken.add(canonical)
+                    bucket.append({"term": canonical, "match": spelling})
+
+    def rank(self, keys, limit):
+        """Best `limit` suggestions for `keys`, one per canonical term."""
+        out = []
+        seen = set()
+        for key in sorted(keys, key=self._order):
+            rank, canonical, spelling = self.entries[key]
+            if canonical in seen:
+                continue
+            seen.add(canonical)
+            out.append({"term": canonical, "match": spelling})
+            if len(out) == limit:
+                break
+        return out
+
+
+class TermResolver:
+    def __init__(self):
+        self._indexes = {t: _TypeIndex() for t in SEARCH_TYPES}
+
+    # ---- loading ----
+
+    def add_aliases(self, search_type, aliases):
+        """Curated {alias: canonical}; the canonical terms become resolvable too."""
+        index = self._indexes[search_type]
+        for canonical in set(aliases.values()):
+            index.add(canonical, canonical, RANK_CANONICAL)
+        for alias, canonical in aliases.items():
+            index.add(alias, canonical, RANK_ALIAS)
+
+    def add_panel(self, search_type, terms):
+        """MDD panel terms: ranked first in suggestions, resolved through any alias already loaded."""
+        index = self._indexes[search_type]
+        for term in terms:
+            canonical = self.resolve(search_type, term) or term
+            index.add(term, canonical, RANK_PANEL)
+            index.add(canonical, canonical, RANK_PANEL)
+
+    def load_synonym_file(self, search_type, path):
+        """
+        Tab-separated file with a header: a canonical name column (symbol /
+        name) and synonym columns whose values are "|" or ";" separated.
+        Rows with a non-"Approved" status column (HGNC withdrawn symbols)
+        are skipped. Canonical names load before any synonym so an alias
+        never shadows another term's official name.
+        """
+        index = self._indexes[search_type]
+        case = CANONICAL_CASE[search_type]
+        pending = []
+        with open(path, encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f, delimiter="\t")
+            columns = reader.fieldnames or []
+            name_column = next((c for c in NAME_COLUMNS if c in columns), None)
+            if name_column is None:
+                raise ValueError(f"{path}: no name column (expected one of {', '.join(NAME_COLUMNS)})")
+            synonym_columns = [c for c in SYNONYM_COLUMNS if c in columns and c != name_column]
+            for row in reader:
+                if row.get("status") not in (None, "", "Approved"):
+                    continue
+                name = (row.get(name_column) or "").strip()
+                if not name:
+                    continue
+                canonical = self.resolve(search_type, name) or case(name)
+                index.add(name, canonical, RANK_FILE_NAME, curated=False)
+                for column in synonym_columns:
+                    for synonym in re.split(r"[|;]", row.get(column) or ""):
+                        if synonym.strip():
+                            pending.append((synonym, canonical))
+        for synonym, canonical in pending:
+            index.add(synonym, canonical, RANK_FILE_SYNONYM, curated=False)
+        return len(pending)
+
+    def load_synonym_files(self, spec=SYNONYM_FILES):
+        for item in filter(None, (s.strip() for s in spec.split(","))):
+            search_type, _, path = item.partition(":")
+            if search_type not in self._indexes or not path:
+                print("Ignoring TERM_SYNONYM_FILES entry:", item)
+                continue
+            try:
+                count = self.load_synonym_file(search_type, path)
+                print(f"Loaded {count} {search_type} synonyms from {path}")
+            except (OSError, ValueError) as e:
+                print("Synonym file failed to load:", path, e)
+
+    def build(self):
+        """Sorts the prefix index; call after loading and before complete()."""
+        for index in self._indexes.values():
+            index.build()
+        return self
+
+    # ---- lookups ----
+
+    def resolve(self, search_type, term):
+        """Canonical term for any known spelling, or None."""
+        index = self._indexes.get(search_type)
+        if index is None or not term:
+            return None
+        key = normalize_key(term)
+        return index.exact.get(key) or index.compact.get(compact_key(key))
+
+    def complete(self, search_type, prefix, limit=10):
+        """Up to `limit` {"term", "match"} suggestions for names starting with `prefix`."""
+        index = self._indexes.get(search_type)
+        if index is None:
+            return []
+        limit = max(1, min(limit, MAX_SUGGESTIONS))
+        key = normalize_key(prefix)
+        if not key:
+            return []
+        if len(key) <= SHORT_PREFIX:
+            matches = index.top.get(key)
+            if matches is None and len(key) > 1:
+                matches = index.top.get(compact_key(key), [])
+            return (matches or [])[:limit]
+        lo = bisect_left(index.keys, key)
+        hi = bisect_left(index.keys, key + "\uffff", lo, min(len(index.keys), lo + SCAN_LIMIT))
+        return index.rank(index.keys[lo:hi], limit)
+
+    def find_in_text(self, search_type, text):
+        """First curated name (longest match at each position) mentioned in free text, or None."""
+        index = self._indexes.get(search_type)
+        if index is None or not text:
+            return None
+        words = _WORDS.findall(normalize_key(text))
+        for i in range(len(words)):
+            for n in range(min(index.max_words, len(words) - i), 0, -1):
+                canonical = index.phrases.get(" ".join(words[i:i + n]))
+                if canonical:
+                    return canonical
+        return None
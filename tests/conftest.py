@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The app's modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.py and asgi.py import the Gemini client, which needs a key to construct
+os.environ.setdefault("GEMINI_API_KEY", "test")
+os.environ.setdefault("REQUEST_LOG", "0")
@@ -0,0 +1,73 @@
+from types import SimpleNamespace
+
+import pytest
+
+import ai_helper
+from ai_helper import classify_scope_with_model, generate_cached, normalize_question, prompt_fingerprint
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """Stands in for the Gemini call; `answers` is consumed in order."""
+    prompts = []
+    answers = []
+
+    def generate(prompt):
+        prompts.append(prompt)
+        return SimpleNamespace(text=answers.pop(0))
+
+    ai_helper._response_cache.clear()
+    ai_helper._scope_cache.clear()
+    monkeypatch.setattr(ai_helper, "generate_content", generate)
+    yield SimpleNamespace(prompts=prompts, answers=answers)
+    ai_helper._response_cache.clear()
+    ai_helper._scope_cache.clear()
+
+
+def test_normalize_question_ignores_case_spacing_and_trailing_punctuation():
+    assert normalize_question("  What is   TP53?? ") == normalize_question("what is tp53") == "what is tp53"
+
+
+def test_fingerprint_covers_template_context_and_model():
+    base = prompt_fingerprint("answer", "What is TP53?")
+    assert prompt_fingerprint("answer", "what is tp53") == base
+    assert prompt_fingerprint("mdd", "What is TP53?") != base
+    assert prompt_fingerprint("answer", "What is TP53?", context="README") != base
+    assert prompt_fingerprint("answer", "What is TP53?", model="other-model") != base
+
+
+def test_repeated_question_is_answered_from_cache(model):
+    model.answers.append(" TP53 is a tumor suppressor. ")
+
+    first = generate_cached("answer", "What is TP53?", "prompt 1")
+    second = generate_cached("answer", "what is TP53", "prompt 2")
+
+    assert first == second == "TP53 is a tumor suppressor."
+    assert model.prompts == ["prompt 1"]
+
+
+def test_different_context_is_a_new_call(model):
+    model.answers.extend(["one", "two"])
+    assert generate_cached("answer", "q", "p", context="a") == "one"
+    assert generate_cached("answer", "q", "p", context="b") == "two"
+
+
+def test_empty_answers_are_not_cached(model):
+    model.answers.extend(["  ", "an answer"])
+    assert generate_cached("answer", "q", "p") == ""
+    assert generate_cached("answer", "q", "p") == "an answer"
+    assert len(model.prompts) == 2
+
+
+def test_scope_decisions_are_cached_per_question(model):
+    model.answers.append("IN_SCOPE")
+    assert classify_scope_with_model("What is BDNF?") == "IN_SCOPE"
+    assert classify_scope_with_model("what is bdnf") == "IN_SCOPE"
+    assert len(model.prompts) == 1
+
+
+def test_unexpected_scope_reply_is_not_cached(model):
+    model.answers.extend(["maybe", "OUT_OF_SCOPE"])
+    with pytest.raises(RuntimeError):
+        classify_scope_with_model("Weather in London?")
+    assert classify_scope_with_model("Weather in London?") == "OUT_OF_SCOPE"
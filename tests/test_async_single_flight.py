@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from cache import AsyncSingleFlight
+
+
+def test_concurrent_calls_share_one_coroutine():
+    async def main():
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "value"
+
+        results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(4)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(main())
+    assert len(calls) == 1
+    assert results == [("value", False)] + [("value", True)] * 3
+    assert flight.coalesced == 3
+    assert flight._calls == {}
+
+
+def test_leader_exception_reaches_waiters():
+    async def main():
+        flight = AsyncSingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.05)
+            raise ValueError("upstream down")
+
+        return await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert [str(r) for r in results] == ["upstream down"] * 3
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+def test_cancelled_waiter_does_not_cancel_the_leader():
+    async def main():
+        flight = AsyncSingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return "value"
+
+        leader = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await leader
+
+    assert asyncio.run(main()) == ("value", False)
+
+
+def test_cancelled_leader_releases_waiters():
+    async def main():
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return len(calls)
+
+        leader = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        # the waiter retries the call itself instead of hanging on the leader's future
+        result = await asyncio.wait_for(waiter, 1)
+        return flight, calls, result
+
+    flight, calls, result = asyncio.run(main())
+    assert result == (2, False)
+    assert len(calls) == 2
+    assert flight._calls == {}
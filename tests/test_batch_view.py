@@ -0,0 +1,77 @@
+import pytest
+
+import app as dgit
+from result_pages import batch_views
+
+
+def row(gene, drug, score):
+    return {"left_name": gene, "right_name": drug, "score": score}
+
+
+class BatchCalls(list):
+    """The term lists batch_search was called with; terms in `failing` return an error."""
+
+    def __init__(self):
+        super().__init__()
+        self.failing = {"CDK4"}
+
+
+@pytest.fixture
+def batch_calls(monkeypatch):
+    calls = BatchCalls()
+    failing = calls.failing
+
+    def batch_search(search_type, terms):
+        calls.append(list(terms))
+        rows = [row(t, f"DRUG{i}", float(i)) for t in terms if t not in failing for i in range(30)]
+        errors = {t: "DGIdb error: timeout" for t in terms if t in failing}
+        return rows, {}, errors, {}
+
+    batch_views.clear()
+    monkeypatch.setattr(dgit, "batch_search", batch_search)
+    yield calls
+    batch_views.clear()
+
+
+@pytest.fixture
+def client():
+    return dgit.app.test_client()
+
+
+def results(client, q, **params):
+    params.update({"type": "gene", "batch": "1", "q": q})
+    response = client.get("/api/search/results", query_string=params)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_pages_of_a_batch_share_one_batch_search(client, batch_calls):
+    batch_calls.failing.clear()
+    first = results(client, "EGFR, BRAF", page=1, per_page=25, sort="score")
+    second = results(client, "EGFR, BRAF", page=2, per_page=25, sort="score")
+    third = results(client, "EGFR, BRAF", page=3, per_page=25, sort="score")
+
+    assert len(batch_calls) == 1
+    assert first["total"] == second["total"] == third["total"] == 60
+    seen = first["rows"] + second["rows"] + third["rows"]
+    assert len(seen) == 60
+    assert [r["score"] for r in seen] == sorted((r["score"] for r in seen), reverse=True)
+
+
+def test_batch_view_key_ignores_term_order_and_case(client, batch_calls):
+    batch_calls.failing.clear()
+    results(client, "EGFR, BRAF")
+    results(client, "braf egfr", page=2)
+    assert len(batch_calls) == 1
+
+
+def test_batch_with_failed_terms_is_refetched(client, batch_calls):
+    first = results(client, "EGFR, CDK4")
+    assert first["errors"] == {"CDK4": "DGIdb error: timeout"}
+    assert first["total"] == 30
+
+    batch_calls.failing.clear()
+    second = results(client, "EGFR, CDK4", page=2)
+    assert "errors" not in second
+    assert second["total"] == 60
+    assert len(batch_calls) == 2
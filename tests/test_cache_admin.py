@@ -0,0 +1,135 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+import app as dgit
+import db_conn
+
+
+class FakeConnection:
+    """A mysql.connector-style connection whose cursor replays `results` per execute."""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.executed = []
+        self.commits = 0
+        self.closed = False
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=()):
+        self.executed.append((" ".join(sql.split()), tuple(params)))
+        self._result = self.results.pop(0)
+        self.rowcount = self._result if isinstance(self._result, int) else len(self._result)
+
+    def fetchall(self):
+        return self._result
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        self.closed = True
+
+
+def entry_row(entry_id, query, search_type="gene"):
+    stamp = datetime(2026, 1, 2, 3, 4, 5)
+    return (entry_id, query, search_type, 10, 2048, stamp, stamp, stamp)
+
+
+def test_listing_filter_escapes_like_wildcards():
+    where, params = db_conn._listing_where("gene", "  Sl_c%6 ")
+    assert where == " WHERE search_type = %s AND query LIKE %s"
+    assert params == ["gene", "sl\\_c\\%6%"]
+    assert db_conn._listing_where() == ("", [])
+
+
+def test_purge_deletes_in_batches_until_a_short_one(monkeypatch):
+    conn = FakeConnection([3, 3, 1])
+    monkeypatch.setattr(db_conn, "_connect", lambda: conn)
+
+    assert db_conn.purge_entries(expired_only=True, search_type="drug", batch_size=3) == 7
+    assert conn.executed[0] == ("DELETE FROM search_cache WHERE expires_at < NOW() AND search_type = %s LIMIT %s",
+                                ("drug", 3))
+    assert len(conn.executed) == 3 and conn.commits == 3 and conn.closed
+
+
+def test_purge_all_has_no_filter(monkeypatch):
+    conn = FakeConnection([0])
+    monkeypatch.setattr(db_conn, "_connect", lambda: conn)
+    assert db_conn.purge_entries(expired_only=False, batch_size=5) == 0
+    assert conn.executed == [("DELETE FROM search_cache LIMIT %s", (5,))]
+
+
+def test_iter_cache_entries_pages_by_id(monkeypatch):
+    conn = FakeConnection([[entry_row(1, "a"), entry_row(4, "b")], [entry_row(9, "c")]])
+    monkeypatch.setattr(db_conn, "_connect", lambda: conn)
+
+    entries = list(db_conn.iter_cache_entries("gene", batch_size=2))
+    assert [e["query"] for e in entries] == ["a", "b", "c"]
+    assert entries[0]["refreshed_at"] == "2026-01-02T03:04:05"
+    assert [params for _, params in conn.executed] == [("gene", 0, 2), ("gene", 4, 2)]
+    assert conn.closed
+
+
+@pytest.fixture
+def client():
+    return dgit.app.test_client()
+
+
+def test_entries_route_pages_the_listing(client, monkeypatch):
+    calls = []
+
+    def listing(search_type, prefix, sort, order, limit, offset):
+        calls.append((search_type, prefix, sort, order, limit, offset))
+        return 51, [db_conn._entry_dict(entry_row(1, "slc6a4"))]
+
+    monkeypatch.setattr(dgit, "list_cache_entries", listing)
+    body = client.get("/api/cache/entries?type=gene&q=slc&page=3&per_page=25&sort=results&order=asc").get_json()
+
+    assert calls == [("gene", "slc", "results", "asc", 25, 50)]
+    assert (body["matched"], body["page"], body["pages"]) == (51, 3, 3)
+    assert body["entries"][0]["query"] == "slc6a4"
+
+
+def test_entries_route_reports_an_unavailable_database(client, monkeypatch):
+    monkeypatch.setattr(dgit, "list_cache_entries", lambda *a, **kw: None)
+    assert client.get("/api/cache/entries").status_code == 503
+
+
+def test_export_route_streams_csv_and_ndjson(client, monkeypatch):
+    rows = [db_conn._entry_dict(entry_row(1, "egfr")), db_conn._entry_dict(entry_row(2, "braf"))]
+    monkeypatch.setattr(dgit, "iter_cache_entries", lambda search_type, prefix: iter(rows))
+
+    table = list(csv.DictReader(io.StringIO(client.get("/api/cache/export?format=csv").get_data(as_text=True))))
+    assert [r["query"] for r in table] == ["egfr", "braf"]
+    assert list(table[0]) == dgit.EXPORT_FIELDS
+
+    lines = client.get("/api/cache/export?format=ndjson").get_data(as_text=True).splitlines()
+    assert [json.loads(line)["query"] for line in lines] == ["egfr", "braf"]
+
+
+def test_purge_route_needs_the_admin_token_when_set(client, monkeypatch):
+    removed = []
+    monkeypatch.setattr(dgit, "CACHE_ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(dgit, "purge_entries",
+                        lambda expired_only, search_type: removed.append((expired_only, search_type)) or 4)
+
+    assert client.post("/api/cache/purge", json={}).status_code == 403
+    response = client.post("/api/cache/purge", json={"type": "gene"}, headers={"X-Admin-Token": "secret"})
+    assert response.get_json() == {"scope": "expired", "type": "gene", "removed": 4}
+    assert removed == [(True, "gene")]
+
+
+def test_purging_everything_clears_the_memory_tier(client, monkeypatch):
+    monkeypatch.setattr(dgit, "CACHE_ADMIN_TOKEN", None)
+    monkeypatch.setattr(dgit, "purge_entries", lambda expired_only, search_type: 0)
+    dgit.search_cache.memory.set(dgit.search_cache.key("EGFR", "gene"), {"rows": []})
+
+    assert client.post("/api/cache/purge", json={"scope": "everything"}).status_code == 400
+    assert client.post("/api/cache/purge", json={"scope": "all"}).status_code == 200
+    assert len(dgit.search_cache.memory) == 0
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+import cache_codec
+from cache_codec import MAGIC, HEADER_LEN, VERSION
+
+ENTRY = {
+    "results": {"data": {"genes": {"nodes": [{"name": "SLC6A4"}]}}},
+    "rows": [{"left_name": "SLC6A4", "right_name": "FLUOXETINE", "score": 1.5, "interaction_type_list": ["inhibitor"]}] * 50,
+}
+SMALL = {"rows": [], "note": "ß ☃"}
+
+
+@pytest.mark.parametrize("compression", ["none", "zlib", "zstd"])
+def test_round_trip(compression):
+    blob, size = cache_codec.encode_sized(ENTRY, compression)
+    assert cache_codec.decode_sized(blob) == (ENTRY, size)
+
+
+def test_header_layout():
+    blob = cache_codec.encode(ENTRY, "zlib")
+    assert blob.startswith(MAGIC)
+    version, serializer, compression = blob[len(MAGIC):HEADER_LEN]
+    assert version == VERSION
+    assert serializer in (cache_codec.SERIALIZER_JSON, cache_codec.SERIALIZER_ORJSON)
+    assert compression == cache_codec.COMPRESSION_ZLIB
+
+
+def test_small_payloads_are_stored_uncompressed():
+    blob, size = cache_codec.encode_sized(SMALL, "zlib")
+    assert size < cache_codec.CACHE_CODEC_MIN_SIZE
+    assert blob[HEADER_LEN - 1] == cache_codec.COMPRESSION_NONE
+    assert cache_codec.decode(blob) == SMALL
+
+
+def test_legacy_plain_json_is_accepted():
+    text = json.dumps(ENTRY)
+    assert cache_codec.decode_sized(text) == (ENTRY, len(text))
+    assert cache_codec.decode(text.encode("utf-8")) == ENTRY
+    assert cache_codec.decode_sized(None) == (None, 0)
+
+
+def test_memoryview_from_the_driver_is_accepted():
+    blob = cache_codec.encode(ENTRY)
+    assert cache_codec.decode(memoryview(blob)) == ENTRY
+
+
+def test_unknown_version_and_compression_are_rejected():
+    blob = bytearray(cache_codec.encode(ENTRY, "zlib"))
+    blob[len(MAGIC)] = VERSION + 1
+    with pytest.raises(ValueError):
+        cache_codec.decode(bytes(blob))
+
+    blob = bytearray(cache_codec.encode(ENTRY, "zlib"))
+    blob[HEADER_LEN - 1] = 9
+    with pytest.raises(ValueError):
+        cache_codec.decode(bytes(blob))
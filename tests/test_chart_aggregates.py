@@ -0,0 +1,77 @@
+import chart_aggregates
+from chart_aggregates import AGGREGATES_VERSION, SCORE_BUCKETS, aggregates_for, build_aggregates, merge_aggregates
+
+
+def row(gene, drug, score, types=("inhibitor",)):
+    return {"left_label": "Gene", "left_name": gene, "right_label": "Drug", "right_name": drug,
+            "score": score, "interaction_type_list": list(types)}
+
+
+ROWS = [
+    row("SLC6A4", "FLUOXETINE", 3.0),
+    row("SLC6A4", "SERTRALINE", 0.2, ("inhibitor", "antagonist")),
+    row("SLC6A4", "TRAMADOL", None, ()),
+    row("SLC6A4", "FLUOXETINE", 7.5, ("modulator",)),
+]
+
+
+def test_counts_and_histogram():
+    agg = build_aggregates(ROWS)
+
+    assert agg["version"] == AGGREGATES_VERSION
+    assert agg["type_counts"] == {"inhibitor": 2, "antagonist": 1, "modulator": 1}
+    histogram = agg["score_histogram"]
+    assert histogram["bounds"] == list(SCORE_BUCKETS)
+    assert sum(histogram["counts"]) == 3 and histogram["unscored"] == 1
+    assert histogram["counts"][1] == 1  # 0.2 -> (0.1, 0.25]
+
+
+def test_top_scores_are_ordered_and_unscored_rows_left_out():
+    top = build_aggregates(ROWS)["top_scores"]
+    assert [t["score"] for t in top] == [7.5, 3.0, 0.2]
+
+
+def test_graph_merges_duplicate_edges():
+    graph = build_aggregates(ROWS)["graph"]
+
+    assert graph["edge_count"] == 3
+    assert {n["id"] for n in graph["nodes"]} == {"Gene:SLC6A4", "Drug:FLUOXETINE", "Drug:SERTRALINE", "Drug:TRAMADOL"}
+    fluoxetine = next(e for e in graph["edges"] if e["to"] == "Drug:FLUOXETINE")
+    assert fluoxetine["value"] == 7.5
+    assert fluoxetine["types"] == ["inhibitor", "modulator"]
+
+
+def test_graph_keeps_the_strongest_edges(monkeypatch):
+    monkeypatch.setattr(chart_aggregates, "GRAPH_MAX_EDGES", 2)
+    graph = build_aggregates(ROWS)["graph"]
+
+    assert graph["edge_count"] == 3
+    assert sorted(e["value"] for e in graph["edges"]) == [0.2, 7.5]
+    assert "Drug:TRAMADOL" not in {n["id"] for n in graph["nodes"]}
+
+
+def test_protein_rows_only_count_types():
+    agg = build_aggregates([{"protein_name": "SERT", "interaction_type_list": []}])
+    assert agg["graph"]["nodes"] == [] and agg["top_scores"] == []
+
+
+def test_stored_aggregates_are_reused_unless_stale():
+    stored = {"version": AGGREGATES_VERSION, "type_counts": {"stored": 1}}
+    assert aggregates_for({"rows": ROWS, "aggregates": stored}) is stored
+
+    stale = dict(stored, version=AGGREGATES_VERSION - 1)
+    assert aggregates_for({"rows": ROWS, "aggregates": stale}) == build_aggregates(ROWS)
+    assert aggregates_for(None)["type_counts"] == {}
+
+
+def test_merge_matches_aggregating_all_rows():
+    other = [row("HTR2A", "FLUOXETINE", 1.5, ("agonist",)), row("SLC6A4", "SERTRALINE", 4.0)]
+    merged = merge_aggregates([build_aggregates(ROWS), build_aggregates(other)])
+    combined = build_aggregates(ROWS + other)
+
+    assert merged["type_counts"] == combined["type_counts"]
+    assert merged["score_histogram"] == combined["score_histogram"]
+    assert merged["top_scores"] == combined["top_scores"]
+    assert merged["graph"]["edge_count"] == combined["graph"]["edge_count"]
+    edges = lambda agg: {(e["from"], e["to"]): (e["value"], sorted(e["types"])) for e in agg["graph"]["edges"]}
+    assert edges(merged) == edges(combined)
@@ -0,0 +1,68 @@
+import db_conn
+from db_conn import normalize_cache_key
+
+
+class SchemaCursor:
+    """Answers the information_schema lookups from a fixed schema and records every other statement."""
+
+    def __init__(self, columns=(), indexes=()):
+        self.columns = set(columns)
+        self.indexes = set(indexes)
+        self.statements = []
+        self._count = 0
+
+    def execute(self, sql, params=()):
+        if "information_schema.COLUMNS" in sql:
+            self._count = int((params[1], params[2]) in self.columns)
+        elif "information_schema.STATISTICS" in sql:
+            self._count = int((params[1], params[2]) in self.indexes)
+        else:
+            self.statements.append(" ".join(sql.split()))
+
+    def fetchone(self):
+        return (self._count,)
+
+
+def _position(statements, prefix):
+    matches = [i for i, sql in enumerate(statements) if sql.startswith(prefix)]
+    assert matches, f"no statement starting with {prefix!r}"
+    return matches[0]
+
+
+def test_normalize_cache_key_trims_and_lowercases():
+    assert normalize_cache_key("  EGFR ") == "egfr"
+    assert normalize_cache_key("Imatinib") == "imatinib"
+    assert normalize_cache_key(None) == ""
+
+
+def test_legacy_table_drops_null_keys_before_dedupe_and_not_null():
+    cursor = SchemaCursor()
+    db_conn._migrate_search_cache(cursor)
+    statements = cursor.statements
+
+    purge = _position(statements, "DELETE FROM search_cache WHERE query IS NULL OR search_type IS NULL")
+    normalize = _position(statements, "UPDATE search_cache SET query = LOWER(TRIM(query))")
+    dedupe = _position(statements, "DELETE older FROM search_cache older")
+    tighten = _position(statements, "ALTER TABLE search_cache MODIFY query VARCHAR(255) NOT NULL")
+    assert purge < normalize < dedupe < tighten
+
+
+def test_legacy_table_gets_expiry_and_stats_columns():
+    cursor = SchemaCursor()
+    db_conn._migrate_search_cache(cursor)
+    ddl = " ".join(cursor.statements)
+
+    for column in ("refreshed_at", "expires_at", "result_blob", "result_count", "payload_bytes"):
+        assert f"ADD COLUMN {column}" in ddl
+    for index in ("idx_type_stats", "idx_type_query", "idx_refreshed_at"):
+        assert f"ADD INDEX {index}" in ddl
+
+
+def test_current_schema_is_left_alone():
+    columns = {("search_cache", c) for c in
+               ("refreshed_at", "expires_at", "result_blob", "result_count", "payload_bytes")}
+    indexes = {("search_cache", i) for i in
+               ("uq_query_type", "idx_expires_at", "idx_type_stats", "idx_type_query", "idx_refreshed_at")}
+    cursor = SchemaCursor(columns, indexes)
+    db_conn._migrate_search_cache(cursor)
+    assert cursor.statements == []
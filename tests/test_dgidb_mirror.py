@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+import pytest
+
+import dgidb_mirror
+import interaction_store
+from benchmarks.sqlite_store import SQLiteStore
+
+INTERACTIONS = """gene_name\tgene_concept_id\tdrug_name\tdrug_concept_id\tinteraction_type\tinteraction_source_db_name\tinteraction_score\tpmids
+SLC6A4\thgnc:11050\tFLUOXETINE\trxcui:4493\tinhibitor\tDrugBank\t2.5\t111
+SLC6A4\thgnc:11050\tFLUOXETINE\trxcui:4493\tinhibitor,antagonist\tChEMBL\t4.0\t111|222
+SLC6A4\thgnc:11050\tPAROXETINE\trxcui:32937\tNULL\tTTD\tNA\t
+HTR2A\thgnc:5293\tFLUOXETINE\trxcui:4493\tagonist\tDrugBank\t0.5\t333
+\t\tORPHAN\trxcui:1\tinhibitor\tDrugBank\t1\t
+"""
+GENES = """gene_name\tgene_concept_id\tgene_long_name
+SLC6A4\thgnc:11050\t
+SLC6A4\tNULL\tsolute carrier family 6 member 4
+HTR2A\thgnc:5293\t5-hydroxytryptamine receptor 2A
+"""
+DRUGS = """drug_name\tdrug_concept_id
+FLUOXETINE\trxcui:4493
+PAROXETINE\trxcui:32937
+"""
+CATEGORIES = """gene_name\tcategory
+SLC6A4\tTRANSPORTER
+SLC6A4\tDRUGGABLE GENOME
+"""
+
+
+@pytest.fixture
+def release(tmp_path):
+    paths = {}
+    for kind, text in (("interactions", INTERACTIONS), ("genes", GENES), ("drugs", DRUGS), ("categories", CATEGORIES)):
+        path = tmp_path / dgidb_mirror.RELEASE_FILES[kind]
+        path.write_text(text, encoding="utf-8")
+        paths[kind] = str(path)
+    return paths
+
+
+@pytest.fixture
+def mirror(monkeypatch):
+    sqlite = SQLiteStore()
+    connection = sqlite.connection()
+    monkeypatch.setattr(dgidb_mirror, "_connect", lambda: connection)
+    monkeypatch.setattr(dgidb_mirror, "mysql", SimpleNamespace(connection=connection))
+    monkeypatch.setattr(interaction_store, "mysql", SimpleNamespace(connection=connection))
+    monkeypatch.setattr(dgidb_mirror, "_release_checked", [0.0, False])
+    return sqlite
+
+
+def test_claims_are_merged_per_pair(release):
+    records = dgidb_mirror.read_interactions(release["interactions"])
+
+    assert [(r["gene"][0], r["drug"][0]) for r in records] == [
+        ("HTR2A", "FLUOXETINE"), ("SLC6A4", "FLUOXETINE"), ("SLC6A4", "PAROXETINE")]
+    fluoxetine = records[1]
+    assert fluoxetine["score"] == 4.0
+    assert fluoxetine["types"] == [("inhibitor", "INHIBITORY"), ("antagonist", "INHIBITORY")]
+    assert fluoxetine["sources"] == ["DrugBank", "ChEMBL"]
+    assert fluoxetine["pmids"] == ["111", "222"]
+    assert records[2]["score"] is None and records[2]["types"] == []
+    assert records[0]["types"] == [("agonist", "ACTIVATING")]
+
+
+def test_gene_and_category_files(release):
+    genes = dgidb_mirror.read_genes(release["genes"])
+    assert genes["SLC6A4"] == ("SLC6A4", "hgnc:11050", "solute carrier family 6 member 4")
+    assert dgidb_mirror.read_categories(release["categories"]) == {"SLC6A4": {"TRANSPORTER", "DRUGGABLE GENOME"}}
+
+
+def test_names_too_long_for_the_tables_are_skipped(tmp_path):
+    path = tmp_path / "drugs.tsv"
+    path.write_text("drug_name\tdrug_concept_id\n" + "X" * 300 + "\trxcui:1\nOK\trxcui:2\n", encoding="utf-8")
+    assert list(dgidb_mirror.read_drugs(str(path))) == ["OK"]
+
+
+def test_no_release_means_every_name_is_missing(mirror):
+    assert dgidb_mirror.query("gene", ["SLC6A4"]) == (None, ["SLC6A4"])
+
+
+def test_loaded_release_answers_searches(mirror, release):
+    counts = dgidb_mirror.load_release(release, label="2024-12", batch_size=2)
+    assert counts == {"genes": 2, "drugs": 2, "interactions": 3}
+
+    results, missing = dgidb_mirror.query("gene", ["slc6a4", "BDNF"])
+    assert missing == ["BDNF"]
+    (node,) = results["data"]["genes"]["nodes"]
+    assert node["name"] == "SLC6A4" and node["source"] == "mirror"
+    assert {c["name"] for c in node["geneCategories"]} == {"TRANSPORTER", "DRUGGABLE GENOME"}
+    drugs = {i["drug"]["name"]: i for i in node["interactions"]}
+    assert set(drugs) == {"FLUOXETINE", "PAROXETINE"}
+    assert drugs["FLUOXETINE"]["interactionScore"] == 4.0
+    assert {p["pmid"] for p in drugs["FLUOXETINE"]["publications"]} == {111, 222}
+
+
+def test_merge_appends_the_api_nodes():
+    mirrored = {"data": {"drugs": {"nodes": [{"name": "FLUOXETINE"}]}}}
+    fetched = {"data": {"drugs": {"nodes": [{"name": "KETAMINE"}]}}}
+    merged = dgidb_mirror.merge("drug", mirrored, fetched)
+    assert [n["name"] for n in merged["data"]["drugs"]["nodes"]] == ["FLUOXETINE", "KETAMINE"]
+    assert dgidb_mirror.merge("drug", None, fetched)["data"]["drugs"]["nodes"] == [{"name": "KETAMINE"}]
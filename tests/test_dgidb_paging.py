@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+import app as dgit
+import asgi
+import async_upstream
+import upstream
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200):
+        self.body = body
+        self.status_code = status_code
+
+    def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise dgit.requests.HTTPError(f"{self.status_code} Server Error")
+
+
+def interaction(gene, drug, score=1.0):
+    return {
+        "gene": {"name": gene, "conceptId": f"hgnc:{gene}"},
+        "drug": {"name": drug, "conceptId": f"rxcui:{drug}"},
+        "interactionScore": score,
+        "interactionTypes": [{"type": "inhibitor", "directionality": None}],
+        "sources": [{"sourceDbName": "DrugBank"}],
+        "publications": [],
+    }
+
+
+def page(items, cursor=None):
+    return {"data": {"interactions": {
+        "pageInfo": {"hasNextPage": cursor is not None, "endCursor": cursor},
+        "nodes": items,
+    }}}
+
+
+class FakeDgidb:
+    """Answers posts from a list of responses (the last one repeats) and records the variables."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.posts = []
+
+    def __call__(self, url, json=None, **kwargs):
+        self.posts.append(json)
+        body = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        return body if isinstance(body, FakeResponse) else FakeResponse(body)
+
+
+@pytest.fixture(autouse=True)
+def api_source(monkeypatch):
+    monkeypatch.setattr(dgit, "DGIDB_SOURCE", "api")
+    monkeypatch.setitem(dgit._dgidb_paging, "supported", True)
+
+
+def test_ask_sends_one_short_page(monkeypatch):
+    fake = FakeDgidb(page([interaction("SLC6A4", f"DRUG{i}") for i in range(5)], cursor="next"))
+    monkeypatch.setattr(upstream, "post", fake)
+
+    rows = dgit.fetch_ask_interactions("SLC6A4")
+    assert len(fake.posts) == 1
+    assert fake.posts[0]["variables"]["first"] == dgit.DGIDB_ASK_ROWS
+    assert fake.posts[0]["variables"]["after"] is None
+    assert [r["right_name"] for r in rows] == [f"DRUG{i}" for i in range(5)]
+
+
+def test_async_ask_sends_one_short_page(monkeypatch):
+    fake = FakeDgidb(page([interaction("SLC6A4", "FLUOXETINE")], cursor="next"))
+
+    async def post(url, **kwargs):
+        return fake(url, **kwargs)
+
+    monkeypatch.setattr(async_upstream, "post", post)
+    rows = asyncio.run(asgi._dgidb_interactions_async("SLC6A4"))
+    assert len(fake.posts) == 1
+    assert fake.posts[0]["variables"]["first"] == dgit.DGIDB_ASK_ROWS
+    assert [r["right_name"] for r in rows] == ["FLUOXETINE"]
+
+
+def test_pages_are_merged_and_handed_over_as_they_arrive(monkeypatch):
+    fake = FakeDgidb(
+        page([interaction("SLC6A4", "FLUOXETINE"), interaction("SLC6A4", "SERTRALINE")], cursor="p2"),
+        page([interaction("SLC6A4", "VORTIOXETINE")]),
+    )
+    monkeypatch.setattr(upstream, "post", fake)
+    seen = []
+
+    results, error = dgit.queryDgidb("gene", ["SLC6A4"], on_page=seen.append)
+    assert error is None
+    assert [p["variables"]["after"] for p in fake.posts] == [None, "p2"]
+    nodes = results["data"]["genes"]["nodes"]
+    assert len(nodes) == 1
+    assert [i["drug"]["name"] for i in nodes[0]["interactions"]] == ["FLUOXETINE", "SERTRALINE", "VORTIOXETINE"]
+    assert len(seen) == 2
+
+
+def test_collect_page_returns_the_next_cursor():
+    merged = {}
+    assert dgit.collect_page("drug", page([interaction("HTR2A", "LSD")], cursor="c")["data"]["interactions"],
+                             merged, None) == "c"
+    assert dgit.collect_page("drug", page([interaction("DRD2", "LSD")])["data"]["interactions"], merged, None) is None
+    assert [g["gene"]["name"] for g in merged["LSD"]["interactions"]] == ["HTR2A", "DRD2"]
+
+
+def test_failed_later_page_keeps_earlier_rows_with_an_error(monkeypatch):
+    fake = FakeDgidb(page([interaction("SLC6A4", "FLUOXETINE")], cursor="p2"), FakeResponse({}, 502))
+    monkeypatch.setattr(upstream, "post", fake)
+
+    data, error = dgit.fetch_search_results("gene", "SLC6A4")
+    assert "incomplete" in error and "page 2" in error
+    assert [r["right_name"] for r in data["rows"]] == ["FLUOXETINE"]
+    assert dgit._dgidb_paging["supported"]
+
+
+def test_page_cap_is_reported_as_incomplete(monkeypatch):
+    monkeypatch.setattr(dgit, "DGIDB_MAX_PAGES", 2)
+    fake = FakeDgidb(page([interaction("SLC6A4", "FLUOXETINE")], cursor="more"))
+    monkeypatch.setattr(upstream, "post", fake)
+
+    results, error = dgit.queryDgidb("gene", ["SLC6A4"])
+    assert len(fake.posts) == 2
+    assert "truncated" in error
+    assert len(results["data"]["genes"]["nodes"][0]["interactions"]) == 2
+
+
+def test_transient_errors_keep_paging_on(monkeypatch):
+    monkeypatch.setattr(upstream, "post", FakeDgidb({"data": None, "errors": [{"message": "Internal server error"}]}))
+    results, error = dgit.queryDgidb("gene", ["SLC6A4"])
+    assert error == "Internal server error"
+    assert dgit._dgidb_paging["supported"]
+
+    monkeypatch.setattr(upstream, "post", FakeDgidb(FakeResponse(None, 503)))
+    assert dgit.queryDgidb("gene", ["SLC6A4"])[0] is None
+    assert dgit._dgidb_paging["supported"]
+
+
+def test_schema_rejection_switches_to_single_queries(monkeypatch):
+    rejected = FakeResponse({"errors": [{"message": "Field 'interactions' doesn't exist on type 'Query'"}]}, 400)
+    single = {"data": {"genes": {"nodes": [{"name": "SLC6A4", "interactions": []}]}}}
+    fake = FakeDgidb(rejected, single)
+    monkeypatch.setattr(upstream, "post", fake)
+
+    results, error = dgit.queryDgidb("gene", ["SLC6A4"])
+    assert error is None
+    assert results == single
+    assert not dgit._dgidb_paging["supported"]
+    assert "after" not in fake.posts[1]["variables"]
@@ -0,0 +1,87 @@
+import math
+
+import pytest
+
+from interaction_graph import DRUG, GENE, InteractionGraph, _CSR
+
+GENES = ["SLC6A4", "HTR2A", "DRD2", "ISOLATED"]
+DRUGS = ["FLUOXETINE", "VORTIOXETINE", "ARIPIPRAZOLE", "LONELY"]
+EDGES = [(0, 0, 3.0), (0, 1, 2.0), (1, 1, 1.0), (1, 2, None), (2, 2, 4.0)]
+
+
+@pytest.fixture
+def graph():
+    g = InteractionGraph()
+    g._build(list(GENES), list(DRUGS), EDGES)
+    g.loaded_at = 1.0  # as if load() had run, so saved interactions apply
+    return g
+
+
+def test_csr_rows():
+    csr = _CSR(3, [(2, 5, 1.0), (0, 7, None), (2, 6, 2.0)])
+    assert len(csr) == 3
+    assert list(csr.ptr) == [0, 1, 1, 3]
+    assert [d for d, _ in csr.row(0)] == [7]
+    assert math.isnan(list(csr.row(0))[0][1])
+    assert list(csr.row(1)) == []
+    assert list(csr.row(2)) == [(5, 1.0), (6, 2.0)]
+    assert csr.row(10) == ()
+
+
+def test_both_directions_are_indexed(graph):
+    assert graph.stats()["edges"] == len(EDGES)
+    assert graph.lookup(GENE, "slc6a4") == 0
+    assert sorted(graph._neighbors(DRUG, graph.lookup(DRUG, "Vortioxetine"))) == [0, 1]
+
+
+def test_neighborhood_ranks_partners_and_related_nodes(graph):
+    result = graph.neighborhood(GENE, "SLC6A4")
+    assert [p["name"] for p in result["partners"]] == ["FLUOXETINE", "VORTIOXETINE"]
+    assert result["related"] == [{"name": "HTR2A", "shared": 1, "via": ["VORTIOXETINE"]}]
+    assert result["graph"]["edge_count"] == 3
+    assert graph.neighborhood(GENE, "NOPE") is None
+
+
+def test_unscored_edges_sort_last_and_serialize_as_none(graph):
+    result = graph.neighborhood(DRUG, "ARIPIPRAZOLE", hops=1)
+    assert result["partners"] == [{"name": "DRD2", "score": 4.0}, {"name": "HTR2A", "score": None}]
+    assert result["related"] == []
+
+
+def test_shared_partners(graph):
+    result, unknown = graph.shared_partners(GENE, ["SLC6A4", "HTR2A", "NOPE"])
+    assert unknown == ["NOPE"]
+    assert result["shared"] == [{"name": "VORTIOXETINE", "count": 2, "by": ["SLC6A4", "HTR2A"]}]
+
+
+def test_shortest_path(graph):
+    result = graph.shortest_path("SLC6A4", "ARIPIPRAZOLE")
+    assert result["hops"] == 3
+    assert [step["name"] for step in result["path"]] == ["SLC6A4", "VORTIOXETINE", "HTR2A", "ARIPIPRAZOLE"]
+    assert [e["value"] for e in result["graph"]["edges"]] == [2.0, 1.0, None]
+
+
+def test_shortest_path_direct_unreachable_and_unknown(graph):
+    assert graph.shortest_path("SLC6A4", "FLUOXETINE")["hops"] == 1
+    assert graph.shortest_path("SLC6A4", "LONELY")["path"] == []
+    assert graph.shortest_path("SLC6A4", "ARIPIPRAZOLE", max_hops=2)["path"] == []
+    assert graph.shortest_path("NOPE", "FLUOXETINE") is None
+
+
+def test_saved_interactions_go_to_the_overlay_and_compact(graph, monkeypatch):
+    graph.add_interactions([("ISOLATED", "LONELY", 0.5), ("NEWGENE", "FLUOXETINE", None)])
+    assert graph.overlay_size() == 2
+    assert graph.shortest_path("ISOLATED", "LONELY")["hops"] == 1
+    assert [p["name"] for p in graph.neighborhood(DRUG, "FLUOXETINE", hops=1)["partners"]] == ["SLC6A4", "NEWGENE"]
+
+    monkeypatch.setattr("interaction_graph.GRAPH_COMPACT_EDGES", 0)
+    graph.add_interactions([("DRD2", "LONELY", 1.0)])
+    assert graph.overlay_size() == 0
+    assert graph.stats()["edges"] == len(EDGES) + 3
+    assert graph.shortest_path("NEWGENE", "LONELY")["hops"] == 7
+
+
+def test_interactions_before_the_first_load_are_ignored():
+    g = InteractionGraph()
+    g.add_interactions([("SLC6A4", "FLUOXETINE", 1.0)])
+    assert g.stats()["genes"] == 0
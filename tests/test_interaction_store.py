@@ -0,0 +1,103 @@
+from types import SimpleNamespace
+
+import pytest
+
+import interaction_store
+from benchmarks.sqlite_store import SQLiteStore
+from chart_aggregates import build_aggregates
+from interaction_store import name_key
+from parsers import build_cache_entry, parseDrugResults, parseGeneResults
+
+
+def test_name_key_matches_case_and_accent_insensitive_collation():
+    assert name_key("Fluoxétine") == name_key("FLUOXETINE")
+    assert name_key("Straße") == name_key("STRASSE")
+    assert name_key("SLC6A4  ") == name_key("slc6a4")
+    assert name_key(None) == ""
+
+
+def test_name_key_keeps_distinct_names_apart():
+    assert name_key("IL-6") != name_key("IL6")
+    assert name_key(" SLC6A4") != name_key("SLC6A4")
+
+
+def gene_interaction(drug, score, kind, source, pmid):
+    return {
+        "drug": {"name": drug, "conceptId": f"rxcui:{drug.lower()}"},
+        "interactionScore": score,
+        "interactionTypes": [{"type": kind, "directionality": None}],
+        "sources": [{"sourceDbName": source}],
+        "publications": [{"pmid": pmid}],
+    }
+
+
+def entry_for(search_type, nodes):
+    root = interaction_store.ROOTS[search_type]
+    results = {"data": {root: {"nodes": nodes}}}
+    parse = parseGeneResults if search_type == "gene" else parseDrugResults
+    return build_cache_entry(results, parse(results))
+
+
+GENE_ENTRY = entry_for("gene", [{"name": "SLC6A4", "conceptId": "hgnc:11050", "interactions": [
+    gene_interaction("FLUOXETINE", 2.5, "inhibitor", "DrugBank", 111),
+    gene_interaction("PAROXETINE", None, "inhibitor", "ChEMBL", 222),
+]}])
+
+
+@pytest.fixture
+def store(monkeypatch):
+    sqlite = SQLiteStore()
+    monkeypatch.setattr(interaction_store, "mysql", SimpleNamespace(connection=sqlite.connection()))
+    monkeypatch.setattr(interaction_store, "get_cached_entry", sqlite.get_cached_entry)
+    monkeypatch.setattr(interaction_store, "save_results", sqlite.save_results)
+    return sqlite
+
+
+def test_save_and_load_round_trip(store):
+    assert interaction_store.save_interaction_results("SLC6A4", "gene", GENE_ENTRY, size=4321)
+
+    marker, _ = store.get_cached_entry("slc6a4", "gene")
+    assert marker["storage"] == "relational"
+    assert len(marker["interactions"]) == 2
+
+    data, size = interaction_store.load_interaction_results("SLC6A4", "gene")
+    assert size == 4321
+    assert data["rows"] == GENE_ENTRY["rows"]
+    assert data["aggregates"] == GENE_ENTRY["aggregates"]
+
+
+def test_entry_keeps_its_rows_when_other_searches_add_interactions(store):
+    interaction_store.save_interaction_results("SLC6A4", "gene", GENE_ENTRY)
+    # a later drug search stores another SLC6A4 interaction in the shared tables
+    sertraline = entry_for("drug", [{"name": "SERTRALINE", "conceptId": "rxcui:36437", "interactions": [{
+        "gene": {"name": "SLC6A4", "conceptId": "hgnc:11050", "longName": "solute carrier family 6 member 4"},
+        "interactionScore": 1.0,
+        "interactionTypes": [{"type": "inhibitor", "directionality": None}],
+        "sources": [{"sourceDbName": "DrugBank"}],
+        "publications": [],
+    }]}])
+    interaction_store.save_interaction_results("SERTRALINE", "drug", sertraline)
+
+    data, _ = interaction_store.load_interaction_results("SLC6A4", "gene")
+    assert [r["right_name"] for r in data["rows"]] == ["FLUOXETINE", "PAROXETINE"]
+    assert data["aggregates"] == build_aggregates(data["rows"])
+
+    # the reverse lookup by name still sees every stored interaction
+    everything = interaction_store.load_interactions("gene", ["SLC6A4"])
+    assert [r["right_name"] for r in everything["rows"]] == ["FLUOXETINE", "PAROXETINE", "SERTRALINE"]
+
+    exported = list(interaction_store.iter_stored_rows(
+        "gene", ["SLC6A4"], batch_size=1, interaction_ids=store.get_cached_entry("SLC6A4", "gene")[0]["interactions"]))
+    assert exported == data["rows"]
+
+
+def test_markers_without_interaction_ids_recompute_their_charts(store):
+    interaction_store.save_interaction_results("SLC6A4", "gene", GENE_ENTRY)
+    marker, _ = store.get_cached_entry("SLC6A4", "gene")
+    legacy = {"storage": "relational", "nodes": marker["nodes"], "aggregates": {"version": 0}}
+    store.save_results("SLC6A4", "gene", legacy)
+
+    data, size = interaction_store.load_interaction_results("SLC6A4", "gene")
+    assert size is None
+    assert data["rows"] == GENE_ENTRY["rows"]
+    assert data["aggregates"] == GENE_ENTRY["aggregates"]
@@ -0,0 +1,54 @@
+import time
+
+from cache import MemoryCache
+
+
+def test_get_returns_stored_value_and_counts_hits():
+    cache = MemoryCache(max_entries=4, max_bytes=1000, ttl=60)
+    cache.set("a", {"rows": [1]}, size=10)
+    assert cache.get("a") == {"rows": [1]}
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lru_eviction_by_entry_count():
+    cache = MemoryCache(max_entries=2, max_bytes=1000, ttl=60)
+    cache.set("a", 1, size=1)
+    cache.set("b", 2, size=1)
+    cache.get("a")  # a is now the most recently used
+    cache.set("c", 3, size=1)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_byte_budget_evicts_oldest():
+    cache = MemoryCache(max_entries=10, max_bytes=100, ttl=60)
+    cache.set("a", 1, size=60)
+    cache.set("b", 2, size=60)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 60
+
+
+def test_oversized_entry_is_rejected_without_flushing():
+    cache = MemoryCache(max_entries=10, max_bytes=100, ttl=60)
+    cache.set("a", 1, size=50)
+    assert cache.set("big", 2, size=101) is False
+    assert cache.get("a") == 1
+
+
+def test_expired_entries_miss():
+    cache = MemoryCache(max_entries=10, max_bytes=100, ttl=60)
+    cache.set("a", 1, size=1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_replacing_a_key_keeps_the_byte_count():
+    cache = MemoryCache(max_entries=10, max_bytes=100, ttl=60)
+    cache.set("a", 1, size=30)
+    cache.set("a", 2, size=20)
+    assert cache.get("a") == 2
+    assert cache.stats()["bytes"] == 20
@@ -0,0 +1,92 @@
+import json
+import threading
+
+import metrics
+from metrics import Counter, Histogram
+
+
+def test_counter_renders_escaped_labels():
+    counter = Counter("dgit_test_total", "Test counter.", ("host",))
+    counter.inc('a"b')
+    counter.inc('a"b', amount=2)
+    counter.inc("c")
+    assert counter.render() == [
+        "# HELP dgit_test_total Test counter.",
+        "# TYPE dgit_test_total counter",
+        'dgit_test_total{host="a\\"b"} 3',
+        'dgit_test_total{host="c"} 1',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("dgit_test_seconds", "Test histogram.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, "/x")
+    lines = histogram.render()
+    assert 'dgit_test_seconds_bucket{route="/x",le="0.1"} 1' in lines
+    assert 'dgit_test_seconds_bucket{route="/x",le="1.0"} 2' in lines
+    assert 'dgit_test_seconds_bucket{route="/x",le="+Inf"} 3' in lines
+    assert 'dgit_test_seconds_sum{route="/x"} 5.55' in lines
+    assert 'dgit_test_seconds_count{route="/x"} 3' in lines
+
+
+def test_counter_is_thread_safe():
+    counter = Counter("dgit_test_total", "Test counter.")
+
+    def bump():
+        for _ in range(1000):
+            counter.inc()
+
+    threads = [threading.Thread(target=bump) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter.render()[-1] == "dgit_test_total 8000"
+
+
+def test_host_label_shortens_known_hosts():
+    assert metrics.host_label("https://dgidb.org/api/graphql") == "dgidb"
+    assert metrics.host_label("https://example.org/x") == "example.org"
+
+
+def test_trace_collects_spans_and_writes_one_log_line(monkeypatch, capsys):
+    monkeypatch.setattr(metrics, "REQUEST_LOG", True)
+    token = metrics.start_trace("/search")
+    with metrics.span("parse"):
+        pass
+    with metrics.span("parse"):
+        pass
+    metrics.observe_upstream("dgidb", 0.25, 200)
+    metrics.annotate(search_type="gene", cache="memory")
+    metrics.end_trace(token, "GET", 200)
+
+    record = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert record["route"] == "/search" and record["status"] == 200
+    assert set(record["stages_ms"]) == {"parse", "upstream:dgidb"}
+    assert record["stages_ms"]["upstream:dgidb"] == 250.0
+    assert (record["search_type"], record["cache"]) == ("gene", "memory")
+    assert metrics.current_trace() is None
+
+
+def test_spans_outside_a_request_count_as_background():
+    with metrics.span("warmup-test-stage"):
+        pass
+    assert any('route="background",stage="warmup-test-stage"' in line for line in metrics.render().splitlines())
+
+
+def test_render_includes_gauges_and_skips_failing_ones(monkeypatch):
+    monkeypatch.setattr(metrics, "_gauges", {})
+    metrics.register_gauge("dgit_test_entries", "Entries.", lambda: {("gene",): 3}, ("kind",))
+    metrics.register_gauge("dgit_test_broken", "Broken.", lambda: 1 / 0)
+
+    text = metrics.render()
+    assert 'dgit_test_entries{kind="gene"} 3' in text
+    assert not [line for line in text.splitlines() if line.startswith("dgit_test_broken")]
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    before = metrics.CACHE_REQUESTS.render()
+    metrics.count_cache("memory", "gene", "hit")
+    assert metrics.CACHE_REQUESTS.render() == before
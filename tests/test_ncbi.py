@@ -0,0 +1,122 @@
+import pytest
+
+import ncbi
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(round(seconds, 6))
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.body
+
+
+class FakeEutils:
+    """esearch/esummary for a fixed {symbol: (gene_id, description)} table."""
+
+    def __init__(self, genes):
+        self.genes = genes
+        self.calls = []
+        self.saved = []
+
+    def get(self, url, params):
+        self.calls.append((url.rsplit("/", 1)[-1], params))
+        if url == ncbi.NCBI_ESEARCH_URL:
+            term = params["term"]
+            ids = [gid for sym, (gid, _) in self.genes.items() if f"{sym}[sym]" in term or sym == term]
+            return FakeResponse({"esearchresult": {"idlist": ids}})
+        ids = params["id"].split(",")
+        by_id = {gid: (sym, desc) for sym, (gid, desc) in self.genes.items()}
+        result = {"uids": [i for i in ids if i in by_id]}
+        for gid in result["uids"]:
+            result[gid] = {"name": by_id[gid][0], "description": by_id[gid][1]}
+        return FakeResponse({"result": result})
+
+
+@pytest.fixture
+def eutils(monkeypatch):
+    fake = FakeEutils({"EGFR": ("1956", "epidermal growth factor receptor"),
+                       "BRAF": ("673", "B-Raf proto-oncogene")})
+    ncbi._memory.clear()
+    monkeypatch.setattr(ncbi.upstream, "get", fake.get)
+    monkeypatch.setattr(ncbi._limiter, "acquire", lambda: None)
+    monkeypatch.setattr(ncbi, "get_ncbi_summaries", lambda symbols: {})
+    monkeypatch.setattr(ncbi, "save_ncbi_summaries", lambda entries, ttl: fake.saved.append((list(entries), ttl)))
+    yield fake
+    ncbi._memory.clear()
+
+
+def test_rate_limiter_spaces_calls(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ncbi, "time", clock)
+    limiter = ncbi.RateLimiter(4)
+
+    for _ in range(3):
+        limiter.acquire()
+    assert clock.slept == [0.25, 0.25]
+
+    # An idle period doesn't bank extra calls
+    clock.now += 10
+    limiter.acquire()
+    assert clock.slept == [0.25, 0.25]
+
+
+def test_symbols_are_batched_into_one_search(eutils):
+    out = ncbi.fetch_ncbi_summaries(["egfr", "BRAF"])
+
+    assert out == {"EGFR": "epidermal growth factor receptor", "BRAF": "B-Raf proto-oncogene"}
+    assert [name for name, _ in eutils.calls] == ["esearch.fcgi", "esummary.fcgi"]
+    assert eutils.saved == [([("EGFR", "1956", "epidermal growth factor receptor"),
+                              ("BRAF", "673", "B-Raf proto-oncogene")], ncbi.NCBI_SUMMARY_TTL),
+                            ([], ncbi.NCBI_NEGATIVE_TTL)]
+
+
+def test_unknown_symbol_is_negatively_cached(eutils):
+    assert ncbi.fetch_ncbi_summaries(["NOTAGENE"]) == {"NOTAGENE": None}
+    assert eutils.saved[-1] == ([("NOTAGENE", None, None)], ncbi.NCBI_NEGATIVE_TTL)
+    calls = len(eutils.calls)
+
+    assert ncbi.cached_summary("notagene") == (True, None)
+    assert ncbi.fetch_ncbi_summaries(["NOTAGENE"]) == {"NOTAGENE": None}
+    assert len(eutils.calls) == calls
+
+
+def test_stored_summaries_skip_upstream(eutils, monkeypatch):
+    monkeypatch.setattr(ncbi, "get_ncbi_summaries",
+                        lambda symbols: {"EGFR": ("1956", "from the table")} if "EGFR" in symbols else {})
+
+    assert ncbi.fetch_ncbi_summaries(["EGFR"]) == {"EGFR": "from the table"}
+    assert eutils.calls == []
+    assert ncbi.cached_summary("EGFR") == (True, "from the table")
+
+
+def test_upstream_failure_is_not_cached(eutils, monkeypatch):
+    def down(url, params):
+        raise ncbi.upstream.requests.ConnectionError("refused")
+
+    monkeypatch.setattr(ncbi.upstream, "get", down)
+    assert ncbi.fetch_ncbi_summaries(["EGFR"]) == {"EGFR": None}
+    assert ncbi.cached_summary("EGFR") == (False, None)
+    assert eutils.saved == []
+
+
+def test_lookup_by_gene_id_caches_under_the_symbol(eutils):
+    assert ncbi.fetch_ncbi_summary("1956") == "epidermal growth factor receptor"
+    assert ncbi.cached_summary("EGFR") == (True, "epidermal growth factor receptor")
+    assert eutils.saved == [([("EGFR", "1956", "epidermal growth factor receptor")], ncbi.NCBI_SUMMARY_TTL)]
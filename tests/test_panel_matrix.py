@@ -0,0 +1,32 @@
+from panel_matrix import build_matrix
+
+
+def _row(drug, score=None, types=()):
+    return {"left_name": "SLC6A4", "right_name": drug, "score": score, "interaction_type_list": list(types)}
+
+
+def test_cells_line_up_with_gene_and_drug_positions():
+    entries = {
+        "SLC6A4": {"rows": [
+            _row("FLUOXETINE", 2.0, ["inhibitor"]),
+            _row("fluoxetine", 3.5, ["inhibitor", "blocker"]),
+            _row("VORTIOXETINE"),
+            _row("NOT IN PANEL", 9.0, ["agonist"]),
+        ]},
+        "HTR2A": {"rows": [_row("Vortioxetine", 1.0, ["antagonist"])]},
+    }
+    matrix = build_matrix(["SLC6A4", "HTR2A", "DRD2"], ["Fluoxetine", "Vortioxetine"], entries)
+
+    assert matrix["genes"] == ["SLC6A4", "HTR2A", "DRD2"]
+    assert matrix["drugs"] == ["Fluoxetine", "Vortioxetine"]
+    assert matrix["type_legend"] == ["inhibitor", "blocker", "antagonist"]
+    assert matrix["scores"] == [[3.5, None], [None, 1.0], [None, None]]
+    assert matrix["types"] == [[[0, 1], []], [None, [2]], [None, None]]
+    assert matrix["interactions"] == 3
+
+
+def test_missing_entries_leave_empty_rows():
+    matrix = build_matrix(["SLC6A4"], ["Fluoxetine"], {"SLC6A4": None})
+    assert matrix["types"] == [[None]]
+    assert matrix["interactions"] == 0
+    assert build_matrix([], [], {})["scores"] == []
@@ -0,0 +1,95 @@
+from parsers import (build_cache_entry, parseDrugResults, parseGeneResults, parseInteractionResults,
+                     parseProteinResults, regroupInteractionPage)
+
+GENE_RESPONSE = {"data": {"genes": {"nodes": [{
+    "name": "SLC6A4",
+    "conceptId": "hgnc:11050",
+    "interactions": [
+        {
+            "drug": {"name": "FLUOXETINE", "conceptId": "rxcui:4493"},
+            "interactionScore": 2.5,
+            "interactionTypes": [{"type": "inhibitor", "directionality": "inhibitory"}],
+            "sources": [{"sourceDbName": "DrugBank"}, {"sourceDbName": "ChEMBL"}],
+            "publications": [{"pmid": 123}, {"pmid": None}],
+        },
+        {"drug": {"name": "VORTIOXETINE"}, "interactionTypes": None, "sources": None},
+    ],
+}]}}}
+
+DRUG_RESPONSE = {"data": {"drugs": {"nodes": [{
+    "name": "FLUOXETINE",
+    "conceptId": "rxcui:4493",
+    "interactions": [{"gene": {"name": "SLC6A4", "longName": "solute carrier family 6 member 4"}}],
+}]}}}
+
+
+def test_gene_rows():
+    rows = parseGeneResults(GENE_RESPONSE)
+    assert rows[0] == {
+        "left_label": "Gene", "left_name": "SLC6A4", "left_cid": "hgnc:11050",
+        "right_label": "Drug", "right_name": "FLUOXETINE", "right_cid": "rxcui:4493",
+        "types": "inhibitor", "interaction_type_list": ["inhibitor"],
+        "directions": "inhibitory", "score": 2.5,
+        "sources": "DrugBank, ChEMBL", "pmids": "123",
+    }
+
+
+def test_missing_lists_render_as_dashes():
+    row = parseGeneResults(GENE_RESPONSE)[1]
+    assert (row["types"], row["directions"], row["sources"], row["pmids"]) == ("—", "—", "—", "—")
+    assert row["interaction_type_list"] == []
+    assert row["score"] is None
+    assert row["right_cid"] == ""
+
+
+def test_drug_rows_name_genes_by_long_name():
+    row = parseDrugResults(DRUG_RESPONSE)[0]
+    assert (row["left_label"], row["right_label"]) == ("Drug", "Gene")
+    assert row["right_name"] == "solute carrier family 6 member 4"
+
+
+def test_empty_and_malformed_responses():
+    assert parseGeneResults(None) == []
+    assert parseGeneResults({"data": {"genes": None}}) == []
+    assert parseDrugResults({"data": {"drugs": {"nodes": None}}}) == []
+
+
+def test_limit():
+    assert len(parseInteractionResults(GENE_RESPONSE, "gene", limit=1)) == 1
+
+
+def test_protein_rows():
+    response = {"results": [{
+        "primaryAccession": "P31645",
+        "organism": {"scientificName": "Homo sapiens"},
+        "proteinDescription": {"recommendedName": {
+            "fullName": {"value": "Sodium-dependent serotonin transporter"},
+            "shortNames": [{"value": "SERT"}],
+        }},
+        "genes": [{"geneName": {"value": "SLC6A4"}, "synonyms": [{"value": "HTT"}]}],
+    }]}
+    assert parseProteinResults(response) == [{
+        "protein_name": "SERT",
+        "description": "Sodium-dependent serotonin transporter",
+        "uniprot_id": "P31645",
+        "organism": "Homo sapiens",
+        "genes": "SLC6A4, HTT",
+    }]
+    assert parseProteinResults(None) == []
+
+
+def test_regrouped_pages_parse_like_node_responses():
+    page = [
+        {"gene": {"name": "SLC6A4", "conceptId": "hgnc:11050"}, **GENE_RESPONSE["data"]["genes"]["nodes"][0]["interactions"][0]},
+        {"gene": {"name": "SLC6A4", "conceptId": "hgnc:11050"}, **GENE_RESPONSE["data"]["genes"]["nodes"][0]["interactions"][1]},
+        {"gene": {}},
+    ]
+    assert parseGeneResults(regroupInteractionPage(page, "gene")) == parseGeneResults(GENE_RESPONSE)
+
+
+def test_cache_entry_reuses_current_aggregates():
+    rows = parseGeneResults(GENE_RESPONSE)
+    entry = build_cache_entry(GENE_RESPONSE, rows)
+    assert entry["rows"] is rows
+    assert build_cache_entry(GENE_RESPONSE, rows, entry["aggregates"])["aggregates"] is entry["aggregates"]
+    assert build_cache_entry(GENE_RESPONSE, rows, {"version": -1})["aggregates"] == entry["aggregates"]
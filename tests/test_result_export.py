@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+
+import pytest
+
+import result_export
+from result_export import (ERROR_MARK, ERROR_METADATA_KEY, INTERACTION_FIELDS, parquet_available,
+                           stream_csv, stream_export, stream_ndjson, stream_parquet)
+
+ROWS = [
+    {"query": "EGFR", "left_name": "EGFR", "right_name": "GEFITINIB", "types": "inhibitor", "score": 3.5},
+    {"query": "EGFR", "left_name": "EGFR", "right_name": "ERLOTINIB", "types": None, "score": None},
+    {"query": "BRAF", "left_name": "BRAF", "right_name": "VEMURAFENIB, \"PLX4032\"", "score": 12.0},
+]
+ERRORS = {"NOTAGENE": "DGIdb error: 502 Bad Gateway\nretry later"}
+
+
+def _read_csv(text):
+    rows, errors = [], {}
+    reader = csv.reader(io.StringIO(text))
+    header = next(reader)
+    for record in reader:
+        if record and record[0] == ERROR_MARK:
+            errors[record[1]] = record[2]
+        else:
+            rows.append(dict(zip(header, record)))
+    return header, rows, errors
+
+
+def test_csv_round_trip_with_error_trailer():
+    header, rows, errors = _read_csv("".join(stream_csv(iter(ROWS), INTERACTION_FIELDS, ERRORS)))
+
+    assert header == INTERACTION_FIELDS
+    assert [r["right_name"] for r in rows] == [r["right_name"] for r in ROWS]
+    assert rows[0]["score"] == "3.5" and rows[1]["types"] == ""
+    assert errors == ERRORS
+
+
+def test_csv_without_errors_has_no_trailer():
+    _, rows, errors = _read_csv("".join(stream_csv(iter(ROWS), INTERACTION_FIELDS)))
+    assert len(rows) == len(ROWS)
+    assert errors == {}
+
+
+def test_ndjson_round_trip_with_error_lines():
+    lines = [json.loads(line) for line in "".join(stream_ndjson(iter(ROWS), INTERACTION_FIELDS, ERRORS)).splitlines()]
+
+    assert lines[:len(ROWS)] == [{f: row.get(f) for f in INTERACTION_FIELDS} for row in ROWS]
+    assert lines[len(ROWS):] == [{"query": "NOTAGENE", "error": ERRORS["NOTAGENE"]}]
+
+
+@pytest.mark.skipif(not parquet_available(), reason="pyarrow is not installed")
+def test_parquet_round_trip_with_error_metadata(monkeypatch):
+    import pyarrow.parquet as pq
+
+    monkeypatch.setattr(result_export, "PARQUET_BATCH_ROWS", 2)
+    chunks = list(stream_parquet(iter(ROWS), INTERACTION_FIELDS, ERRORS))
+    parquet = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+
+    assert parquet.metadata.num_row_groups == 2
+    table = parquet.read().to_pylist()
+    assert [r["right_name"] for r in table] == [r["right_name"] for r in ROWS]
+    assert [r["score"] for r in table] == [3.5, None, 12.0]
+    metadata = parquet.metadata.metadata
+    assert json.loads(metadata[ERROR_METADATA_KEY.encode()]) == ERRORS
+
+
+@pytest.mark.skipif(not parquet_available(), reason="pyarrow is not installed")
+def test_parquet_without_errors_has_no_error_metadata():
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(io.BytesIO(b"".join(stream_parquet(iter(ROWS), INTERACTION_FIELDS))))
+    assert ERROR_METADATA_KEY.encode() not in (parquet.metadata.metadata or {})
+
+
+@pytest.mark.parametrize("fmt", ["csv", "ndjson", "parquet"])
+def test_stream_export_reports_failed_terms_in_every_format(monkeypatch, fmt):
+    if fmt == "parquet" and not parquet_available():
+        pytest.skip("pyarrow is not installed")
+
+    def term_rows(search_type, query, fetch):
+        if query == "NOTAGENE":
+            raise LookupError("No results found")
+        yield {"left_name": query, "right_name": "DRUG"}
+
+    monkeypatch.setattr(result_export, "iter_term_rows", term_rows)
+    body = list(stream_export(fmt, "gene", ["EGFR", "NOTAGENE"], lambda q: None))
+
+    if fmt == "csv":
+        _, rows, errors = _read_csv("".join(body))
+    elif fmt == "ndjson":
+        lines = [json.loads(line) for line in "".join(body).splitlines()]
+        rows = [line for line in lines if "error" not in line]
+        errors = {line["query"]: line["error"] for line in lines if "error" in line}
+    else:
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(io.BytesIO(b"".join(body)))
+        rows = parquet.read().to_pylist()
+        errors = json.loads(parquet.metadata.metadata[ERROR_METADATA_KEY.encode()])
+
+    assert [r["query"] for r in rows] == ["EGFR"]
+    assert errors == {"NOTAGENE": "No results found"}
@@ -0,0 +1,122 @@
+import math
+import random
+
+import pytest
+
+import similarity
+from similarity import SimilarityIndex, score_weight
+
+GENES = [(10, "SLC6A4"), (11, "HTR2A"), (12, "DRD2"), (13, "HTR1A")]
+DRUGS = [(20, "FLUOXETINE"), (21, "SERTRALINE"), (22, "HALOPERIDOL"), (23, "VORTIOXETINE"), (24, "UNUSED")]
+INTERACTIONS = [
+    (10, 20, 2.0, ["inhibitor"]),
+    (11, 20, None, []),
+    (10, 21, 2.0, ["inhibitor"]),
+    (11, 21, None, []),
+    (12, 22, 5.0, ["antagonist"]),
+    (10, 23, 1.0, ["inhibitor"]),
+    (13, 23, 1.0, ["agonist"]),
+]
+
+
+@pytest.fixture
+def index():
+    idx = SimilarityIndex()
+    idx.set_panels({"drug": ["Fluoxetine"], "unknown kind": ["x"]})
+    idx._install(GENES, DRUGS, INTERACTIONS)
+    return idx
+
+
+def test_score_weight():
+    assert score_weight(None) == 1.0
+    assert score_weight(0) == 1.0
+    assert score_weight(2.0) == pytest.approx(1 + math.log(3))
+
+
+def test_identical_profiles_score_one(index):
+    result = index.compare("drug", "fluoxetine", "SERTRALINE")
+    assert result["cosine"] == pytest.approx(1.0)
+    assert result["jaccard"] == 1.0
+    assert result["shared"] == [
+        {"name": "HTR2A", "types_a": [], "types_b": []},
+        {"name": "SLC6A4", "types_a": ["inhibitor"], "types_b": ["inhibitor"]},
+    ]
+
+
+def test_partial_overlap_scores(index):
+    result = index.compare("drug", "FLUOXETINE", "VORTIOXETINE")
+    # shared: (SLC6A4) and (SLC6A4, inhibitor) out of 3 + 4 features
+    assert result["jaccard"] == pytest.approx(2 / 5)
+    w2, w1 = score_weight(2.0), score_weight(1.0)
+    dot = w2 * w1 + (w2 * similarity.TYPE_WEIGHT) * (w1 * similarity.TYPE_WEIGHT)
+    norm_a = math.sqrt(w2 ** 2 + (w2 * similarity.TYPE_WEIGHT) ** 2 + 1.0)
+    norm_b = math.sqrt(w1 ** 2 + (w1 * similarity.TYPE_WEIGHT) ** 2 * 2 + w1 ** 2)
+    assert result["cosine"] == pytest.approx(round(dot / (norm_a * norm_b), 4), abs=1e-4)
+
+
+def test_disjoint_and_unknown(index):
+    result = index.compare("drug", "FLUOXETINE", "HALOPERIDOL")
+    assert (result["cosine"], result["jaccard"], result["shared"]) == (0.0, 0.0, [])
+    assert index.compare("drug", "FLUOXETINE", "NOPE") is None
+
+
+@pytest.mark.parametrize("metric", similarity.METRICS)
+def test_similar_ranks_neighbours(index, metric):
+    results, unknown = index.similar("drug", ["SERTRALINE", "nope", "sertraline"], k=5, metric=metric)
+    assert unknown == ["nope"]
+    assert len(results) == 1
+    neighbours = results[0]["neighbors"]
+    assert [n["name"] for n in neighbours] == ["FLUOXETINE", "VORTIOXETINE"]
+    assert neighbours[0]["score"] == pytest.approx(1.0)
+    assert neighbours[0]["shared"] == ["HTR2A", "SLC6A4"]
+    assert results[0]["partner_count"] == 2
+
+
+def test_panel_neighbours_are_precomputed(index):
+    snapshot = index._snapshot
+    assert set(snapshot.panel_results) == {("drug", metric, 0) for metric in similarity.METRICS}
+    results, _ = index.similar("drug", ["FLUOXETINE"], k=1)
+    assert [n["name"] for n in results[0]["neighbors"]] == ["SERTRALINE"]
+
+
+def test_reload_publishes_a_new_snapshot(index):
+    before = index._snapshot
+    index._install(GENES, DRUGS, INTERACTIONS[:2])
+    assert index._snapshot is not before
+    assert len(before.profiles["drug"]) == len(index._snapshot.profiles["drug"])
+    assert index.compare("drug", "FLUOXETINE", "SERTRALINE")["jaccard"] == 0.0
+
+
+def test_rows_without_interactions_have_their_own_arrays(index):
+    profiles = index._snapshot.profiles["drug"]
+    unused = profiles.index["UNUSED"]
+    assert len(profiles.features[unused]) == 0
+    assert len({id(f) for f in profiles.features}) == len(profiles.features)
+    assert len({id(w) for w in profiles.weights}) == len(profiles.weights)
+
+
+def test_stats(index):
+    stats = index.stats()
+    assert stats["drug"]["profiles"] == len(DRUGS)
+    assert stats["gene"]["method"] == "exact"
+    assert stats["panel_entries"] == len(similarity.METRICS)
+
+
+def test_lsh_candidates_find_near_duplicates(monkeypatch):
+    monkeypatch.setattr(similarity, "SIMILARITY_LSH_ROWS", 0)
+    rng = random.Random(7)
+    genes = [(i, f"G{i}") for i in range(400)]
+    drugs = [(d, f"D{d}") for d in range(60)]
+    interactions = []
+    for d in range(0, 60, 2):
+        # each even drug has a twin sharing 11 of its 12 targets
+        targets = rng.sample(range(400), 13)
+        interactions.extend((g, d, None, ()) for g in targets[:12])
+        interactions.extend((g, d + 1, None, ()) for g in targets[:11] + targets[12:])
+
+    idx = SimilarityIndex()
+    idx._install(genes, drugs, interactions)
+    assert idx.stats()["drug"]["method"] == "lsh"
+    for d in range(0, 60, 2):
+        results, _ = idx.similar("drug", [f"D{d}"], k=1, metric="jaccard")
+        assert results[0]["neighbors"][0]["name"] == f"D{d + 1}"
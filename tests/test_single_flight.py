@@ -0,0 +1,207 @@
+import threading
+import time
+
+import pytest
+
+from cache import SingleFlight
+
+
+def _run_concurrently(n, target):
+    results = [None] * n
+    start = threading.Barrier(n)
+
+    def run(i):
+        start.wait()
+        results[i] = target()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return "value"
+
+    results = _run_concurrently(5, lambda: flight.do("k", fetch))
+    assert len(calls) == 1
+    assert [r for r, _ in results] == ["value"] * 5
+    assert sorted(shared for _, shared in results) == [False] + [True] * 4
+    assert flight.coalesced == 4
+    assert flight.in_flight() == 0
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("b", lambda: 2) == (2, False)
+    assert flight.coalesced == 0
+
+
+def test_leader_exception_reaches_waiters():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.1)
+        raise ValueError("upstream down")
+
+    def call():
+        try:
+            flight.do("k", fail)
+        except ValueError as e:
+            return str(e)
+
+    assert _run_concurrently(3, call) == ["upstream down"] * 3
+    assert flight.in_flight() == 0
+
+
+def test_waiter_fetches_itself_after_timeout():
+    flight = SingleFlight(timeout=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("k", lambda: release.wait(1)))
+    leader.start()
+    time.sleep(0.02)
+    try:
+        assert flight.do("k", lambda: "own") == ("own", False)
+    finally:
+        release.set()
+        leader.join()
+
+
+def test_key_is_released_after_a_call():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("x")
+
+    flight.do("k", lambda: 1)
+    with pytest.raises(RuntimeError):
+        flight.do("k", fail)
+    assert flight.do("k", lambda: 3) == (3, False)
+
+
+def test_do_many_leads_free_keys_in_one_call_and_joins_busy_ones():
+    flight = SingleFlight()
+    release = threading.Event()
+    single = threading.Thread(target=lambda: flight.do("a", lambda: release.wait(1) and "single"))
+    single.start()
+    time.sleep(0.02)
+
+    batches = []
+
+    def fetch_many(keys):
+        batches.append(sorted(keys))
+        release.set()
+        return {k: k.upper() for k in keys}
+
+    out = flight.do_many(["a", "b", "c", "b"], fetch_many)
+    single.join()
+    assert batches == [["b", "c"]]
+    assert out == {"a": ("single", True), "b": ("B", False), "c": ("C", False)}
+    assert flight.in_flight() == 0
+
+
+def test_do_many_fetches_stuck_keys_itself_after_timeout():
+    flight = SingleFlight(timeout=0.05)
+    release = threading.Event()
+    single = threading.Thread(target=lambda: flight.do("a", lambda: release.wait(1) and "single"))
+    single.start()
+    time.sleep(0.02)
+
+    batches = []
+
+    def fetch_many(keys):
+        batches.append(sorted(keys))
+        return {k: k.upper() for k in keys}
+
+    try:
+        out = flight.do_many(["a", "b"], fetch_many)
+    finally:
+        release.set()
+        single.join()
+    # "b" is led right away; "a" is only fetched once its stuck leader times out
+    assert batches == [["b"], ["a"]]
+    assert out == {"a": ("A", False), "b": ("B", False)}
+    assert flight.in_flight() == 0
+
+
+def test_do_many_failure_reaches_waiters_and_releases_keys():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fetch_many(keys):
+        started.set()
+        release.wait(1)
+        raise RuntimeError("upstream down")
+
+    errors = []
+
+    def lead():
+        try:
+            flight.do_many(["a", "b"], fetch_many)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    started.wait(1)
+
+    def wait_on_a():
+        try:
+            flight.do("a", lambda: "own")
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    waiter = threading.Thread(target=wait_on_a)
+    waiter.start()
+    time.sleep(0.02)
+    release.set()
+    leader.join()
+    waiter.join()
+
+    assert errors == ["upstream down", "upstream down"]
+    assert flight.in_flight() == 0
+    assert flight.do_many(["a"], lambda keys: {"a": 1}) == {"a": (1, False)}
+
+
+def test_batch_misses_share_flights_with_single_searches():
+    from cache import MemoryCache, SearchCache
+
+    search_cache = SearchCache(MemoryCache())
+    stored = {}
+    search_cache.get = lambda q, t: (stored.get(q.lower()), "db" if q.lower() in stored else None)
+    search_cache.put = lambda q, t, data: stored.__setitem__(q.lower(), data)
+
+    release = threading.Event()
+
+    def fetch_one():
+        release.wait(1)
+        return {"rows": ["single"]}, None
+
+    single = threading.Thread(target=lambda: search_cache.get_or_fetch("SLC6A4", "gene", fetch_one))
+    single.start()
+    time.sleep(0.02)
+
+    fetched = []
+
+    def fetch_many(queries):
+        fetched.extend(queries)
+        release.set()
+        return {q: ({"rows": [q]}, None) for q in queries}
+
+    out = search_cache.get_or_fetch_many(["SLC6A4", "HTR2A"], "gene", fetch_many)
+    single.join()
+    assert fetched == ["HTR2A"]
+    assert out["SLC6A4"] == ({"rows": ["single"]}, None, "upstream")
+    assert out["HTR2A"] == ({"rows": ["HTR2A"]}, None, "upstream")
+    assert search_cache.counters["upstream"]["coalesced"] == 1
+    assert set(stored) == {"slc6a4", "htr2a"}
@@ -0,0 +1,72 @@
+import pytest
+
+from term_resolver import TermResolver, normalize_key
+
+
+@pytest.fixture
+def resolver(tmp_path):
+    synonyms = tmp_path / "hgnc.tsv"
+    synonyms.write_text(
+        "symbol\talias_symbol\tprev_symbol\tstatus\n"
+        "SLC6A4\tHTT|5-HTT\tSERT1\tApproved\n"
+        "SLC6A3\tDAT1\t\tApproved\n"
+        "SLC6A99\tOLD\t\tEntry Withdrawn\n"
+        "IL6\tIL-6 ;BSF2\t\tApproved\n",
+        encoding="utf-8",
+    )
+    r = TermResolver()
+    r.add_aliases("gene", {"serotonin transporter": "SLC6A4", "SERT": "SLC6A4"})
+    r.add_aliases("drug", {"Prozac": "Fluoxetine"})
+    r.add_panel("gene", ["SLC6A4", "HTR2A"])
+    r.load_synonym_file("gene", str(synonyms))
+    return r.build()
+
+
+def test_normalize_key():
+    assert normalize_key("  il–6\t ") == "IL-6"
+    assert normalize_key(None) == ""
+
+
+def test_resolve_exact_compact_and_aliases(resolver):
+    assert resolver.resolve("gene", "Serotonin  Transporter") == "SLC6A4"
+    assert resolver.resolve("gene", "5HTT") == "SLC6A4"
+    assert resolver.resolve("gene", "il 6") == "IL6"
+    assert resolver.resolve("drug", "prozac") == "Fluoxetine"
+    assert resolver.resolve("gene", "SLC6A99") is None
+    assert resolver.resolve("gene", "") is None
+    assert resolver.resolve("unknown", "SLC6A4") is None
+
+
+def test_short_prefixes_rank_panel_terms_first(resolver):
+    suggestions = resolver.complete("gene", "slc")
+    assert [s["term"] for s in suggestions] == ["SLC6A4", "SLC6A3"]
+    assert resolver.complete("gene", "s", limit=1) == [{"term": "SLC6A4", "match": "SLC6A4"}]
+
+
+def test_long_prefix_search(resolver):
+    assert [s["term"] for s in resolver.complete("gene", "slc6a")] == ["SLC6A4", "SLC6A3"]
+    assert resolver.complete("gene", "dat") == [{"term": "SLC6A3", "match": "DAT1"}]
+    assert resolver.complete("gene", "serotonin t") == [{"term": "SLC6A4", "match": "serotonin transporter"}]
+
+
+def test_completions_are_one_per_canonical_term(resolver):
+    terms = [s["term"] for s in resolver.complete("gene", "S", limit=20)]
+    assert len(terms) == len(set(terms))
+
+
+def test_empty_and_unknown_prefixes(resolver):
+    assert resolver.complete("gene", "   ") == []
+    assert resolver.complete("gene", "zzzz") == []
+    assert resolver.complete("unknown", "slc") == []
+
+
+def test_find_in_text_uses_curated_names_only(resolver):
+    assert resolver.find_in_text("gene", "What does the serotonin transporter do?") == "SLC6A4"
+    assert resolver.find_in_text("gene", "Is DAT1 a target?") is None
+
+
+def test_synonym_file_without_a_name_column(tmp_path):
+    bad = tmp_path / "bad.tsv"
+    bad.write_text("foo\tbar\n1\t2\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        TermResolver().load_synonym_file("gene", str(bad))
@@ -0,0 +1,72 @@
+import pytest
+
+import upstream
+
+
+@pytest.fixture(autouse=True)
+def fresh_sessions():
+    upstream.close_all()
+    yield
+    upstream.close_all()
+
+
+class FakeResponse:
+    status_code = 200
+
+
+def test_one_session_per_host():
+    dgidb = upstream.session_for("https://dgidb.org/api/graphql")
+    assert upstream.session_for("https://dgidb.org/other") is dgidb
+    assert upstream.session_for("https://rest.uniprot.org/uniprotkb/search") is not dgidb
+
+
+def test_session_pools_and_retries():
+    adapter = upstream.session_for("https://dgidb.org/api/graphql").get_adapter("https://dgidb.org/")
+    retry = adapter.max_retries
+
+    assert adapter._pool_maxsize == upstream.UPSTREAM_POOL_MAXSIZE
+    assert retry.total == upstream.UPSTREAM_MAX_RETRIES
+    assert set(retry.status_forcelist) == set(upstream.RETRY_STATUSES)
+    assert {"GET", "POST"} <= set(retry.allowed_methods)
+    assert retry.respect_retry_after_header
+
+
+def test_timeouts_per_host():
+    assert upstream.timeout_for("https://dgidb.org/api/graphql") == upstream.HOST_TIMEOUTS["dgidb.org"]
+    assert upstream.timeout_for("https://example.org/") == upstream.DEFAULT_TIMEOUT
+
+
+def test_request_defaults_timeout_and_records_latency(monkeypatch):
+    sent = []
+    observed = []
+    session = upstream.session_for("https://rest.uniprot.org/")
+    monkeypatch.setattr(session, "request", lambda method, url, **kw: sent.append((method, url, kw)) or FakeResponse())
+    monkeypatch.setattr(upstream.metrics, "observe_upstream", lambda host, seconds, status: observed.append(status))
+
+    upstream.get("https://rest.uniprot.org/uniprotkb/search", params={"query": "EGFR"})
+    upstream.post("https://rest.uniprot.org/x", json={}, timeout=1)
+
+    assert sent[0][2]["timeout"] == upstream.HOST_TIMEOUTS["rest.uniprot.org"]
+    assert sent[1][0] == "POST" and sent[1][2]["timeout"] == 1
+    assert observed == [200, 200]
+
+
+def test_failed_request_is_recorded_as_error(monkeypatch):
+    observed = []
+    session = upstream.session_for("https://dgidb.org/")
+
+    def refuse(method, url, **kw):
+        raise upstream.requests.ConnectionError("refused")
+
+    monkeypatch.setattr(session, "request", refuse)
+    monkeypatch.setattr(upstream.metrics, "observe_upstream", lambda host, seconds, status: observed.append(status))
+
+    with pytest.raises(upstream.requests.ConnectionError):
+        upstream.post("https://dgidb.org/api/graphql", json={})
+    assert observed == ["error"]
+
+
+def test_close_all_drops_sessions():
+    first = upstream.session_for("https://dgidb.org/")
+    upstream.close_all()
+    assert upstream.session_for("https://dgidb.org/") is not first
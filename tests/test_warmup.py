@@ -0,0 +1,74 @@
+import pytest
+
+import warmup
+from db_conn import normalize_cache_key
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    """Captures search_cache.put and stubs the upstream fetches."""
+    puts = {}
+    batches = []
+
+    def fetch_batch(search_type, chunk):
+        batches.append(list(chunk))
+        return {q: (None, "DGIdb error: timeout") if q == "BAD" else ({"rows": [q]}, None) for q in chunk}
+
+    monkeypatch.setattr(warmup.search_cache, "put", lambda q, t, data: puts.__setitem__((q, t), data))
+    monkeypatch.setattr(warmup, "fetch_batch_results", fetch_batch)
+    monkeypatch.setattr(warmup, "fetch_search_results", lambda t, q: ({"rows": [q]}, None))
+    return puts, batches
+
+
+def test_panel_terms_are_normalized_and_unique():
+    for search_type in warmup.PANELS:
+        terms = warmup.panel_terms(search_type)
+        keys = [normalize_cache_key(t) for t in terms]
+        assert len(keys) == len(set(keys))
+        assert all(t == warmup.normalize_term(search_type, t) for t in terms)
+
+
+def test_panel_terms_include_alias_targets():
+    terms = {normalize_cache_key(t) for t in warmup.panel_terms("gene")}
+    for target in warmup.GENE_ALIASES.values():
+        assert normalize_cache_key(warmup.normalize_term("gene", target)) in terms
+
+
+def test_warm_chunk_stores_hits_and_reports_failures(stored):
+    puts, batches = stored
+    ok, errors = warmup._warm_chunk("gene", ["SLC6A4", "BAD"])
+
+    assert ok == 1
+    assert errors == {"BAD": "DGIdb error: timeout"}
+    assert batches == [["SLC6A4", "BAD"]]
+    assert puts == {("SLC6A4", "gene"): {"rows": ["SLC6A4"]}}
+
+
+def test_protein_chunks_fetch_term_by_term(stored):
+    puts, batches = stored
+    ok, errors = warmup._warm_chunk("protein", ["P31645"])
+    assert (ok, errors, batches) == (1, {}, [])
+    assert puts == {("P31645", "protein"): {"rows": ["P31645"]}}
+
+
+def test_fresh_terms_are_skipped(stored, monkeypatch):
+    puts, batches = stored
+    terms = warmup.panel_terms("gene")
+    fresh = {normalize_cache_key(t) for t in terms[1:]}
+    monkeypatch.setattr(warmup, "get_fresh_queries", lambda qs, t, window: fresh)
+
+    report = warmup.warm_search_type("gene", concurrency=1)
+    assert report == {"terms": len(terms), "skipped": len(terms) - 1, "fetched": 1, "errors": {}}
+    assert batches == [[terms[0]]]
+
+
+def test_force_refetches_in_chunks(stored, monkeypatch):
+    puts, batches = stored
+    monkeypatch.setattr(warmup, "BATCH_CHUNK_SIZE", 3)
+    monkeypatch.setattr(warmup, "get_fresh_queries", lambda qs, t, window: pytest.fail("force skips the lookup"))
+
+    terms = warmup.panel_terms("drug")
+    report = warmup.warm_search_type("drug", force=True, concurrency=2)
+    assert report["fetched"] == len(terms) and report["skipped"] == 0
+    assert sorted(q for chunk in batches for q in chunk) == sorted(terms)
+    assert max(len(chunk) for chunk in batches) == 3
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metrics
+
+UPSTREAM_POOL_CONNECTIONS = int(os.getenv("UPSTREAM_POOL_CONNECTIONS", "4"))
+UPSTREAM_POOL_MAXSIZE = int(os.getenv("UPSTREAM_POOL_MAXSIZE", "32"))
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "3"))
+UPSTREAM_BACKOFF_FACTOR = float(os.getenv("UPSTREAM_BACKOFF_FACTOR", "0.5"))
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+USER_AGENT = "DGIT"
+
+# (connect, read) timeouts per upstream host
+HOST_TIMEOUTS = {
+    "dgidb.org": (5, 20),
+    "rest.uniprot.org": (5, 10),
+    "eutils.ncbi.nlm.nih.gov": (5, 10),
+}
+DEFAULT_TIMEOUT = (5, 15)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def _build_session():
+    # GraphQL reads are POSTs but idempotent, so they are safe to retry too
+    retry = Retry(
+        total=UPSTREAM_MAX_RETRIES,
+        backoff_factor=UPSTREAM_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=UPSTREAM_POOL_CONNECTIONS,
+        pool_maxsize=UPSTREAM_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT})
+    return session
+
+
+def session_for(url):
+    """Returns the shared keep-alive session for the URL's host."""
+    host = urlparse(url).netloc
+    session = _sessions.get(host)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = _build_session()
+                _sessions[host] = session
+    return session
+
+
+def timeout_for(url):
+    return HOST_TIMEOUTS.get(urlparse(url).hostname, DEFAULT_TIMEOUT)
+
+
+def request(method, url, **kwargs):
+    kwargs.setdefault("timeout", timeout_for(url))
+    started = time.perf_counter()
+    status = "error"
+    try:
+        resp = session_for(url).request(method, url, **kwargs)
+        status = resp.status_code
+        return resp
+    finally:
+        metrics.observe_upstream(metrics.host_label(url), time.perf_counter() - started, status)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def close_all():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
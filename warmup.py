@@ -0,0 +1,125 @@
+"""
+Cache warm-up for the MDD gene, protein and drug panels.
+
+Run once after a deploy or cache purge:
+
+    python warmup.py
+
+or keep the panels refreshed before they expire:
+
+    python warmup.py --every 21600 --refresh-window 86400
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import (
+    app,
+    MDD_GENES, MDD_PROTEINS, MDD_DRUGS,
+    GENE_ALIASES, DRUG_ALIASES, PROTEIN_ALIASES,
+    BATCH_CHUNK_SIZE,
+    normalize_term, fetch_batch_results, fetch_search_results,
+)
+from cache import search_cache
+from db_conn import get_fresh_queries, normalize_cache_key
+
+PANELS = {
+    "gene": (MDD_GENES, GENE_ALIASES),
+    "drug": (MDD_DRUGS, DRUG_ALIASES),
+    "protein": (MDD_PROTEINS, PROTEIN_ALIASES),
+}
+
+
+def panel_terms(search_type):
+    """Normalized panel entries plus every alias target, deduplicated in order."""
+    panel, aliases = PANELS[search_type]
+    terms = []
+    seen = set()
+    for raw in list(panel) + list(aliases.keys()) + list(aliases.values()):
+        term = normalize_term(search_type, raw)
+        key = normalize_cache_key(term)
+        if term and key not in seen:
+            seen.add(key)
+            terms.append(term)
+    return terms
+
+
+def _warm_chunk(search_type, chunk):
+    with app.app_context():
+        if search_type == "protein":
+            fetched = {q: fetch_search_results(search_type, q) for q in chunk}
+        else:
+            fetched = fetch_batch_results(search_type, chunk)
+
+        errors = {}
+        for q, (data, error) in fetched.items():
+            if error or not data:
+                errors[q] = error or "no results"
+            else:
+                search_cache.put(q, search_type, data)
+        return len(fetched) - len(errors), errors
+
+
+def warm_search_type(search_type, force=False, refresh_window=0, concurrency=4):
+    """
+    Prefetches one panel. Terms whose cache entries stay valid for longer than
+    `refresh_window` seconds are skipped unless `force` is set.
+    """
+    terms = panel_terms(search_type)
+    if not force:
+        with app.app_context():
+            fresh = get_fresh_queries(terms, search_type, refresh_window)
+        todo = [t for t in terms if normalize_cache_key(t) not in fresh]
+    else:
+        todo = terms
+
+    # DGIdb takes many names per request; UniProt is one term per request
+    size = 1 if search_type == "protein" else BATCH_CHUNK_SIZE
+    chunks = [todo[i:i + size] for i in range(0, len(todo), size)]
+
+    fetched = 0
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for ok, errs in pool.map(lambda c: _warm_chunk(search_type, c), chunks):
+            fetched += ok
+            errors.update(errs)
+
+    return {
+        "terms": len(terms),
+        "skipped": len(terms) - len(todo),
+        "fetched": fetched,
+        "errors": errors,
+    }
+
+
+def warm_cache(force=False, refresh_window=0, concurrency=4):
+    report = {}
+    for search_type in PANELS:
+        started = time.time()
+        report[search_type] = warm_search_type(search_type, force, refresh_window, concurrency)
+        report[search_type]["seconds"] = round(time.time() - started, 2)
+        print(f"Warm-up {search_type}: {report[search_type]}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefetch the MDD panels into the search cache.")
+    parser.add_argument("--force", action="store_true",
+                        help="refetch every term even if its cache entry is still fresh")
+    parser.add_argument("--refresh-window", type=int, default=0,
+                        help="also refresh entries expiring within this many seconds")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="max upstream requests in flight")
+    parser.add_argument("--every", type=int, default=0,
+                        help="repeat the warm-up every N seconds (0 = run once)")
+    args = parser.parse_args()
+
+    while True:
+        warm_cache(args.force, args.refresh_window, args.concurrency)
+        if args.every <= 0:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()